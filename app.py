@@ -1,5 +1,9 @@
 import datetime
 import hashlib
+from moderator.bus_services.shared_data import load_bus_route_index
+from moderator.bus_services.timings_poller import bus_timings_poller
+from moderator.bus_services.trajectories import vehicle_trajectory_tracker
+from moderator.config import BUS_POLLER_ENABLED
 from moderator.sql.acad_years import GET_LIST_OF_AYS_QUERY
 from moderator.sql.users import GET_EXISTING_USER_QUERY, INSERT_NEW_USER_STATEMENT
 from moderator.utils.helpers import get_formatted_user_enrollments_from_db, get_major_list, adjust_to_timezone
@@ -213,6 +217,13 @@ conn = st.connection("nus_moderator", type="sql")
 if "conn" not in st.session_state:
     st.session_state["conn"] = conn
 
+# Start polling bus timings in the background, if enabled (the poller is only started once per process)
+# Each snapshot polled is used to reconstruct the trajectories of the buses
+if BUS_POLLER_ENABLED:
+    bus_route_index = load_bus_route_index(_conn=conn)
+    vehicle_trajectory_tracker.set_route_index(route_index=bus_route_index)
+    bus_timings_poller.start(bus_stop_codes=bus_route_index.bus_stop_codes, snapshot_listeners=[vehicle_trajectory_tracker.process_snapshot])
+
 # Get list of academic years considered, and save in session state
 if "list_of_ays" not in st.session_state:
     list_of_ays = get_list_of_ays(conn=conn)
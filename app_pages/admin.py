@@ -1,9 +1,19 @@
-from moderator.config import ACAD_YEAR
+from moderator.config import ACAD_YEAR, BACKFILL_EARLIEST_ACAD_YEAR, JOBS_POLL_INTERVAL
 from moderator.utils.helpers import get_departments_list
+from moderator.utils.jobs import job_runner, ACTIVE_JOB_STATUSES, JOB_QUEUED, JOB_RUNNING, JOB_DONE
 from moderator.utils.user import Admin
 import streamlit as st
 import streamlit.components.v1 as components
+from streamlit_autorefresh import st_autorefresh
 import time
+from typing import Callable
+
+# Maps each type of content that can be updated, to the label of its update button
+UPDATE_BUTTON_LABELS = {
+    "acad_db": "Update Academic Database",
+    "vector_store": "Update Vector Store",
+    "bus_db": "Update Bus Database"
+}
 
 
 def close_dialog():
@@ -30,8 +40,23 @@ def close_dialog():
     )
 
     
+def get_update_job_function(conn: st.connections.SQLConnection, admin: Admin, content_to_update: str) -> Callable[[], None]:
+    # Get the function that performs the update requested, to be run as a background job
+    if content_to_update == "acad_db":
+        # Update the academic-related tables in the PostgreSQL database
+        return lambda: admin.update_acad_db(conn=conn, acad_year=ACAD_YEAR)
+
+    if content_to_update == "vector_store":
+        # Update Pinecone vector store
+        return lambda: admin.update_vector_store(conn=conn, acad_year=ACAD_YEAR)
+
+    # Update the bus-related tables in the PostgreSQL database
+    # return lambda: admin.update_bus_db(conn=conn)
+    return lambda: time.sleep(5)
+
+
 @st.dialog("Are you sure you want to proceed?")
-def confirm_update(content_to_update: str) -> None:
+def confirm_update(conn: st.connections.SQLConnection, admin: Admin, content_to_update: str) -> None:
     # Add button to confirm update
     confirm_button = st.button("Yes")
     
@@ -39,8 +64,15 @@ def confirm_update(content_to_update: str) -> None:
     cancel_button = st.button("No")
 
     if confirm_button:
-        # In session state, specify what to update 
-        st.session_state["content_to_update"] = content_to_update
+        # Run the update in the background, so that it carries on even if the admin leaves this page
+        job_function = get_update_job_function(conn=conn, admin=admin, content_to_update=content_to_update)
+        job_id = job_runner.submit(job_name=content_to_update, job_function=job_function)
+
+        if job_id is None:
+            # The same update has already been started (possibly by another admin)
+            st.error("This update is already in progress.")
+            return
+
         close_dialog()
         st.rerun()
     
@@ -49,45 +81,78 @@ def confirm_update(content_to_update: str) -> None:
         st.rerun()
 
 
+def display_job_status(job: dict[str, str | int | None] | None) -> None:
+    # Nothing to display if this update has never been run
+    if job is None:
+        return
+
+    if job["status"] == JOB_QUEUED:
+        st.info("Update is queued.")
+
+    elif job["status"] == JOB_RUNNING:
+        st.info(f"Update in progress: {job['stage'] or 'Starting'} ({job['num_items_processed']} items processed)")
+
+    elif job["status"] == JOB_DONE:
+        st.success(f"Last update completed at {job['ended_at']}.")
+
+    else:
+        st.error(f"Last update failed at {job['ended_at']}.")
+        if job["error"]:
+            with st.expander("Error details"):
+                st.code(job["error"])
+
+
 def display_update_db_panel(conn: st.connections.SQLConnection, admin: Admin) -> None:
     # Display buttons to update data
     with st.container(border=True):
         st.markdown("#### Update Data")
 
-        # Display update buttons if they have not been clicked
-        if st.session_state["content_to_update"] is None:
-            if st.button("Update Academic Database"):
-                # Admin wants to update academic database - ask them to confirm their request
-                confirm_update("acad_db")
-            
-            if st.button("Update Vector Store"):
-                # Admin wants to update vector store - ask them to confirm their request
-                confirm_update("vector_store")
-            
-            if st.button("Update Bus Database"):
-                # Admin wants to update bus database - ask them to confirm their request
-                confirm_update("bus_db")
-
-        else:
-            # An update button has been clicked - proceed to update content requested
-            with st.spinner("Update in progress. This might take a while - please go and touch some grass first...", show_time=True):
-                if st.session_state["content_to_update"] == "acad_db":
-                    # Update the academic-related tables in the PostgreSQL database
-                    admin.update_acad_db(conn=conn, acad_year=ACAD_YEAR)
-
-                elif st.session_state["content_to_update"] == "vector_store":
-                    # Update Pinecone vector store
-                    admin.update_vector_store(conn=conn, acad_year=ACAD_YEAR)
-
-                else:
-                    # Update the bus-related tables in the PostgreSQL database
-                    # admin.update_bus_db(conn=conn)
-                    time.sleep(5)
-            
-            st.success("Update completed!")
-            st.session_state["content_to_update"] = None
-            time.sleep(1)
-            st.rerun()
+        # Display an update button for each type of content, along with the status of its latest update
+        for content_to_update, button_label in UPDATE_BUTTON_LABELS.items():
+            latest_job = job_runner.get_latest_job(job_name=content_to_update)
+            is_update_active = latest_job is not None and latest_job["status"] in ACTIVE_JOB_STATUSES
+
+            # Button is disabled while the update is queued or running
+            if st.button(button_label, disabled=is_update_active):
+                # Admin wants to update this content - ask them to confirm their request
+                confirm_update(conn=conn, admin=admin, content_to_update=content_to_update)
+
+            display_job_status(job=latest_job)
+
+        # Keep polling the status of the updates while any of them is still in progress
+        if job_runner.has_active_jobs():
+            st_autorefresh(interval=JOBS_POLL_INTERVAL, key="admin_jobs_autorefresh")
+
+
+def display_backfill_panel(conn: st.connections.SQLConnection, admin: Admin) -> None:
+    with st.form("backfill_panel"):
+        st.markdown("#### Backfill Academic Database")
+        st.markdown("Select the range of AYs to load into the academic database:")
+
+        # Input range of AYs to backfill
+        acad_year_options = admin.get_acad_years_in_range(start_acad_year=BACKFILL_EARLIEST_ACAD_YEAR, end_acad_year=ACAD_YEAR)
+        start_acad_year = st.selectbox("From AY", options=acad_year_options, index=0)
+        end_acad_year = st.selectbox("To AY", options=acad_year_options, index=len(acad_year_options) - 1)
+
+        if st.form_submit_button("Submit"):
+            if start_acad_year > end_acad_year:
+                # Due to AYs being in YYYY-YYYY format, we can use str comparison to compare them
+                st.error("The starting AY must not be after the ending AY.")
+
+            # Try to start the backfill, and check whether or not it is successful
+            # This shares its job with the academic database update, so that the two never run at the same time
+            elif job_runner.submit(
+                job_name="acad_db",
+                job_function=lambda: admin.backfill_acad_db(conn=conn, start_acad_year=start_acad_year, end_acad_year=end_acad_year)
+            ) is not None:
+                # Action is successful
+                st.success("Backfill has started! Its progress is shown under Update Academic Database.")
+                time.sleep(1)
+                st.rerun()
+
+            else:
+                # Action is not successful - an update of the academic database is already in progress
+                st.error("An update of the academic database is already in progress.")
 
 
 def display_majors_panel(conn: st.connections.SQLConnection, admin: Admin) -> None:
@@ -178,16 +243,15 @@ conn = st.session_state["conn"]
 # Retrieve user from session state
 user = st.session_state["user"]
 
-# Initialise variable to keep track of to nature of the update requested, if any
-if "content_to_update" not in st.session_state:
-    st.session_state["content_to_update"] = None
-
 # Display header
 st.header("Admin")
 
 # Display panel to update databases (ie. for the new AY)
 display_update_db_panel(conn=conn, admin=user)
 
+# Display panel to backfill past AYs into the academic database
+display_backfill_panel(conn=conn, admin=user)
+
 # Display panel to add majors
 display_majors_panel(conn=conn, admin=user)
 
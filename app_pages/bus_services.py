@@ -1,8 +1,9 @@
 import asyncio
 import datetime
-from moderator.bus_services.fetch_timings import get_bus_stop_names_to_codes, fetch_timings_from_api
+from moderator.bus_services.fetch_timings import get_bus_stop_names_to_codes
 from moderator.bus_services.handle_routes import get_subsequent_bus_stops
 from moderator.bus_services.record_trips import get_eta_date, get_weather, record_trip
+from moderator.bus_services.timings_cache import bus_timings_cache
 from moderator.config import BUS_TIMINGS_AUTOREFRESH_INTERVAL
 from moderator.utils.helpers import adjust_to_timezone
 import streamlit as st
@@ -45,33 +46,6 @@ def add_html_tags_with_center_style(formatted_text: str) -> str:
     return f"<p style='text-align: center;'>{formatted_text}</p>"
 
 
-async def get_eta_dates_for_subsequent_bus_stops_concurrently(conn: st.connections.SQLConnection, ordered_subsequent_bus_stop_names: list[str], subsequent_bus_stop_names_to_codes: dict[str, str], bus_num: str, bus_plate_num: str) -> tuple[list[datetime.datetime], list[str]]:
-    # Stores all subsequent bus stop codes, in the same order as ordered_subsequent_bus_stop_names
-    ordered_subsequent_bus_stop_codes = list()
-    
-    # Stores all coroutines - each coroutine corresponds to getting ETAs for one possible destination
-    async_get_eta_date_tasks = list()
-    
-    # Loop through all possible destinations
-    for bus_stop_name in ordered_subsequent_bus_stop_names:
-        # Get code for the destination bus stop
-        bus_stop_code = subsequent_bus_stop_names_to_codes[bus_stop_name]
-        ordered_subsequent_bus_stop_codes.append(bus_stop_code)
-
-        get_eta_date_task = get_eta_date(
-            conn=conn,
-            bus_num=bus_num,
-            end_bus_stop=bus_stop_code,
-            bus_plate_num=bus_plate_num
-        )
-        async_get_eta_date_tasks.append(get_eta_date_task)
-
-    # Run all ETA fetches concurrently
-    eta_dates = await asyncio.gather(*async_get_eta_date_tasks)
-
-    return eta_dates, ordered_subsequent_bus_stop_codes
-
-
 @st.dialog("Record Your Trip")
 def confirm_record_of_bus_trip(conn: st.connections.SQLConnection, username: str, bus_num: str, bus_plate_num: str, start_bus_stop: str, start_date: datetime.datetime, weather: str, is_starting_bus_stop_terminal: bool, ordered_subsequent_bus_stop_names: list[str], subsequent_bus_stop_names_to_codes: dict[str, str]) -> None:
     # Display bus plate number
@@ -88,6 +62,16 @@ def confirm_record_of_bus_trip(conn: st.connections.SQLConnection, username: str
         selected_end_bus_stop_name = st.selectbox("Choose your destination", options=ordered_subsequent_bus_stop_names)
         selected_end_bus_stop_code = subsequent_bus_stop_names_to_codes[selected_end_bus_stop_name]
 
+        # Get the estimated datetime when user will alight at the chosen destination (using NUSNextBus ETA data)
+        # This is only done once for each destination chosen, so that the ETA reflects the time of boarding
+        if selected_end_bus_stop_code not in st.session_state["eta_dates_dialog"]:
+            st.session_state["eta_dates_dialog"][selected_end_bus_stop_code] = get_eta_date(
+                conn=conn,
+                bus_num=bus_num,
+                end_bus_stop=selected_end_bus_stop_code,
+                bus_plate_num=bus_plate_num
+            )
+
         # Get actual time when user alights at his destination
         current_time = adjust_to_timezone(time=datetime.datetime.now())
         end_time = st.time_input("When did you arrive at your destination?", value=current_time, step=60)
@@ -173,24 +157,9 @@ async def display_waiting_time(conn: st.connections.SQLConnection, username: str
                 else:
                     is_starting_bus_stop_terminal = False
 
-                    # We are about to record a trip, with this bus number and starting from this non-terminal bus stop
-                    # Get all the estimated datetimes when user will alight at 
-                    # all possible destinations (using NUSNextBus ETA data), 
-                    # along with the corresponding ordered list of bus stop codes
-                    # This is only done once, when button is pressed and dialog is about to be opened
-                    # Using async to speed up ETA retrieval
-                    eta_dates, ordered_subsequent_bus_stop_codes = await get_eta_dates_for_subsequent_bus_stops_concurrently(
-                        conn=conn,
-                        ordered_subsequent_bus_stop_names=ordered_subsequent_bus_stop_names,
-                        subsequent_bus_stop_names_to_codes=subsequent_bus_stop_names_to_codes,
-                        bus_num=bus_num,
-                        bus_plate_num=bus_plate_num
-                    )
-
-                    # Store ETAs in session state
-                    st.session_state["eta_dates_dialog"] = dict()       # First reinitialise the dictionary
-                    for ordered_subsequent_bus_stop_code, eta_date in zip(ordered_subsequent_bus_stop_codes, eta_dates):
-                        st.session_state["eta_dates_dialog"][ordered_subsequent_bus_stop_code] = eta_date
+                # ETAs are only fetched for the destinations that the user chooses in the dialog
+                # Clear the ETAs from any previous trip
+                st.session_state["eta_dates_dialog"] = dict()
     
                 # Get current weather
                 weather = get_weather()
@@ -238,7 +207,8 @@ async def display_live_bus_timings(conn: st.connections.SQLConnection, username:
         selected_bus_stop_code = display_bus_stop_selectbox(conn=conn)
 
         # Fetch bus timings for the selected bus stop
-        selected_bus_stop_timings = await fetch_timings_from_api(bus_stop_code=selected_bus_stop_code)
+        # Timings are shared with other users viewing the same bus stop, so that they do not each call the NextBus API
+        selected_bus_stop_timings = await bus_timings_cache.get_timings(bus_stop_code=selected_bus_stop_code)
 
         # Update session state with fetched data
         st.session_state["bus_timings"][selected_bus_stop_code] = selected_bus_stop_timings
@@ -355,8 +325,7 @@ async def main() -> None:
         st.session_state["bus_timings_last_updated"] = dict()
 
     # Initialise dictionary containing the ETAs (datetime format) for
-    # all possible destinations (using NUSNextBus ETA data), 
-    # retrieved when "Record Your Trip" dialog is first opened
+    # the destinations chosen in the "Record Your Trip" dialog (using NUSNextBus ETA data)
     # Maps end bus stop codes to ETAs
     if "eta_dates_dialog" not in st.session_state:
         st.session_state["eta_dates_dialog"] = dict()
@@ -1,7 +1,9 @@
-from moderator.config import IBLOCS_SEM_NUM
+from moderator.config import IBLOCS_SEM_NUM, MAX_UNLOCKED_MODULES_DISPLAYED, PLANNER_MAX_MODULE_OPTIONS, PLAN_GENERATOR_TIME_BUDGET, PLAN_GENERATOR_MAX_BRANCHES
 from moderator.planner.course_plan_checker import CoursePlanChecker
+from moderator.planner.module_search import ModuleSearchIndex
+from moderator.planner.plan_generator import PlanGenerator
 from moderator.planner.save_plan_to_db import insert_valid_plan_into_db
-from moderator.utils.helpers import get_formatted_user_enrollments_from_db
+from moderator.planner.shared_data import load_module_search_index
 import streamlit as st
 import time
 
@@ -11,6 +13,7 @@ def change_default_selection(checker: CoursePlanChecker, acad_year: str, sem_num
     # Get the edited list of selected modules
     selectbox_key = f"mod_selection_{acad_year}_{sem_num}"
     edited_selection = st.session_state[selectbox_key]
+    edited_selection_set = set(edited_selection)
 
     # Update default selection for that selectbox
     checker.set_default_selection_for_term(acad_year=acad_year, sem_num=sem_num, new_default_selection=edited_selection)
@@ -25,7 +28,7 @@ def change_default_selection(checker: CoursePlanChecker, acad_year: str, sem_num
     # Remove modules in the edited selection, from the subsequent semesters in that same AY
     for subsequent_sem_num in subsequent_sem_nums_in_that_ay:
         checker.remove_edited_selection_from_subsequent_selections(
-            edited_selection=edited_selection,
+            edited_selection=edited_selection_set,
             subsequent_selection_acad_year=acad_year,
             subsequent_selection_sem_num=subsequent_sem_num
         )
@@ -34,7 +37,7 @@ def change_default_selection(checker: CoursePlanChecker, acad_year: str, sem_num
     for subsequent_ay in subsequent_ays:
         for subsequent_sem_num in checker.course_default_selections[subsequent_ay].keys():
             checker.remove_edited_selection_from_subsequent_selections(
-                edited_selection=edited_selection,
+                edited_selection=edited_selection_set,
                 subsequent_selection_acad_year=subsequent_ay,
                 subsequent_selection_sem_num=subsequent_sem_num
             )
@@ -53,7 +56,131 @@ def change_default_selection(checker: CoursePlanChecker, acad_year: str, sem_num
             )
             
 
-def display_planner_tabs(checker: CoursePlanChecker) -> tuple[dict[str, dict[int, list[str]]], float]:
+# Callable to keep the modules chosen for the plan generator, when its selection is changed
+# Its options change with every search, which resets the multiselect - so the selection is passed back in as its default
+def change_plan_generator_targets() -> None:
+    st.session_state["plan_generator_default_targets"] = st.session_state["plan_generator_targets"]
+
+
+# Callable to fill up the planner with a generated plan, containing the modules chosen by the user
+def apply_generated_plan(checker: CoursePlanChecker, use_filler_modules: bool) -> None:
+    # Get the modules chosen by the user
+    target_module_codes = [module_name.split()[0] for module_name in st.session_state.get("plan_generator_default_targets", list())]
+
+    # Generate a plan that includes these modules
+    plan_generator = PlanGenerator(checker=checker, max_branches=PLAN_GENERATOR_MAX_BRANCHES)
+    generated_plan = plan_generator.generate(target_module_codes=target_module_codes, time_budget=PLAN_GENERATOR_TIME_BUDGET, use_filler_modules=use_filler_modules)
+    plan_generator_stats = plan_generator.stats
+
+    if generated_plan is None:
+        if plan_generator_stats["unavailable_module_codes"]:
+            st.session_state["plan_generator_message"] = ("error", f"The following courses are not offered during your candidature: {', '.join(plan_generator_stats['unavailable_module_codes'])}.")
+
+        elif plan_generator_stats["is_timed_out"]:
+            st.session_state["plan_generator_message"] = ("error", "Unable to find a course plan in time. Try choosing fewer courses.")
+
+        else:
+            st.session_state["plan_generator_message"] = ("error", "There is no course plan that includes all of the chosen courses.")
+
+        return
+
+    # Update the default selection of each selectbox with the generated plan
+    for acad_year, sem_num in checker.terms:
+        available_module_codes, available_module_names = checker.get_available_module_options_for_term(acad_year=acad_year, sem_num=sem_num)
+        module_codes_to_names = dict(zip(available_module_codes, available_module_names))
+        checker.set_default_selection_for_term(
+            acad_year=acad_year,
+            sem_num=sem_num,
+            new_default_selection=[module_codes_to_names[module_code] for module_code in generated_plan[acad_year][sem_num]]
+        )
+
+        # Drop the existing selection, so that the selectbox starts off with its new default selection
+        st.session_state.pop(f"mod_selection_{acad_year}_{sem_num}", None)
+
+    st.session_state["plan_generator_message"] = ("success", "Course plan has been generated! Please review it below.")
+
+
+def get_module_name_options(module_search_index: ModuleSearchIndex, search_query: str, module_name_choices: list[str], selected_module_names: list[str]) -> list[str]:
+    # Only the courses that best match the user's search are sent to the browser, rather than every course offered
+    # Courses that are already selected must always remain as options
+    matching_module_names = module_search_index.search(query=search_query, module_names=module_name_choices, limit=PLANNER_MAX_MODULE_OPTIONS)
+
+    return list(dict.fromkeys(selected_module_names + matching_module_names))
+
+
+def display_search_hint(search_query: str, num_module_name_choices: int) -> None:
+    if not search_query and num_module_name_choices > PLANNER_MAX_MODULE_OPTIONS:
+        st.caption(f"Showing {PLANNER_MAX_MODULE_OPTIONS} of {num_module_name_choices} courses. Search to find the rest.")
+
+
+def display_plan_generator(checker: CoursePlanChecker, module_search_index: ModuleSearchIndex) -> None:
+    with st.expander("Generate a course plan"):
+        # Get all the modules that the user can take during his / her candidature
+        module_name_choices = set()
+        for acad_year, sem_num in checker.terms:
+            _, available_module_names = checker.get_available_module_options_for_term(acad_year=acad_year, sem_num=sem_num)
+            module_name_choices.update(available_module_names)
+
+        search_query = st.text_input(
+            label="Courses to include",
+            placeholder="Search courses by code, title or description",
+            key="plan_generator_search"
+        )
+        module_name_choices = sorted(module_name_choices)
+        display_search_hint(search_query=search_query, num_module_name_choices=len(module_name_choices))
+
+        # Chosen modules that are no longer offered during the user's candidature are dropped
+        default_targets = [module_name for module_name in st.session_state.get("plan_generator_default_targets", list()) if module_name in module_name_choices]
+        st.multiselect(
+            label="Courses to include",
+            options=get_module_name_options(
+                module_search_index=module_search_index,
+                search_query=search_query,
+                module_name_choices=module_name_choices,
+                selected_module_names=default_targets
+            ),
+            placeholder="Add courses",
+            default=default_targets,
+            on_change=change_plan_generator_targets,
+            key="plan_generator_targets",
+            label_visibility="collapsed"
+        )
+        use_filler_modules = st.checkbox("Fill up terms with other courses, to meet the minimum MCs", value=True)
+        st.button("Generate Plan", on_click=apply_generated_plan, args=(checker, use_filler_modules))
+
+        # Display results of the last generation
+        if "plan_generator_message" in st.session_state:
+            message_type, message = st.session_state.pop("plan_generator_message")
+            message_function = {
+                "success": st.success,
+                "error": st.error
+            }
+            message_function[message_type](message)
+
+
+def display_unlocked_modules(checker: CoursePlanChecker, selected_module_names: list[str], acad_year: str) -> None:
+    # Show the courses that each selected course directly unlocks, based on the prerequisite graph of that AY
+    prereq_graph = checker.get_prereq_graph(acad_year=acad_year)
+    unlocked_module_lines = list()
+    for module_name in selected_module_names:
+        module_code = module_name.split()[0]
+        unlocked_module_codes = prereq_graph.get_unlocked_module_codes(module_code)
+        if not unlocked_module_codes:
+            continue
+
+        unlocked_modules_text = ", ".join(unlocked_module_codes[:MAX_UNLOCKED_MODULES_DISPLAYED])
+        num_unlocked_modules_hidden = len(unlocked_module_codes) - MAX_UNLOCKED_MODULES_DISPLAYED
+        if num_unlocked_modules_hidden > 0:
+            unlocked_modules_text += f" and {num_unlocked_modules_hidden} more"
+
+        unlocked_module_lines.append(f"- **{module_code}**: {unlocked_modules_text}")
+
+    if unlocked_module_lines:
+        with st.expander("Courses that this selection can help to unlock"):
+            st.markdown("\n".join(unlocked_module_lines))
+
+
+def display_planner_tabs(checker: CoursePlanChecker, module_search_index: ModuleSearchIndex, sort_by_unlocks: bool) -> tuple[dict[str, dict[int, list[str]]], float]:
     # Get AYs to consider for this user, starting from IBLOCs term
     ays_for_user = checker.ays_for_user
     ibloc_ay, matriculation_ay = ays_for_user[0], ays_for_user[1]      # User can take IBLOCs the AY before he / she matriculates
@@ -75,7 +202,7 @@ def display_planner_tabs(checker: CoursePlanChecker) -> tuple[dict[str, dict[int
 
             # Add a multi-module selection field for each term in the AY
             # Semester info is a list of lists in the form (sem_num, sem_name, min_mcs)
-            for sem_num, sem_name, sem_min_mcs in checker._sem_info:
+            for sem_num, sem_name, sem_min_mcs in checker.sem_info:
                 # If this is an IBLOC AY, only need to consider one term (ie. sem_num = 3 aka Special Term 1)
                 if acad_year == ibloc_ay and sem_num != IBLOCS_SEM_NUM:
                     continue
@@ -90,21 +217,39 @@ def display_planner_tabs(checker: CoursePlanChecker) -> tuple[dict[str, dict[int
                     sem_num=sem_num
                 )
 
+                # Courses that lead on to many other courses can be listed first
+                if sort_by_unlocks:
+                    module_name_choices = checker.rank_mod_choices_by_unlocks(module_name_choices=module_name_choices, acad_year=acad_year)
+
                 # Get the default selection for this term's selectbox, based on previous responses of user
                 default_selection_for_term = checker.get_default_selection_for_term_during_check(
                     acad_year=acad_year,
                     sem_num=sem_num
                 )
 
-                # Get user's selection of modules
+                # Get user's search for this term
+                search_query = st.text_input(
+                    label=sem_name,
+                    placeholder="Search courses by code, title or description",
+                    key=f"mod_search_{acad_year}_{sem_num}"
+                )
+                display_search_hint(search_query=search_query, num_module_name_choices=len(module_name_choices))
+
+                # Get user's selection of modules, among the courses matching the search
                 selected_module_names = st.multiselect(
                     label=sem_name,
-                    options=module_name_choices,
+                    options=get_module_name_options(
+                        module_search_index=module_search_index,
+                        search_query=search_query,
+                        module_name_choices=module_name_choices,
+                        selected_module_names=default_selection_for_term
+                    ),
                     placeholder="Add courses",
                     default=default_selection_for_term,
                     on_change=change_default_selection,
                     args=(checker, acad_year, sem_num),
-                    key=f"mod_selection_{acad_year}_{sem_num}"
+                    key=f"mod_selection_{acad_year}_{sem_num}",
+                    label_visibility="collapsed"
                 )
 
                 # Check user's module selection for the new term, based on his / her current plan, and get the validation results
@@ -131,6 +276,9 @@ def display_planner_tabs(checker: CoursePlanChecker) -> tuple[dict[str, dict[int
                 }
                 message_function[message_type](message)
 
+                # Display courses that the selection can help to unlock
+                display_unlocked_modules(checker=checker, selected_module_names=selected_module_names, acad_year=acad_year)
+
                 is_y1s1_for_user = False
                 is_first_sem_of_ay = False
 
@@ -146,11 +294,8 @@ def confirm_saving_of_plan(conn: st.connections.SQLConnection, username: str, pl
     cancel_button = st.button("No")
 
     if confirm_button:
-        # Add plan to database
-        insert_valid_plan_into_db(conn=conn, username=username, plan=plan)
-
-        # Get formatted plan from database
-        formatted_plan = get_formatted_user_enrollments_from_db(conn=conn, username=username)
+        # Add plan to database, and get the formatted plan that was saved
+        formatted_plan = insert_valid_plan_into_db(conn=conn, username=username, plan=plan)
 
         # Update user with this updated and formatted plan
         user.user_enrollments = formatted_plan
@@ -170,7 +315,7 @@ conn = st.session_state["conn"]
 # Get user saved in session state
 user = st.session_state["user"]
 
-# Initialise course plan checker if it does not exist. Otherwise, reset existing checker
+# Initialise course plan checker if it does not exist
 if "course_plan_checker" not in st.session_state:
     st.session_state["course_plan_checker"] = CoursePlanChecker(
         conn=conn,
@@ -178,8 +323,8 @@ if "course_plan_checker" not in st.session_state:
         list_of_ays=st.session_state["list_of_ays"]
     )
 
-else:
-    st.session_state["course_plan_checker"].reset()
+# Only the terms that were edited since the last rerun (and the terms after them) need to be checked again
+st.session_state["course_plan_checker"].prepare_for_rerun()
 
 # Display header and introduction
 st.header("Course Planner")
@@ -188,14 +333,28 @@ st.markdown(
     **Note**:
     - You can only plan for courses up until the current AY.
     - We are unable to retrieve prerequisite information for AY2022-2023 - for this, data from AY2023-2024 is used instead.
-    - This planner does not take preclusions into account.
+    - Preclusions and corequisites are checked using the rules listed on NUSMods.
     - Before saving a course plan to your profile, please make sure that you have fulfilled all prerequisite requirements.
     """
 )
 
+# Get the search index over all courses, shared by all users
+module_search_index = load_module_search_index(_conn=conn)
+
+# Display generator for course plans
+display_plan_generator(checker=st.session_state["course_plan_checker"], module_search_index=module_search_index)
+
+# Allow user to choose how the courses offered are ordered
+sort_order = st.radio(
+    label="Sort courses by",
+    options=["Course code", "Number of courses unlocked"],
+    horizontal=True,
+    key="planner_sort_order"
+)
+
 # Display buttons to update data
 with st.container(border=True):
-    plan, total_mcs_taken = display_planner_tabs(checker=st.session_state["course_plan_checker"])
+    plan, total_mcs_taken = display_planner_tabs(checker=st.session_state["course_plan_checker"], module_search_index=module_search_index, sort_by_unlocks=sort_order == "Number of courses unlocked")
 
 st.divider()
 
@@ -1,27 +1,17 @@
-from moderator.sql.bus_routes import GET_SUBSEQUENT_BUS_STOPS_QUERY
-import pandas as pd
+from moderator.bus_services.shared_data import load_bus_route_index
 import streamlit as st
 
 
 def get_subsequent_bus_stops(conn: st.connections.SQLConnection, bus_num: str, bus_stop_code: str) -> tuple[list[str], dict[str, str]]:
-    # Get dataframe of subsequent bus stop codes and names (in sequential order of route)
-    subsequent_bus_stops_df = conn.query(
-        GET_SUBSEQUENT_BUS_STOPS_QUERY,
-        params={
-            "bus_num": bus_num,
-            "bus_stop_code": bus_stop_code
-        },
-        ttl=3600
-    )
+    # Get the shared route index, so that no query is needed
+    route_index = load_bus_route_index(_conn=conn)
 
-    # Get ordered list of subsequent bus stop names
-    ordered_subsequent_bus_stop_names = list(subsequent_bus_stops_df["display_name"])
+    # Get ordered list of subsequent bus stop codes and names (in sequential order of route)
+    ordered_subsequent_bus_stop_codes = route_index.get_subsequent_bus_stop_codes(bus_num=bus_num, bus_stop_code=bus_stop_code)
+    ordered_subsequent_bus_stop_names = [route_index.get_bus_stop_name(bus_stop_code=subsequent_bus_stop_code) for subsequent_bus_stop_code in ordered_subsequent_bus_stop_codes]
 
     # Get mapping of these bus stop names to their bus stop codes
-    subsequent_bus_stop_names_to_codes = pd.Series(
-        subsequent_bus_stops_df["bus_stop_code"].values,
-        index=subsequent_bus_stops_df["display_name"]
-    ).to_dict()
+    subsequent_bus_stop_names_to_codes = dict(zip(ordered_subsequent_bus_stop_names, ordered_subsequent_bus_stop_codes))
 
     return ordered_subsequent_bus_stop_names, subsequent_bus_stop_names_to_codes
 
@@ -0,0 +1,151 @@
+import aiohttp
+import asyncio
+from moderator.config import NEXTBUS_API_BASE_URL, NEXTBUS_POOL_SIZE, NEXTBUS_KEEPALIVE_TIMEOUT, NEXTBUS_TIMEOUT, NEXTBUS_MAX_CONCURRENT_REQUESTS, NEXTBUS_MAX_RETRIES, NEXTBUS_RETRY_BACKOFF
+from moderator.utils.http_client import HttpRequestError
+import random
+import threading
+from typing import Any, Coroutine
+
+# Status codes that are worth retrying - upstream is likely to recover shortly
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+# Client for the NextBus API, shared by all sessions
+# An aiohttp session is tied to the event loop it was created on, while every Streamlit session runs its own
+# short-lived event loop. So the client runs a long-lived event loop in a background thread, which owns a single
+# aiohttp session. Requests from any session are handed over to that loop, and reuse its warm keep-alive connections
+class NextBusClient(object):
+    def __init__(self, base_url: str, pool_size: int, keepalive_timeout: float, timeout: float, max_concurrent_requests: int, max_retries: int, retry_backoff: float) -> None:
+        self._base_url = base_url
+        self._pool_size = pool_size
+        self._keepalive_timeout = keepalive_timeout
+        self._timeout = timeout
+        self._max_concurrent_requests = max_concurrent_requests
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+
+        # The event loop, its thread and the aiohttp session are only started on first use
+        self._start_lock = threading.Lock()
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+
+        # Keep track of the requests made
+        # "requests": Requests made to the NextBus API (excluding retries)
+        # "retries": Requests that were retried after a failed attempt
+        # "failures": Requests that still failed after all retries
+        # "connections_created": New connections opened (each one pays for a fresh TCP and TLS handshake)
+        # "connections_reused": Requests sent over a warm keep-alive connection
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "connections_created": 0,
+            "connections_reused": 0
+        }
+
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return self._stats.copy()
+
+
+    def increment_stat(self, stat_name: str) -> None:
+        with self._stats_lock:
+            self._stats[stat_name] += 1
+
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="nextbus_client", daemon=True).start()
+
+                # The session (and everything else bound to the loop) must be created on the loop itself
+                asyncio.run_coroutine_threadsafe(self.create_session(), loop).result()
+                self._loop = loop
+
+            return self._loop
+
+
+    async def create_session(self) -> None:
+        # Count new and reused connections, to see how well the pool is working
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self.on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self.on_connection_reuseconn)
+
+        self._session = aiohttp.ClientSession(
+            base_url=self._base_url,
+            connector=aiohttp.TCPConnector(limit=self._pool_size, keepalive_timeout=self._keepalive_timeout),
+            timeout=aiohttp.ClientTimeout(total=self._timeout),
+            trace_configs=[trace_config]
+        )
+        self._semaphore = asyncio.Semaphore(self._max_concurrent_requests)
+
+
+    async def on_connection_create_end(self, session: aiohttp.ClientSession, context: Any, params: aiohttp.TraceConnectionCreateEndParams) -> None:
+        self.increment_stat("connections_created")
+
+
+    async def on_connection_reuseconn(self, session: aiohttp.ClientSession, context: Any, params: aiohttp.TraceConnectionReuseconnParams) -> None:
+        self.increment_stat("connections_reused")
+
+
+    async def fetch_json(self, path: str, params: dict[str, str]) -> Any:
+        # Runs on the client's event loop
+        self.increment_stat("requests")
+        async with self._semaphore:
+            for attempt_num in range(self._max_retries + 1):
+                if attempt_num > 0:
+                    # Back off exponentially, with jitter so that retries from many sessions do not line up
+                    self.increment_stat("retries")
+                    await asyncio.sleep(self._retry_backoff * 2 ** (attempt_num - 1) * random.uniform(0.5, 1.5))
+
+                is_last_attempt = attempt_num == self._max_retries
+                try:
+                    async with self._session.get(path, params=params) as response:
+                        if response.status in RETRYABLE_STATUS_CODES and not is_last_attempt:
+                            continue
+
+                        if response.status != 200:
+                            # Something went wrong with the fetch
+                            raise HttpRequestError(url=str(response.url), status_code=response.status)
+
+                        # NextBus labels its JSON responses as text/html
+                        return await response.json(content_type=None)
+
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if is_last_attempt:
+                        self.increment_stat("failures")
+                        raise
+
+                except HttpRequestError:
+                    self.increment_stat("failures")
+                    raise
+
+
+    # Runs a coroutine on the client's event loop, and waits for its result
+    # Unlike asyncio.run(), this can be called from code that is itself running inside an event loop (eg. a Streamlit dialog)
+    def run(self, coroutine: Coroutine[Any, Any, Any]) -> Any:
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+    # Can be awaited from any event loop
+    async def get_json(self, path: str, params: dict[str, str]) -> Any:
+        loop = self.start()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.fetch_json(path=path, params=params), loop))
+
+
+# Process-wide client, shared by all sessions
+nextbus_client = NextBusClient(
+    base_url=NEXTBUS_API_BASE_URL,
+    pool_size=NEXTBUS_POOL_SIZE,
+    keepalive_timeout=NEXTBUS_KEEPALIVE_TIMEOUT,
+    timeout=NEXTBUS_TIMEOUT,
+    max_concurrent_requests=NEXTBUS_MAX_CONCURRENT_REQUESTS,
+    max_retries=NEXTBUS_MAX_RETRIES,
+    retry_backoff=NEXTBUS_RETRY_BACKOFF
+)
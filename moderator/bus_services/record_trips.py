@@ -1,24 +1,19 @@
 import datetime
-from moderator.bus_services.fetch_timings import fetch_timings_from_api
-from moderator.config import TERMINAL_BUS_STOP_SEQ_NUM, WEATHER_API_URL, NUS_REGION
-from moderator.sql.bus_routes import GET_TERMINAL_BUS_STOP_QUERY
+from moderator.bus_services.nextbus_client import nextbus_client
+from moderator.bus_services.shared_data import load_bus_route_index
+from moderator.bus_services.timings_cache import bus_timings_cache
+from moderator.config import WEATHER_API_URL, WEATHER_CACHE_TTL, NUS_REGION
 from moderator.sql.bus_trips import INSERT_BUS_TRIP_STATEMENT
 from moderator.utils.helpers import adjust_to_timezone
-import requests
+from moderator.utils.http_client import http_client
 import streamlit as st
 from sqlalchemy import text
 
 
-async def get_eta_date(conn: st.connections.SQLConnection, bus_num: str, end_bus_stop: str, bus_plate_num: str) -> datetime.datetime:
-    # Check if end bus stop is terminal
-    terminal_bus_stop_code = conn.query(
-        GET_TERMINAL_BUS_STOP_QUERY,
-        params={
-            "bus_num": bus_num,
-            "max_seq_num": TERMINAL_BUS_STOP_SEQ_NUM
-        },
-        ttl=3600
-    ).iloc[0]["bus_stop_code"]
+# Only called for the destination that the user has chosen, rather than for every bus stop after the starting one
+def get_eta_date(conn: st.connections.SQLConnection, bus_num: str, end_bus_stop: str, bus_plate_num: str) -> datetime.datetime | None:
+    # Check if end bus stop is terminal, using the shared route index
+    terminal_bus_stop_code = load_bus_route_index(_conn=conn).get_terminal_bus_stop_code(bus_num=bus_num)
 
     if end_bus_stop == terminal_bus_stop_code:
         # End bus stop is terminal. Bus data from API does not contain any information about ETA at terminal bus stop
@@ -27,8 +22,9 @@ async def get_eta_date(conn: st.connections.SQLConnection, bus_num: str, end_bus
     else:
         # End bus stop is not terminal. We can get ETA at this bus stop by getting the updated bus timings
         # for destination bus stop and looking for the license plate number of the bus that the user has boarded
-        end_bus_stop_bus_timings_fetched = await fetch_timings_from_api(bus_stop_code=end_bus_stop)
-        end_bus_stop_bus_timings = end_bus_stop_bus_timings_fetched[bus_num]["bus_timings"]
+        # Timings come from the shared cache, which may already hold them if other users are viewing this bus stop
+        end_bus_stop_bus_timings_fetched, end_bus_stop_bus_timings_age = nextbus_client.run(bus_timings_cache.get_timings_with_age(bus_stop_code=end_bus_stop))
+        end_bus_stop_bus_timings = end_bus_stop_bus_timings_fetched.get(bus_num, dict()).get("bus_timings", dict())
         if bus_plate_num not in end_bus_stop_bus_timings:
             # Cannot find the bus the user has boarded
             # Could be because bus has already left the destination bus stop
@@ -37,7 +33,8 @@ async def get_eta_date(conn: st.connections.SQLConnection, bus_num: str, end_bus
 
         else:
             # Get ETA at destination, in seconds. Use it to get ETA in datetime format
-            eta_time = end_bus_stop_bus_timings[bus_plate_num]
+            # Cached timings are slightly old, so the time elapsed since they were fetched is deducted
+            eta_time = end_bus_stop_bus_timings[bus_plate_num] - end_bus_stop_bus_timings_age
             eta_date_without_timezone_shift = datetime.datetime.now() + datetime.timedelta(seconds=eta_time)
             eta_date = adjust_to_timezone(time=eta_date_without_timezone_shift)
 
@@ -46,15 +43,11 @@ async def get_eta_date(conn: st.connections.SQLConnection, bus_num: str, end_bus
 
 def get_weather() -> str:
     # Get 2 hour weather forecast from data.gov.sg API
-    weather_forecast_response = requests.get(
-        url=WEATHER_API_URL
-    )
-
-    if weather_forecast_response.status_code != 200:
-        raise Exception("Unsuccessful request to weather API")
+    # The forecast only changes every few minutes, so a cached copy can be shared by all users
+    weather_forecast_json = http_client.get_json(url=WEATHER_API_URL, ttl=WEATHER_CACHE_TTL)
     
     # Get list of weather forecasts for various regions in Singapore
-    [weather_data_unpacked,] = weather_forecast_response.json()["data"]["items"]
+    [weather_data_unpacked,] = weather_forecast_json["data"]["items"]
     forecasts = weather_data_unpacked["forecasts"]
 
     # Get weather forecast for NUS
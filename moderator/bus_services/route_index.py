@@ -0,0 +1,88 @@
+from moderator.config import TERMINAL_BUS_STOP_SEQ_NUM
+import sys
+
+
+# Read-only index of the bus routes, shared by all users
+# Built once from the bus_routes and bus_stops tables, so that recording a trip does not need to query the routes
+class BusRouteIndex(object):
+    def __init__(self, routes: dict[str, tuple[str, ...]], terminal_bus_stop_codes: dict[str, str], bus_stop_names: dict[str, str]) -> None:
+        # Maps each bus number to its bus stop codes, in sequential order of route
+        self._routes = routes
+
+        # Maps each bus number to the code of its terminal bus stop
+        self._terminal_bus_stop_codes = terminal_bus_stop_codes
+
+        # Maps each bus stop code to its display name
+        self._bus_stop_names = bus_stop_names
+
+        # Maps each bus number to a mapping of its bus stop codes to their positions in the route
+        # A bus stop can appear more than once in a route (eg. a loop service starts and ends at the same bus stop)
+        self._positions = dict()
+        for bus_num, route in routes.items():
+            bus_num_positions = dict()
+            for position, bus_stop_code in enumerate(route):
+                bus_num_positions.setdefault(bus_stop_code, list()).append(position)
+
+            self._positions[bus_num] = {bus_stop_code: tuple(positions) for bus_stop_code, positions in bus_num_positions.items()}
+
+
+    @classmethod
+    def from_rows(cls, route_rows: list[list[str | int]], bus_stop_rows: list[list[str | float]]) -> "BusRouteIndex":
+        # Route rows are in the form (bus_num, bus_stop_code, seq_num)
+        # Seq num of the terminal bus stop is always TERMINAL_BUS_STOP_SEQ_NUM, so it is last in the route
+        sorted_route_rows = sorted(route_rows, key=lambda route_row: (route_row[0], int(route_row[2])))
+        routes = dict()
+        terminal_bus_stop_codes = dict()
+        for bus_num, bus_stop_code, seq_num in sorted_route_rows:
+            bus_stop_code = sys.intern(bus_stop_code)
+            routes.setdefault(bus_num, list()).append(bus_stop_code)
+            if int(seq_num) == TERMINAL_BUS_STOP_SEQ_NUM:
+                terminal_bus_stop_codes[bus_num] = bus_stop_code
+
+        # Bus stop rows are in the form (bus_stop_code, bus_stop_name, bus_stop_lat, bus_stop_long)
+        bus_stop_names = {sys.intern(bus_stop_code): bus_stop_name for bus_stop_code, bus_stop_name, bus_stop_lat, bus_stop_long in bus_stop_rows}
+
+        return cls(
+            routes={bus_num: tuple(route) for bus_num, route in routes.items()},
+            terminal_bus_stop_codes=terminal_bus_stop_codes,
+            bus_stop_names=bus_stop_names
+        )
+
+
+    @property
+    def bus_nums(self) -> list[str]:
+        return sorted(self._routes)
+
+
+    @property
+    def bus_stop_codes(self) -> list[str]:
+        return sorted(self._bus_stop_names)
+
+
+    def get_bus_stop_names_to_codes(self) -> dict[str, str]:
+        return {bus_stop_name: bus_stop_code for bus_stop_code, bus_stop_name in self._bus_stop_names.items()}
+
+
+    def get_bus_stop_name(self, bus_stop_code: str) -> str | None:
+        return self._bus_stop_names.get(bus_stop_code)
+
+
+    def get_route(self, bus_num: str) -> tuple[str, ...]:
+        return self._routes.get(bus_num, ())
+
+
+    def get_terminal_bus_stop_code(self, bus_num: str) -> str | None:
+        return self._terminal_bus_stop_codes.get(bus_num)
+
+
+    def get_positions(self, bus_num: str, bus_stop_code: str) -> tuple[int, ...]:
+        return self._positions.get(bus_num, dict()).get(bus_stop_code, ())
+
+
+    def get_subsequent_bus_stop_codes(self, bus_num: str, bus_stop_code: str) -> tuple[str, ...]:
+        # Bus stops after the first time the bus reaches the given bus stop, in sequential order of route
+        positions = self.get_positions(bus_num=bus_num, bus_stop_code=bus_stop_code)
+        if not positions:
+            return ()
+
+        return self._routes[bus_num][positions[0] + 1:]
@@ -0,0 +1,22 @@
+from moderator.bus_services.route_index import BusRouteIndex
+from moderator.sql.bus_routes import GET_BUS_ROUTES_QUERY
+from moderator.sql.bus_stops import GET_BUS_STOPS_QUERY
+import streamlit as st
+
+
+# Bus route data is identical for every user, so it is loaded once per process, and shared by all sessions
+# It only changes when an admin refreshes the bus database - reload_shared_bus_data() must then be called
+@st.cache_resource(show_spinner=False)
+def load_bus_route_index(_conn: st.connections.SQLConnection) -> BusRouteIndex:
+    # List of lists in the form (bus_num, bus_stop_code, seq_num)
+    route_rows = _conn.query(GET_BUS_ROUTES_QUERY, ttl=0).values.tolist()
+
+    # List of lists in the form (bus_stop_code, bus_stop_name, bus_stop_lat, bus_stop_long)
+    bus_stop_rows = _conn.query(GET_BUS_STOPS_QUERY, ttl=0).values.tolist()
+
+    return BusRouteIndex.from_rows(route_rows=route_rows, bus_stop_rows=bus_stop_rows)
+
+
+def reload_shared_bus_data() -> None:
+    # Drop the shared bus data, so that it is reloaded from the database on next use
+    load_bus_route_index.clear()
@@ -0,0 +1,127 @@
+import asyncio
+from concurrent.futures import Future
+from moderator.bus_services.fetch_timings import fetch_timings_from_api
+from moderator.config import BUS_TIMINGS_CACHE_TTL
+import threading
+import time
+
+
+# Cache of the parsed bus timings of each bus stop, shared by all sessions
+# Every session runs in its own thread (with its own event loop), so the cache is guarded by a threading lock
+# When the timings of a bus stop expire, only one session fetches them from the NextBus API (single-flight).
+# Other sessions that ask for the same bus stop in the meantime wait for that fetch, instead of making their own
+class BusTimingsCache(object):
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._lock = threading.Lock()
+
+        # Maps bus stop codes to (fetched_at, bus_stop_timings)
+        self._entries = dict()
+
+        # Maps bus stop codes to the fetches that are in progress
+        # Thread-safe futures are used, since the waiting sessions run on different event loops
+        self._in_flight_fetches = dict()
+
+        # Keep track of how each request was served
+        # "hits": Served from the cache
+        # "shared_fetches": Waited for a fetch started by another session
+        # "upstream_calls": Fetched from the NextBus API
+        # "upstream_errors": Fetches from the NextBus API that failed
+        self._stats = {
+            "hits": 0,
+            "shared_fetches": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0
+        }
+        self._started_at = time.monotonic()
+
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            stats = self._stats.copy()
+
+        # Share of requests that did not need their own upstream call, and upstream calls made per minute
+        num_requests = stats["hits"] + stats["shared_fetches"] + stats["upstream_calls"]
+        num_mins_elapsed = (time.monotonic() - self._started_at) / 60
+        stats["hit_rate"] = (stats["hits"] + stats["shared_fetches"]) / num_requests if num_requests else 0.0
+        stats["upstream_calls_per_min"] = stats["upstream_calls"] / num_mins_elapsed if num_mins_elapsed else 0.0
+
+        return stats
+
+
+    # The timings returned are shared by all sessions, and must not be modified
+    async def get_timings(self, bus_stop_code: str) -> dict[str, dict[str, dict[str, str | int | None]]]:
+        bus_stop_timings, timings_age = await self.get_timings_with_age(bus_stop_code=bus_stop_code)
+        return bus_stop_timings
+
+
+    # Also returns how long ago (in seconds) the timings were fetched, so that ETAs can be adjusted for it
+    async def get_timings_with_age(self, bus_stop_code: str) -> tuple[dict[str, dict[str, dict[str, str | int | None]]], float]:
+        is_fetching = False
+        with self._lock:
+            # Serve the cached timings if they are still fresh
+            entry = self._entries.get(bus_stop_code)
+            if entry is not None and time.monotonic() - entry[0] < self._ttl:
+                self._stats["hits"] += 1
+                return entry[1], time.monotonic() - entry[0]
+
+            # Wait for the fetch of another session, if there is one
+            in_flight_fetch = self._in_flight_fetches.get(bus_stop_code)
+            if in_flight_fetch is not None:
+                self._stats["shared_fetches"] += 1
+
+            else:
+                # This session is the one that fetches the timings
+                # The fetch is marked as running, so that it can no longer be cancelled - only its own session decides how it ends
+                in_flight_fetch = Future()
+                in_flight_fetch.set_running_or_notify_cancel()
+                self._in_flight_fetches[bus_stop_code] = in_flight_fetch
+                self._stats["upstream_calls"] += 1
+                is_fetching = True
+
+        if not is_fetching:
+            # Result of the fetch is in the form (fetched_at, bus_stop_timings)
+            # Shielded, so that a waiting session that is cancelled does not cancel the fetch shared with the other sessions
+            fetched_at, bus_stop_timings = await asyncio.shield(asyncio.wrap_future(in_flight_fetch))
+            return bus_stop_timings, time.monotonic() - fetched_at
+
+        try:
+            bus_stop_timings = await fetch_timings_from_api(bus_stop_code=bus_stop_code)
+
+        except BaseException as e:
+            # The in-flight fetch must always be cleared and resolved, even if this session is cancelled (eg. the user
+            # navigated away), or other sessions would wait on it forever
+            with self._lock:
+                self._stats["upstream_errors"] += 1
+                del self._in_flight_fetches[bus_stop_code]
+
+            # Waiting sessions get the same error. A cancellation is only meant for this session, so they get an error instead
+            if not in_flight_fetch.cancelled():
+                if isinstance(e, Exception):
+                    in_flight_fetch.set_exception(e)
+
+                else:
+                    in_flight_fetch.set_exception(RuntimeError(f"Fetch of bus timings for bus stop {bus_stop_code} was interrupted"))
+
+            raise
+
+        entry = (time.monotonic(), bus_stop_timings)
+        with self._lock:
+            self._entries[bus_stop_code] = entry
+            del self._in_flight_fetches[bus_stop_code]
+
+        if not in_flight_fetch.cancelled():
+            in_flight_fetch.set_result(entry)
+
+        return bus_stop_timings, 0.0
+
+
+    # Timings fetched elsewhere (eg. by the background poller) can be put into the cache directly
+    def put(self, bus_stop_code: str, bus_stop_timings: dict[str, dict[str, dict[str, str | int | None]]]) -> None:
+        with self._lock:
+            self._entries[bus_stop_code] = (time.monotonic(), bus_stop_timings)
+
+
+# Process-wide cache, shared by all sessions
+bus_timings_cache = BusTimingsCache(ttl=BUS_TIMINGS_CACHE_TTL)
@@ -0,0 +1,205 @@
+import asyncio
+from collections import deque
+import datetime
+from moderator.bus_services.fetch_timings import fetch_timings_from_api
+from moderator.bus_services.nextbus_client import nextbus_client
+from moderator.bus_services.timings_cache import bus_timings_cache
+from moderator.config import BUS_POLLER_DATA_DIR, BUS_POLLER_INTERVAL, BUS_POLLER_MAX_CONCURRENT_FETCHES, BUS_POLLER_FLUSH_INTERVAL, BUS_POLLER_RING_BUFFER_SIZE
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+import threading
+import time
+import traceback
+from typing import Callable
+
+# Schema of the records stored for each snapshot
+# Each record is the ETA (in seconds) of one bus (identified by its plate number) at one bus stop, at the time of observation
+# Bus stops and services repeat across records, so they are dictionary-encoded
+SNAPSHOT_SCHEMA = pa.schema([
+    ("bus_stop_code", pa.dictionary(pa.int16(), pa.string())),
+    ("bus_num", pa.dictionary(pa.int16(), pa.string())),
+    ("plate_num", pa.string()),
+    ("eta_s", pa.int32()),
+    ("observed_at", pa.timestamp("ms", tz="UTC"))
+])
+
+
+# Polls the timings of every bus stop on a fixed cadence, in the background, independently of any Streamlit session
+# - Each poll (snapshot) is kept in memory for a while, in a ring buffer of Arrow tables
+# - Snapshots are periodically written to Parquet files, partitioned by date and hour
+# - Timings fetched are also put into the shared timings cache, so that users viewing the live page are served from it
+# The poller runs on the event loop of the NextBus client, so that it shares its connection pool
+class BusTimingsPoller(object):
+    def __init__(self, data_dir: str, poll_interval: float, max_concurrent_fetches: int, flush_interval: float, ring_buffer_size: int) -> None:
+        self._data_dir = data_dir
+        self._poll_interval = poll_interval
+        self._max_concurrent_fetches = max_concurrent_fetches
+        self._flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._bus_stop_codes = ()
+        self._poll_task = None
+
+        # Functions called with each new snapshot (eg. to reconstruct bus trajectories)
+        self._snapshot_listeners = ()
+
+        # Latest snapshots (Arrow tables), oldest first
+        self._recent_snapshots = deque(maxlen=ring_buffer_size)
+
+        # Snapshots that have not been written to disk yet
+        self._unflushed_snapshots = list()
+        self._last_flushed_at = time.monotonic()
+
+        # Keep track of the polling
+        # "polls": Snapshots taken
+        # "records": Records collected
+        # "failed_fetches": Bus stops whose timings could not be fetched
+        # "files_written": Parquet files written
+        # "last_poll_duration": Time (in seconds) taken by the latest poll
+        self._stats = {
+            "polls": 0,
+            "records": 0,
+            "failed_fetches": 0,
+            "files_written": 0,
+            "last_poll_duration": 0.0
+        }
+
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return self._stats.copy()
+
+
+    @property
+    def is_running(self) -> bool:
+        return self._poll_task is not None
+
+
+    def start(self, bus_stop_codes: list[str], snapshot_listeners: list[Callable[[pa.Table], object]] | None = None) -> None:
+        # Can be called on every app run - the bus stops are updated, but the poller is only started once
+        with self._lock:
+            self._bus_stop_codes = tuple(bus_stop_codes)
+            self._snapshot_listeners = tuple(snapshot_listeners or ())
+            if self._poll_task is not None:
+                return
+
+            self._poll_task = asyncio.run_coroutine_threadsafe(self.poll_forever(), nextbus_client.start())
+
+
+    def get_recent_snapshots(self) -> list[pa.Table]:
+        with self._lock:
+            return list(self._recent_snapshots)
+
+
+    async def poll_forever(self) -> None:
+        while True:
+            poll_started_at = time.monotonic()
+            try:
+                await self.poll()
+
+            except Exception:
+                # Keep polling - the next poll might succeed
+                traceback.print_exc()
+
+            poll_duration = time.monotonic() - poll_started_at
+            with self._lock:
+                self._stats["last_poll_duration"] = poll_duration
+
+            await asyncio.sleep(max(self._poll_interval - poll_duration, 0))
+
+
+    async def fetch_bus_stop_records(self, semaphore: asyncio.Semaphore, bus_stop_code: str) -> list[tuple[str, str, str, int, datetime.datetime]]:
+        async with semaphore:
+            try:
+                bus_stop_timings = await fetch_timings_from_api(bus_stop_code=bus_stop_code)
+
+            except Exception:
+                with self._lock:
+                    self._stats["failed_fetches"] += 1
+
+                return list()
+
+        # Users viewing this bus stop can be served these timings, instead of fetching their own
+        bus_timings_cache.put(bus_stop_code=bus_stop_code, bus_stop_timings=bus_stop_timings)
+
+        # Only buses that can be forecasted (ie. NUS buses) have plate numbers and ETAs
+        observed_at = datetime.datetime.now(datetime.timezone.utc)
+        bus_stop_records = list()
+        for bus_num, bus_num_timings in bus_stop_timings.items():
+            for plate_num, eta_s in bus_num_timings["bus_timings"].items():
+                bus_stop_records.append((bus_stop_code, bus_num, plate_num, eta_s, observed_at))
+
+        return bus_stop_records
+
+
+    async def poll(self) -> None:
+        # Fetch the timings of every bus stop, a few bus stops at a time
+        semaphore = asyncio.Semaphore(self._max_concurrent_fetches)
+        bus_stop_records_list = await asyncio.gather(*[
+            self.fetch_bus_stop_records(semaphore=semaphore, bus_stop_code=bus_stop_code)
+            for bus_stop_code in self._bus_stop_codes
+        ])
+
+        # Store the records column by column
+        records = [record for bus_stop_records in bus_stop_records_list for record in bus_stop_records]
+        columns = list(zip(*records)) if records else [list() for _ in SNAPSHOT_SCHEMA]
+        snapshot = pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, SNAPSHOT_SCHEMA)],
+            schema=SNAPSHOT_SCHEMA
+        )
+
+        with self._lock:
+            self._recent_snapshots.append(snapshot)
+            self._unflushed_snapshots.append(snapshot)
+            self._stats["polls"] += 1
+            self._stats["records"] += snapshot.num_rows
+
+            is_flush_due = time.monotonic() - self._last_flushed_at >= self._flush_interval
+            if is_flush_due:
+                snapshots_to_flush = self._unflushed_snapshots
+                self._unflushed_snapshots = list()
+                self._last_flushed_at = time.monotonic()
+
+        for snapshot_listener in self._snapshot_listeners:
+            try:
+                snapshot_listener(snapshot)
+
+            except Exception:
+                # A failing listener must not stop the polling
+                traceback.print_exc()
+
+        if is_flush_due:
+            # Writing to disk is blocking, so it is done in a worker thread
+            await asyncio.get_running_loop().run_in_executor(None, self.write_snapshots, snapshots_to_flush)
+
+
+    def write_snapshots(self, snapshots: list[pa.Table]) -> None:
+        snapshots_table = pa.concat_tables(snapshots).unify_dictionaries()
+        if snapshots_table.num_rows == 0:
+            return
+
+        # Partition by the date and hour (in UTC) of the first observation
+        first_observed_at = snapshots_table["observed_at"][0].as_py()
+        partition_dir = os.path.join(self._data_dir, f"date={first_observed_at:%Y-%m-%d}", f"hour={first_observed_at:%H}")
+        os.makedirs(partition_dir, exist_ok=True)
+
+        # Write to a temporary file first, so that readers never see a partial file
+        file_path = os.path.join(partition_dir, f"snapshots-{first_observed_at:%Y%m%dT%H%M%S}.parquet")
+        temp_file_path = f"{file_path}.part"
+        pq.write_table(snapshots_table, temp_file_path, compression="zstd")
+        os.replace(temp_file_path, file_path)
+
+        with self._lock:
+            self._stats["files_written"] += 1
+
+
+# Process-wide poller, only started if enabled in the config
+bus_timings_poller = BusTimingsPoller(
+    data_dir=BUS_POLLER_DATA_DIR,
+    poll_interval=BUS_POLLER_INTERVAL,
+    max_concurrent_fetches=BUS_POLLER_MAX_CONCURRENT_FETCHES,
+    flush_interval=BUS_POLLER_FLUSH_INTERVAL,
+    ring_buffer_size=BUS_POLLER_RING_BUFFER_SIZE
+)
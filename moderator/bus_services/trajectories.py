@@ -0,0 +1,228 @@
+from collections import deque
+from moderator.bus_services.route_index import BusRouteIndex
+from moderator.config import TRAJECTORY_STALE_AFTER, TRAJECTORY_HISTORY_SIZE, TRAJECTORY_BACKTRACK_TOLERANCE
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import threading
+
+# Columns of the arrivals returned for each snapshot
+ARRIVAL_COLUMNS = ["plate_num", "bus_num", "bus_stop_code", "arrived_at"]
+
+# Columns of the position kept for each bus, between snapshots
+POSITION_COLUMNS = ["bus_num", "bus_stop_code", "route_position", "eta_s", "observed_at"]
+
+# Outcome of placing a bus along its route, for each snapshot
+POSITION_NOT_ON_ROUTE = 0       # Next bus stop is not on the route of the bus - bus is ignored
+POSITION_NEW_TRIP = 1       # Bus is seen for the first time, or its previous position cannot be used
+POSITION_MOVED = 2       # Bus is at the same position or further along its route
+POSITION_HELD = 3       # Bus seems to have moved back slightly - the ETAs are noisy, so its previous position is kept
+
+UNIX_EPOCH = pd.Timestamp(0, tz="UTC")
+
+
+# Reconstructs the position of each bus along its route, and when it arrived at each bus stop, from successive
+# snapshots of the ETAs (for each bus plate number) at every bus stop, as taken by the background poller
+# - In each snapshot, the bus stop with the shortest ETA for a bus is the next bus stop that it will reach
+# - Between two snapshots, a bus has passed every bus stop from its old next bus stop, up to its new next bus stop.
+#   Arrival times at these bus stops are estimated from the ETAs at both ends
+# Snapshots are processed one at a time as they come in, and only the latest position of each bus is kept between them
+# Positions are counted along the route across laps (eg. the first bus stop of the second lap comes right after the
+# last bus stop of the first lap), so that a bus that has looped around is still seen as moving forward
+class VehicleTrajectoryTracker(object):
+    def __init__(self, stale_after: float, history_size: int, backtrack_tolerance: int) -> None:
+        self._stale_after = stale_after
+        self._history_size = history_size
+        self._backtrack_tolerance = backtrack_tolerance
+
+        self._lock = threading.Lock()
+        self._route_index = None
+
+        # Latest position of each bus, indexed by plate number
+        # "bus_stop_code": Next bus stop
+        # "route_position": Position of the next bus stop along the route, counted across laps
+        # "eta_s": ETA (in seconds) at the next bus stop
+        # "observed_at": Time of observation, in seconds since the Unix epoch
+        self._positions = pd.DataFrame(columns=POSITION_COLUMNS, index=pd.Index(list(), name="plate_num"))
+
+        # Maps each plate number to its latest arrivals, in the form (bus_num, bus_stop_code, arrived_at)
+        self._arrival_histories = dict()
+
+        # Keep track of the processing
+        # "snapshots": Snapshots processed
+        # "arrivals": Arrivals reconstructed
+        # "trips_started": Buses that were seen for the first time, or whose previous positions could not be used
+        self._stats = {
+            "snapshots": 0,
+            "arrivals": 0,
+            "trips_started": 0
+        }
+
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stats = self._stats.copy()
+            stats["vehicles_tracked"] = len(self._positions)
+
+        return stats
+
+
+    def set_route_index(self, route_index: BusRouteIndex) -> None:
+        # Positions along the old routes are meaningless once the routes change
+        with self._lock:
+            if route_index is not self._route_index:
+                self._route_index = route_index
+                self._positions = self._positions.iloc[0:0]
+
+
+    def get_cycle(self, bus_num: str) -> tuple[str, ...]:
+        # Bus stops making up one lap of the route
+        # For loop services, the terminal bus stop is the same as the first one, so it is only counted once
+        route = self._route_index.get_route(bus_num=bus_num)
+        if len(route) > 1 and route[0] == route[-1]:
+            return route[:-1]
+
+        return route
+
+
+    def get_cycle_positions(self, bus_num: str, bus_stop_code: str) -> list[int]:
+        cycle_len = len(self.get_cycle(bus_num=bus_num))
+        return sorted({position % cycle_len for position in self._route_index.get_positions(bus_num=bus_num, bus_stop_code=bus_stop_code)})
+
+
+    def resolve_route_positions(self, next_stops_df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Returns the new route position of each bus, the number of bus stops it has passed since the previous snapshot,
+        # and the outcome of placing it (one of the POSITION_* constants)
+        route_positions = np.zeros(len(next_stops_df), dtype=np.int64)
+        num_stops_passed = np.zeros(len(next_stops_df), dtype=np.int64)
+        position_outcomes = np.full(len(next_stops_df), POSITION_NOT_ON_ROUTE, dtype=np.int8)
+
+        rows = zip(
+            next_stops_df["bus_num"], next_stops_df["bus_stop_code"], next_stops_df["observed_at"],
+            next_stops_df["bus_num_prev"], next_stops_df["route_position_prev"], next_stops_df["observed_at_prev"]
+        )
+        for row_index, (bus_num, bus_stop_code, observed_at, bus_num_prev, route_position_prev, observed_at_prev) in enumerate(rows):
+            cycle_positions = self.get_cycle_positions(bus_num=bus_num, bus_stop_code=bus_stop_code)
+            if not cycle_positions:
+                continue
+
+            if bus_num != bus_num_prev or observed_at - observed_at_prev > self._stale_after:
+                # New bus, or the bus has changed service, or it has not been seen for too long
+                route_positions[row_index] = cycle_positions[0]
+                position_outcomes[row_index] = POSITION_NEW_TRIP
+                continue
+
+            # Among the positions of the bus stop along the route, take the nearest one ahead of the previous position
+            cycle_len = len(self.get_cycle(bus_num=bus_num))
+            route_position_prev = int(route_position_prev)
+            num_stops_ahead = min((cycle_position - route_position_prev) % cycle_len for cycle_position in cycle_positions)
+            if num_stops_ahead > cycle_len - 1 - self._backtrack_tolerance:
+                route_positions[row_index] = route_position_prev
+                position_outcomes[row_index] = POSITION_HELD
+                continue
+
+            route_positions[row_index] = route_position_prev + num_stops_ahead
+            num_stops_passed[row_index] = num_stops_ahead
+            position_outcomes[row_index] = POSITION_MOVED
+
+        return route_positions, num_stops_passed, position_outcomes
+
+
+    def get_arrivals(self, next_stops_df: pd.DataFrame, num_stops_passed: np.ndarray) -> pd.DataFrame:
+        # One arrival for each bus stop passed by each bus, all computed at once
+        passed_mask = num_stops_passed > 0
+        passed_df = next_stops_df[passed_mask]
+        num_passed = num_stops_passed[passed_mask]
+        if not len(passed_df):
+            return pd.DataFrame(columns=ARRIVAL_COLUMNS)
+
+        observed_at_prev = passed_df["observed_at_prev"].to_numpy(dtype=np.float64)
+        observed_at = passed_df["observed_at"].to_numpy(dtype=np.float64)
+
+        # Arrival at the old next bus stop is as predicted by the previous snapshot, but must lie between the two snapshots
+        # Arrival at the new next bus stop is as predicted by this snapshot
+        first_arrived_at = np.clip(observed_at_prev + passed_df["eta_s_prev"].to_numpy(dtype=np.float64), observed_at_prev, observed_at)
+        next_arrived_at = observed_at + passed_df["eta_s"].to_numpy(dtype=np.float64)
+
+        # Bus stops passed in between are spread evenly between these two arrivals
+        row_indices = np.repeat(np.arange(len(passed_df)), num_passed)
+        stop_offsets = np.arange(len(row_indices)) - np.repeat(np.cumsum(num_passed) - num_passed, num_passed)
+        arrived_at = first_arrived_at[row_indices] + stop_offsets / num_passed[row_indices] * (next_arrived_at - first_arrived_at)[row_indices]
+        arrived_at = np.minimum(arrived_at, observed_at[row_indices])
+
+        route_positions = passed_df["route_position_prev"].to_numpy(dtype=np.int64)[row_indices] + stop_offsets
+        bus_nums = passed_df["bus_num"].to_numpy()[row_indices]
+        cycles = {bus_num: self.get_cycle(bus_num=bus_num) for bus_num in set(bus_nums)}
+
+        return pd.DataFrame({
+            "plate_num": passed_df.index.to_numpy()[row_indices],
+            "bus_num": bus_nums,
+            "bus_stop_code": [cycles[bus_num][route_position % len(cycles[bus_num])] for bus_num, route_position in zip(bus_nums, route_positions)],
+            "arrived_at": pd.to_datetime(arrived_at, unit="s", utc=True)
+        })
+
+
+    # Snapshot is a table with columns bus_stop_code, bus_num, plate_num, eta_s and observed_at (as stored by the poller)
+    # Returns the arrivals reconstructed from this snapshot
+    def process_snapshot(self, snapshot: pa.Table) -> pd.DataFrame:
+        with self._lock:
+            if self._route_index is None or snapshot.num_rows == 0:
+                return pd.DataFrame(columns=ARRIVAL_COLUMNS)
+
+            snapshot_df = snapshot.to_pandas()
+            snapshot_df["bus_stop_code"] = snapshot_df["bus_stop_code"].astype(str)
+            snapshot_df["bus_num"] = snapshot_df["bus_num"].astype(str)
+            snapshot_df["observed_at"] = (snapshot_df["observed_at"] - UNIX_EPOCH).dt.total_seconds()
+
+            # Next bus stop of each bus - the bus stop with the shortest ETA
+            next_stops_df = snapshot_df.loc[snapshot_df.groupby("plate_num", sort=False)["eta_s"].idxmin()].set_index("plate_num")
+
+            # Join with the positions of the buses from the previous snapshots
+            next_stops_df = next_stops_df.join(self._positions.add_suffix("_prev"), how="left")
+            route_positions, num_stops_passed, position_outcomes = self.resolve_route_positions(next_stops_df=next_stops_df)
+            next_stops_df["route_position"] = route_positions
+
+            arrivals_df = self.get_arrivals(next_stops_df=next_stops_df, num_stops_passed=num_stops_passed)
+
+            # Update the positions. Buses whose previous positions are held keep them as they are,
+            # and buses that are missing from this snapshot are kept until they become stale
+            is_updated = (position_outcomes == POSITION_NEW_TRIP) | (position_outcomes == POSITION_MOVED)
+            updated_positions = next_stops_df.loc[is_updated, POSITION_COLUMNS]
+            kept_positions = self._positions[~self._positions.index.isin(updated_positions.index)]
+            positions = pd.concat([kept_positions, updated_positions]) if len(kept_positions) else updated_positions
+            latest_observed_at = snapshot_df["observed_at"].max()
+            self._positions = positions[latest_observed_at - positions["observed_at"].astype(np.float64) <= self._stale_after]
+
+            # Keep the latest arrivals of each bus
+            for plate_num, bus_num, bus_stop_code, arrived_at in arrivals_df.itertuples(index=False):
+                self._arrival_histories.setdefault(plate_num, deque(maxlen=self._history_size)).append((bus_num, bus_stop_code, arrived_at))
+
+            self._stats["snapshots"] += 1
+            self._stats["arrivals"] += len(arrivals_df)
+            self._stats["trips_started"] += int((position_outcomes == POSITION_NEW_TRIP).sum())
+
+        return arrivals_df
+
+
+    def get_positions(self) -> pd.DataFrame:
+        # Latest position of each bus tracked, indexed by plate number
+        with self._lock:
+            positions = self._positions.copy()
+
+        positions["observed_at"] = pd.to_datetime(positions["observed_at"].astype(np.float64), unit="s", utc=True)
+
+        return positions.rename(columns={"bus_stop_code": "next_bus_stop_code"})
+
+
+    def get_arrival_history(self, plate_num: str) -> list[tuple[str, str, pd.Timestamp]]:
+        with self._lock:
+            return list(self._arrival_histories.get(plate_num, ()))
+
+
+# Process-wide tracker, fed by the background poller
+vehicle_trajectory_tracker = VehicleTrajectoryTracker(
+    stale_after=TRAJECTORY_STALE_AFTER,
+    history_size=TRAJECTORY_HISTORY_SIZE,
+    backtrack_tolerance=TRAJECTORY_BACKTRACK_TOLERANCE
+)
@@ -22,6 +22,20 @@ SEMESTER_LIST = [
     }
 ]
 
+# Configure streaming of NUSMods module information
+MODULE_INFO_PARSE_CHUNK_SIZE = 65536       # In bytes
+MODULE_WRITE_BATCH_SIZE = 500       # Number of modules written to the database at a time
+
+# Configure backfilling of past AYs
+BACKFILL_EARLIEST_ACAD_YEAR = "2021-2022"       # Earliest AY that the planner needs (IBLOC AY of the earliest matriculation AY)
+BACKFILL_MAX_WORKERS = 4       # Number of AYs fetched from NUSMods concurrently
+
+# Configure retrieval of prerequisite trees
+REQUIREMENTS_FETCH_MAX_WORKERS = 16       # Number of modules fetched from NUSMods concurrently
+PREREQ_FALLBACK_ACAD_YEARS = {
+    "2022-2023": "2023-2024"        # NUSMods has no prerequisite trees for AY2022-2023
+}
+
 # Configure retrieval of Disqus information
 DISQUS_RETRIEVAL_LIMIT = 100
 DISQUS_SHORT_NAME = "nusmods-prod"
@@ -44,8 +58,32 @@ TERMINAL_BUS_STOP_SEQ_NUM = 32767
 
 ### LIVE BUS TIMINGS ###
 NEXTBUS_API_BASE_URL = "https://nnextbus.nusmods.com"
+NEXTBUS_POOL_SIZE = 20       # Max number of connections to the NextBus API
+NEXTBUS_KEEPALIVE_TIMEOUT = 60       # In seconds. Idle connections are kept open for this long
+NEXTBUS_TIMEOUT = 5       # In seconds, for each request
+NEXTBUS_MAX_CONCURRENT_REQUESTS = 10       # Max number of requests in flight at a time, across all users
+NEXTBUS_MAX_RETRIES = 2
+NEXTBUS_RETRY_BACKOFF = 0.5       # In seconds. Doubled after each retry, with jitter
 BUS_TIMINGS_AUTOREFRESH_INTERVAL = 60000        # In milliseconds
 
+# Time (in seconds) for which the timings of a bus stop are shared by all users, before they are fetched again
+BUS_TIMINGS_CACHE_TTL = 15
+
+### BACKGROUND BUS TIMINGS POLLER ###
+# If enabled, the timings of every bus stop are polled in the background, and stored for analysis
+# Users viewing live timings are then served from the polled timings
+BUS_POLLER_ENABLED = False
+BUS_POLLER_INTERVAL = 10       # In seconds. Should be shorter than BUS_TIMINGS_CACHE_TTL
+BUS_POLLER_MAX_CONCURRENT_FETCHES = 5
+BUS_POLLER_DATA_DIR = ".bus_timings"
+BUS_POLLER_FLUSH_INTERVAL = 300       # In seconds. Snapshots are written to disk this often
+BUS_POLLER_RING_BUFFER_SIZE = 360       # Number of latest snapshots kept in memory
+
+# Configure reconstruction of bus trajectories from the polled snapshots
+TRAJECTORY_STALE_AFTER = 300       # In seconds. Buses not seen for this long are forgotten
+TRAJECTORY_HISTORY_SIZE = 200       # Max number of arrivals remembered for each bus
+TRAJECTORY_BACKTRACK_TOLERANCE = 2       # Max number of bus stops that a bus can seem to move back by, due to noisy ETAs
+
 ### TWO HOUR WEATHER FORECAST ###
 WEATHER_API_URL = "https://api-open.data.gov.sg/v2/real-time/api/two-hr-forecast"
 NUS_REGION = "Queenstown"
@@ -60,6 +98,25 @@ AVERAGE_MCS_PER_AY = 40.0
 # Set the semester number when IBLOCs are offered. Typically, we set this to Special Term 1 (sem_num = 3)
 IBLOCS_SEM_NUM = 3
 
+# Configure cache of course plan validation results, shared by all users
+VALIDATION_CACHE_MAX_ENTRIES = 100000
+VALIDATION_CACHE_MAX_BYTES = 64 * 1024 * 1024       # In bytes
+
+# Configure automatic generation of course plans
+PLAN_GENERATOR_TIME_BUDGET = 5       # In seconds
+PLAN_GENERATOR_MAX_BRANCHES = 3       # Max number of selections tried for each term
+
+# Max number of unlocked courses listed for each selected course in the planner
+MAX_UNLOCKED_MODULES_DISPLAYED = 10
+
+# Max number of courses sent to each course selection field in the planner, at a time
+# Users search for the rest, instead of scrolling through every course offered
+PLANNER_MAX_MODULE_OPTIONS = 50
+
+# Configure batch validation of course plans
+BATCH_VALIDATION_MAX_WORKERS = 4       # Number of worker processes
+BATCH_VALIDATION_CHUNK_SIZE = 64       # Number of plans sent to a worker process at a time
+
 ### QA CONFIGS ###
 # Choose number of documents to be retrieved
 NUM_DOCUMENTS_RETRIEVED_GENERAL = 4
@@ -68,6 +125,25 @@ NUM_DOCUMENTS_RETRIEVED_SPECIFIC = 3
 # Choose LLM for QA
 LLM_NAME = "deepseek-r1-distill-llama-70b"
 
+### HTTP CACHE FOR UPSTREAM DATA ###
+HTTP_CACHE_DIR = ".http_cache"
+HTTP_POOL_SIZE = max(REQUIREMENTS_FETCH_MAX_WORKERS, BACKFILL_MAX_WORKERS)       # Max number of keep-alive connections per host. Must cover every thread fetching at once, or connections get thrown away
+HTTP_TIMEOUT = 30       # In seconds
+HTTP_DOWNLOAD_CHUNK_SIZE = 65536       # In bytes
+
+# Time (in seconds) before a cached response must be revalidated with upstream
+NUSMODS_MODULE_INFO_CACHE_TTL = 3600
+NUSMODS_MODULE_CACHE_TTL = 86400
+BUS_DATA_CACHE_TTL = 86400
+WEATHER_CACHE_TTL = 300
+
+### BACKGROUND JOBS FOR ADMIN TASKS ###
+JOBS_STATE_FILE = ".jobs/jobs.json"
+JOBS_MAX_WORKERS = 2
+JOBS_HISTORY_LIMIT = 20       # Max number of jobs remembered
+JOBS_POLL_INTERVAL = 2000       # In milliseconds
+JOBS_PROGRESS_SAVE_INTERVAL = 1       # In seconds
+
 ### OTHERS ###
 HOURS_WRT_UTC = 8       # UTC to SGT
 
@@ -0,0 +1,218 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+from moderator.config import BATCH_VALIDATION_MAX_WORKERS, BATCH_VALIDATION_CHUNK_SIZE
+from moderator.planner.course_plan_checker import CoursePlanChecker
+from moderator.planner.module_catalog import ModuleCatalog
+from moderator.planner.offers_index import OffersIndex
+from moderator.planner.prereq_store import PrereqStore
+from moderator.planner.shared_data import load_module_catalog, load_offers_index, load_prereq_store
+from moderator.sql.acad_years import GET_LIST_OF_AYS_QUERY
+from moderator.sql.majors import GET_MAJORS_QUERY
+import pandas as pd
+import streamlit as st
+import time
+
+# Columns of the validation results, with one row per term of each plan
+RESULT_COLUMNS = ("plan_id", "acad_year", "sem_num", "message_type", "message", "total_mcs")
+
+# Shared planner data, set once in each worker process
+_worker_shared_data = None
+
+
+### LOADING OF SHARED DATA AND PLANS ###
+def load_shared_data_for_batch(conn: st.connections.SQLConnection) -> dict[str, ModuleCatalog | PrereqStore | OffersIndex | list[str] | dict[str, int]]:
+    # Everything needed to check plans, loaded once and shared by all the plans in the batch
+    majors_to_num_years = {
+        major: int(num_years) for major, _, num_years in conn.query(GET_MAJORS_QUERY, ttl=0).values.tolist()
+    }
+
+    return {
+        "module_catalog": load_module_catalog(_conn=conn),
+        "prereq_store": load_prereq_store(_conn=conn),
+        "offers_index": load_offers_index(_conn=conn),
+        "list_of_ays": list(conn.query(GET_LIST_OF_AYS_QUERY, ttl=0)["acad_year"]),
+        "majors_to_num_years": majors_to_num_years
+    }
+
+
+def load_plans(file_path: str) -> list[dict[str, str | dict[str, dict[int, list[str]]]]]:
+    # Each plan is a dictionary with keys "plan_id", "major", "matriculation_ay" and "plan"
+    # "plan" has the same structure as CoursePlanChecker.plan - keys are AYs, values are dictionaries with keys = sem_num
+    # and values = list of module codes for that term
+    if file_path.endswith(".json"):
+        # JSON file: A list of plans, in the structure above
+        with open(file_path, "r", encoding="utf-8") as f:
+            plans = json.load(f)
+
+        # JSON keys are always strings - convert sem_nums back into integers
+        for plan in plans:
+            plan["plan_id"] = str(plan["plan_id"])
+            plan["plan"] = {
+                acad_year: {int(sem_num): module_codes for sem_num, module_codes in acad_year_plan.items()}
+                for acad_year, acad_year_plan in plan["plan"].items()
+            }
+
+        return plans
+
+    # CSV file: One row per module taken, with columns plan_id, major, matriculation_ay, acad_year, sem_num and module_code
+    # Terms without any modules are simply left out
+    plans_by_id = dict()
+    plan_rows = pd.read_csv(file_path, dtype={"plan_id": str, "sem_num": int}).values.tolist()
+    for plan_id, major, matriculation_ay, acad_year, sem_num, module_code in plan_rows:
+        if plan_id not in plans_by_id:
+            plans_by_id[plan_id] = {
+                "plan_id": plan_id,
+                "major": major,
+                "matriculation_ay": matriculation_ay,
+                "plan": dict()
+            }
+
+        plans_by_id[plan_id]["plan"].setdefault(acad_year, dict()).setdefault(sem_num, list()).append(module_code)
+
+    return list(plans_by_id.values())
+
+
+### VALIDATION ###
+def init_worker(shared_data: dict[str, ModuleCatalog | PrereqStore | OffersIndex | list[str] | dict[str, int]]) -> None:
+    global _worker_shared_data
+    _worker_shared_data = shared_data
+
+
+def validate_plan(plan: dict[str, str | dict[str, dict[int, list[str]]]]) -> list[tuple[str, str | None, int | None, str, str, float | None]]:
+    # Returns one row of results per term, in the form (plan_id, acad_year, sem_num, message_type, message, total_mcs)
+    # A plan that cannot be checked (eg. it is malformed) gets a single error row, so that the rest of the batch carries on
+    try:
+        return get_result_rows_for_plan(plan=plan)
+
+    except Exception as e:
+        return [(plan.get("plan_id"), None, None, "error", f"Unable to check this plan: {e!r}", None)]
+
+
+def get_result_rows_for_plan(plan: dict[str, str | dict[str, dict[int, list[str]]]]) -> list[tuple[str, str | None, int | None, str, str, float | None]]:
+    plan_id = plan["plan_id"]
+    list_of_ays = _worker_shared_data["list_of_ays"]
+
+    # Check that the user's details are valid
+    num_years_to_grad = _worker_shared_data["majors_to_num_years"].get(plan["major"])
+    if num_years_to_grad is None:
+        return [(plan_id, None, None, "error", f"Unknown major: {plan['major']}.", None)]
+
+    # Earliest AY is only used as an IBLOC AY
+    if plan["matriculation_ay"] not in list_of_ays[1:]:
+        return [(plan_id, None, None, "error", f"Unknown matriculation AY: {plan['matriculation_ay']}.", None)]
+
+    checker = CoursePlanChecker.from_shared_data(
+        module_catalog=_worker_shared_data["module_catalog"],
+        prereq_store=_worker_shared_data["prereq_store"],
+        offers_index=_worker_shared_data["offers_index"],
+        list_of_ays=list_of_ays,
+        matriculation_ay=plan["matriculation_ay"],
+        num_years_to_grad=num_years_to_grad
+    )
+    sem_min_mcs = {sem_num: min_mcs for sem_num, _, min_mcs in checker.sem_info}
+
+    # Check each term in chronological order, just like the planner page
+    result_rows = list()
+    for term_index, (acad_year, sem_num) in enumerate(checker.terms):
+        selected_module_codes = plan["plan"].get(acad_year, dict()).get(sem_num, list())
+
+        # In the planner page, users can only choose among the modules offered that term, which they have not taken yet
+        # Plans uploaded in bulk have no such restriction, so this has to be checked here
+        if checker.plan is not None:
+            module_codes_available = {module_name.split()[0] for module_name in checker.get_list_of_mod_choices_for_term(acad_year=acad_year, sem_num=sem_num)}
+
+        else:
+            # Plan is already invalid, so the modules taken so far are unknown - only check that the modules are offered this term
+            module_codes_available, _ = checker.get_available_module_options_for_term(acad_year=acad_year, sem_num=sem_num)
+
+        module_codes_unavailable = [
+            module_code for module_code in selected_module_codes
+            if module_code not in module_codes_available or module_code not in checker.module_catalog
+        ]
+        if module_codes_unavailable:
+            message = f"The following courses are not offered this term, or have already been taken: {', '.join(module_codes_unavailable)}."
+            result_rows.append((plan_id, acad_year, sem_num, "error", message, None))
+            checker.reject_selection_for_term(acad_year=acad_year, sem_num=sem_num, selected_module_codes=selected_module_codes, message=message)
+            continue
+
+        # Module codes are used in place of module names - the checker only needs the code at the start of each name
+        message_type, message, selected_total_mcs = checker.handle_user_selection_for_term(
+            selected_module_names=selected_module_codes,
+            acad_year=acad_year,
+            sem_num=sem_num,
+            sem_min_mcs=sem_min_mcs[sem_num],
+            is_y1s1_for_user=term_index == 1
+        )
+        result_rows.append((plan_id, acad_year, sem_num, message_type, message, selected_total_mcs))
+
+    # Terms in the plan that are outside of the user's candidature
+    terms_for_user = set(checker.terms)
+    for acad_year, acad_year_plan in plan["plan"].items():
+        for sem_num, module_codes in acad_year_plan.items():
+            if (acad_year, sem_num) not in terms_for_user and module_codes:
+                result_rows.append((plan_id, acad_year, sem_num, "error", "This term is outside of the candidature.", None))
+
+    return result_rows
+
+
+def validate_plans(plans: list[dict[str, str | dict[str, dict[int, list[str]]]]], shared_data: dict[str, ModuleCatalog | PrereqStore | OffersIndex | list[str] | dict[str, int]], max_workers: int) -> pd.DataFrame:
+    # Collect results column by column
+    result_columns = {column_name: list() for column_name in RESULT_COLUMNS}
+
+    if max_workers == 1:
+        # Validate in this process
+        init_worker(shared_data=shared_data)
+        results_by_plan = map(validate_plan, plans)
+
+    else:
+        # Validate in parallel. Shared data is sent to each worker process once, rather than with every plan
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(shared_data,))
+        results_by_plan = executor.map(validate_plan, plans, chunksize=BATCH_VALIDATION_CHUNK_SIZE)
+
+    try:
+        for result_rows in results_by_plan:
+            for result_row in result_rows:
+                for column_name, value in zip(RESULT_COLUMNS, result_row):
+                    result_columns[column_name].append(value)
+
+    finally:
+        if max_workers != 1:
+            executor.shutdown()
+
+    results = pd.DataFrame(result_columns)
+    results["sem_num"] = results["sem_num"].astype("Int64")
+
+    return results
+
+
+def save_results(results: pd.DataFrame, file_path: str) -> None:
+    # Parquet keeps the results columnar. Otherwise, fall back to CSV
+    if file_path.endswith(".parquet"):
+        results.to_parquet(file_path, index=False)
+
+    else:
+        results.to_csv(file_path, index=False)
+
+
+if __name__ == "__main__":
+    # Eg. python -m moderator.planner.batch_validator plans.json results.parquet
+    parser = argparse.ArgumentParser(description="Check many course plans at once.")
+    parser.add_argument("plans_file_path", help="Course plans to check (.json or .csv)")
+    parser.add_argument("results_file_path", help="Where to save the results, with one row per term of each plan (.parquet or .csv)")
+    parser.add_argument("--max-workers", type=int, default=BATCH_VALIDATION_MAX_WORKERS, help="Number of worker processes")
+    args = parser.parse_args()
+
+    # Load shared planner data from the database, using the same connection settings as the app
+    conn = st.connection("nus_moderator", type="sql")
+    shared_data = load_shared_data_for_batch(conn=conn)
+
+    plans = load_plans(file_path=args.plans_file_path)
+    print(f"Checking {len(plans)} course plans...")
+
+    start_time = time.perf_counter()
+    results = validate_plans(plans=plans, shared_data=shared_data, max_workers=args.max_workers)
+    print(f"Checked {len(plans)} course plans in {time.perf_counter() - start_time:.2f}s.")
+
+    save_results(results=results, file_path=args.results_file_path)
+    print(f"Results saved to {args.results_file_path}.")
@@ -0,0 +1,398 @@
+import argparse
+import json
+from moderator.planner.course_plan_checker import CoursePlanChecker
+from moderator.planner.module_catalog import ModuleCatalog
+from moderator.planner.offers_index import OffersIndex
+from moderator.planner.prereq_store import PrereqStore
+from moderator.planner.validation_cache import validation_cache
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Benchmarks for the course plan checker, run on synthetic planner data, so that no database or NUSMods access is needed
+# Eg. python -m moderator.planner.benchmark --sizes 1500 3000 6000 --save-results baseline.json
+
+# Shape of the synthetic data
+DEPARTMENT_PREFIXES = ("ACC", "BT", "CS", "DSA", "EC", "EE", "GEA", "GESS", "HSA", "IS", "LSM", "MA", "ME", "PC", "PL", "ST")
+LEVEL_WEIGHTS = (0.3, 0.3, 0.25, 0.15)      # Proportion of level 1000, 2000, 3000 and 4000 modules
+SYNTHETIC_SEM_INFO_ROWS = [[1, "Semester 1", 18.0], [2, "Semester 2", 18.0], [3, "Special Term 1", 0.0], [4, "Special Term 2", 0.0]]
+SYNTHETIC_LIST_OF_AYS = ["2020-2021", "2021-2022", "2022-2023", "2023-2024", "2024-2025", "2025-2026"]
+SYNTHETIC_NUM_YEARS_TO_GRAD = 4
+SYNTHETIC_NUM_IBLOCS = 20
+
+# Number of modules chosen for each term of a synthetic plan
+NUM_MODULES_PER_SEM = 5
+NUM_MODULES_PER_SPECIAL_TERM = 1
+
+# Timings compared against a baseline, in the form (timing_name, description)
+# Regular semesters offer many times more modules than special terms (including the IBLOCs term), so per-term timings are
+# reported separately for each type of term. Otherwise the cheap special terms, which make up half the terms, would hide
+# any change to the regular semesters
+TIMINGS = (
+    ("construct_checker", "Checker construction"),
+    ("get_mod_choices_regular", "Choice list generation (per semester)"),
+    ("get_mod_choices_special", "Choice list generation (per special term)"),
+    ("validate_term_uncached_regular", "Term validation, uncached (per semester)"),
+    ("validate_term_uncached_special", "Term validation, uncached (per special term)"),
+    ("validate_term_cached_regular", "Term validation, cached (per semester)"),
+    ("validate_term_cached_special", "Term validation, cached (per special term)"),
+    ("ensure_year_long_consistency", "Year-long consistency update (per call)")
+)
+
+
+### GENERATION OF SYNTHETIC DATA ###
+def make_module_codes(num_modules: int, rng: random.Random) -> list[tuple[str, str, int]]:
+    # Returns a list of (module_code, department_prefix, level), eg. ("CS2040S", "CS", 2)
+    module_codes = dict()
+    while len(module_codes) < num_modules:
+        department_prefix = rng.choice(DEPARTMENT_PREFIXES)
+        level = rng.choices(range(1, 5), weights=LEVEL_WEIGHTS)[0]
+        module_code = f"{department_prefix}{level * 1000 + rng.randrange(1000)}"
+
+        # Some module codes have a suffix, eg. CS2040S
+        if rng.random() < 0.1:
+            module_code += rng.choice("ACERSX")
+
+        module_codes.setdefault(module_code, (module_code, department_prefix, level))
+
+    return list(module_codes.values())
+
+
+def make_prereq_leaf(lower_level_modules: list[tuple[str, str, int]], rng: random.Random) -> str:
+    module_code, department_prefix, level = rng.choice(lower_level_modules)
+
+    # Some leaves have a wildcard, eg. "CS2%:D" = Any CS level 2000 module
+    if rng.random() < 0.1:
+        return f"{department_prefix}{level}%:D"
+
+    return f"{module_code}:D"
+
+
+def make_prereq_tree(lower_level_modules: list[tuple[str, str, int]], rng: random.Random) -> dict | str:
+    # Shapes of prerequisite trees, roughly in the proportions seen on NUSMods
+    tree_shape = rng.choices(("leaf", "and", "or", "and_of_or", "n_of"), weights=(0.35, 0.2, 0.2, 0.15, 0.1))[0]
+
+    if tree_shape == "leaf":
+        return make_prereq_leaf(lower_level_modules=lower_level_modules, rng=rng)
+
+    if tree_shape == "and":
+        return {"and": [make_prereq_leaf(lower_level_modules=lower_level_modules, rng=rng) for _ in range(rng.randint(2, 3))]}
+
+    if tree_shape == "or":
+        return {"or": [make_prereq_leaf(lower_level_modules=lower_level_modules, rng=rng) for _ in range(rng.randint(2, 4))]}
+
+    if tree_shape == "and_of_or":
+        return {
+            "and": [
+                make_prereq_leaf(lower_level_modules=lower_level_modules, rng=rng),
+                {"or": [make_prereq_leaf(lower_level_modules=lower_level_modules, rng=rng) for _ in range(rng.randint(2, 3))]}
+            ]
+        }
+
+    return {"nOf": [2, [make_prereq_leaf(lower_level_modules=lower_level_modules, rng=rng) for _ in range(rng.randint(3, 4))]]}
+
+
+def make_synthetic_shared_data(num_modules: int, seed: int) -> dict[str, ModuleCatalog | PrereqStore | OffersIndex | list[str]]:
+    # Same structure as the shared data used for batch validation (without the majors)
+    rng = random.Random(seed)
+    list_of_ays = SYNTHETIC_LIST_OF_AYS
+    modules = make_module_codes(num_modules=num_modules, rng=rng)
+
+    # Roughly 1% of modules are year-long, and are worth more MCs
+    year_long_module_codes = {module_code for module_code, _, _ in modules if rng.random() < 0.01}
+    module_rows = list()
+    for module_code, _, _ in modules:
+        if module_code in year_long_module_codes:
+            module_rows.append([module_code, 8.0, True])
+
+        else:
+            module_rows.append([module_code, rng.choices((2.0, 4.0, 8.0), weights=(0.1, 0.85, 0.05))[0], False])
+
+    # Modules mostly depend on lower level modules, usually from the same department
+    modules_by_department = dict()
+    for module in modules:
+        modules_by_department.setdefault(module[1], list()).append(module)
+
+    prereq_trees = dict()
+    for module_code, department_prefix, level in modules:
+        if level == 1 or rng.random() < 0.3:
+            continue
+
+        candidate_modules = modules_by_department[department_prefix] if rng.random() < 0.7 else modules
+        lower_level_modules = [module for module in candidate_modules if module[2] < level]
+        if lower_level_modules:
+            prereq_trees[module_code] = make_prereq_tree(lower_level_modules=lower_level_modules, rng=rng)
+
+    # Some modules are precluded by other modules of the same level and department (eg. CS1010 and CS1010S)
+    # Preclusions are listed for both modules. A few modules also have corequisites
+    precluded_module_codes = dict()
+    coreq_trees = dict()
+    for module_code, department_prefix, level in modules:
+        if rng.random() < 0.1:
+            same_level_module_codes = [other_module_code for other_module_code, _, other_level in modules_by_department[department_prefix] if other_level == level and other_module_code != module_code]
+            if same_level_module_codes:
+                other_module_code = rng.choice(same_level_module_codes)
+                precluded_module_codes.setdefault(module_code, list()).append(f"{other_module_code}:D")
+                precluded_module_codes.setdefault(other_module_code, list()).append(f"{module_code}:D")
+
+        elif rng.random() < 0.01:
+            coreq_trees[module_code] = f"{rng.choice(modules_by_department[department_prefix])[0]}:D"
+
+    # Requirement rows, in the form (module_code, acad_year, prereq_tree, preclusion_tree, coreq_tree, is_preclusion_from_text)
+    # Every module has a row for every AY, and the trees are the same in every AY
+    prereq_rows = list()
+    for module_code, _, _ in modules:
+        preclusion_tree = precluded_module_codes.get(module_code)
+        if preclusion_tree is not None:
+            preclusion_tree = {"or": preclusion_tree} if len(preclusion_tree) > 1 else preclusion_tree[0]
+
+        for acad_year in list_of_ays:
+            prereq_rows.append([module_code, acad_year, prereq_trees.get(module_code), preclusion_tree, coreq_trees.get(module_code), False])
+
+    # Offers, in the form (module_code, module_title, acad_year, sem_num)
+    offer_rows = list()
+    for acad_year in list_of_ays:
+        for module_index, (module_code, _, _) in enumerate(modules):
+            if rng.random() < 0.15:
+                # Not offered this AY
+                continue
+
+            module_title = f"Synthetic Course {module_index}"
+            if module_code in year_long_module_codes:
+                sem_nums = (1, 2)
+
+            else:
+                sem_nums = rng.choices(((1,), (2,), (1, 2), (3,), (4,)), weights=(0.45, 0.35, 0.15, 0.03, 0.02))[0]
+
+            for sem_num in sem_nums:
+                offer_rows.append([module_code, module_title, acad_year, sem_num])
+
+    offer_rows.sort(key=lambda offer_row: (offer_row[2], offer_row[3], offer_row[0]))
+
+    # IBLOCs, in the form (module_code, module_title)
+    level_1000_module_codes = sorted(module_code for module_code, _, level in modules if level == 1 and module_code not in year_long_module_codes)
+    ibloc_rows = [[module_code, "Synthetic IBLOC"] for module_code in level_1000_module_codes[:SYNTHETIC_NUM_IBLOCS]]
+
+    return {
+        "module_catalog": ModuleCatalog.from_rows(module_rows=module_rows, credit_internship_codes=set(), sem_info_rows=SYNTHETIC_SEM_INFO_ROWS),
+        "prereq_store": PrereqStore.from_rows(rows=prereq_rows),
+        "offers_index": OffersIndex.from_rows(offer_rows=offer_rows, ibloc_rows=ibloc_rows),
+        "list_of_ays": list_of_ays
+    }
+
+
+def make_checker(shared_data: dict[str, ModuleCatalog | PrereqStore | OffersIndex | list[str]], matriculation_ay: str) -> CoursePlanChecker:
+    return CoursePlanChecker.from_shared_data(
+        module_catalog=shared_data["module_catalog"],
+        prereq_store=shared_data["prereq_store"],
+        offers_index=shared_data["offers_index"],
+        list_of_ays=shared_data["list_of_ays"],
+        matriculation_ay=matriculation_ay,
+        num_years_to_grad=SYNTHETIC_NUM_YEARS_TO_GRAD
+    )
+
+
+def choose_selection_for_term(checker: CoursePlanChecker, module_name_choices: list[str], acad_year: str, sem_num: int, previous_selection: list[str], rng: random.Random) -> list[str]:
+    # Year-long modules chosen in the previous term of the same AY are carried on
+    module_name_choices_set = set(module_name_choices)
+    selection = [module_name for module_name in previous_selection if module_name in module_name_choices_set and checker.module_catalog.is_year_long(module_name.split()[0])]
+
+    # Fill up the rest of the term with modules whose prerequisites are already satisfied, like a real user would
+    num_modules_to_choose = NUM_MODULES_PER_SEM if sem_num in (1, 2) and acad_year != checker.ays_for_user[0] else NUM_MODULES_PER_SPECIAL_TERM
+    for module_name in rng.sample(module_name_choices, k=len(module_name_choices)):
+        if len(selection) >= num_modules_to_choose:
+            break
+
+        module_code = module_name.split()[0]
+        if module_name in selection or checker.module_catalog.is_year_long(module_code):
+            continue
+
+        if checker.check_if_prereqs_satisfied(compiled_prereq=checker.get_compiled_prereq(module_code=module_code, acad_year=acad_year)):
+            selection.append(module_name)
+
+    return selection
+
+
+### TIMING ###
+def plan_with_checker(checker: CoursePlanChecker, rng: random.Random, timings: dict[str, list[float]] | None, selections: list[list[str]] | None = None) -> list[list[str]]:
+    # Goes through every term in chronological order, like the planner page does, and returns the selection for each term
+    # If selections are given, they are used instead of choosing new ones
+    sem_min_mcs = {sem_num: min_mcs for sem_num, _, min_mcs in checker.sem_info}
+    new_selections = list()
+    previous_selection = list()
+    for term_index, (acad_year, sem_num) in enumerate(checker.terms):
+        start_time = time.perf_counter()
+        module_name_choices = checker.get_list_of_mod_choices_for_term(acad_year=acad_year, sem_num=sem_num)
+        choices_time = time.perf_counter() - start_time
+
+        if selections is None:
+            selection = choose_selection_for_term(
+                checker=checker,
+                module_name_choices=module_name_choices,
+                acad_year=acad_year,
+                sem_num=sem_num,
+                previous_selection=previous_selection,
+                rng=rng
+            )
+
+        else:
+            selection = selections[term_index]
+
+        checker.set_default_selection_for_term(acad_year=acad_year, sem_num=sem_num, new_default_selection=selection)
+
+        start_time = time.perf_counter()
+        checker.handle_user_selection_for_term(
+            selected_module_names=selection,
+            acad_year=acad_year,
+            sem_num=sem_num,
+            sem_min_mcs=sem_min_mcs[sem_num],
+            is_y1s1_for_user=term_index == 1
+        )
+        validation_time = time.perf_counter() - start_time
+
+        if timings is not None:
+            # Regular semesters are the ones with a minimum number of MCs
+            term_type = "regular" if sem_min_mcs[sem_num] > 0 else "special"
+            timings[f"get_mod_choices_{term_type}"].append(choices_time)
+            timings[f"validate_term_uncached_{term_type}" if selections is None else f"validate_term_cached_{term_type}"].append(validation_time)
+
+        new_selections.append(selection)
+        previous_selection = selection if sem_num == 1 else list()
+
+    return new_selections
+
+
+def time_year_long_consistency(checker: CoursePlanChecker, timings: dict[str, list[float]]) -> None:
+    # Edit semester 1 of each AY, and make semester 2 consistent with it
+    for acad_year in checker.ays_for_user[1:]:
+        edited_selection = checker.course_default_selections[acad_year][1]
+        start_time = time.perf_counter()
+        checker.ensure_year_long_consistency(acad_year=acad_year, edited_sem_num=1, edited_selection=edited_selection, target_sem_num=2)
+        timings["ensure_year_long_consistency"].append(time.perf_counter() - start_time)
+
+
+def run_benchmark(num_modules: int, num_plans: int, seed: int) -> dict[str, float]:
+    # Returns the median of each timing (in microseconds), along with the size of the data and the memory used per checker
+    shared_data = make_synthetic_shared_data(num_modules=num_modules, seed=seed)
+    matriculation_ays = shared_data["list_of_ays"][1:len(shared_data["list_of_ays"]) - SYNTHETIC_NUM_YEARS_TO_GRAD + 1]
+    rng = random.Random(seed)
+    timings = {timing_name: list() for timing_name, _ in TIMINGS}
+
+    # Warm up, so that the trees used are already compiled before anything is timed
+    validation_cache.clear()
+    for matriculation_ay in matriculation_ays:
+        plan_with_checker(checker=make_checker(shared_data=shared_data, matriculation_ay=matriculation_ay), rng=rng, timings=None)
+
+    for plan_index in range(num_plans):
+        matriculation_ay = matriculation_ays[plan_index % len(matriculation_ays)]
+
+        start_time = time.perf_counter()
+        checker = make_checker(shared_data=shared_data, matriculation_ay=matriculation_ay)
+        timings["construct_checker"].append(time.perf_counter() - start_time)
+
+        # Every selection is checked from scratch
+        validation_cache.clear()
+        selections = plan_with_checker(checker=checker, rng=rng, timings=timings)
+        time_year_long_consistency(checker=checker, timings=timings)
+
+        # The same plan, checked again by another user, is served from the validation cache
+        plan_with_checker(checker=make_checker(shared_data=shared_data, matriculation_ay=matriculation_ay), rng=rng, timings=timings, selections=selections)
+
+    # Memory held by each checker with a complete plan (shared data is not counted, since it is shared by all users)
+    validation_cache.clear()
+    tracemalloc.start()
+    base_memory, _ = tracemalloc.get_traced_memory()
+    checkers = list()
+    for plan_index in range(num_plans):
+        checker = make_checker(shared_data=shared_data, matriculation_ay=matriculation_ays[plan_index % len(matriculation_ays)])
+        plan_with_checker(checker=checker, rng=rng, timings=None)
+        checkers.append(checker)
+
+    validation_cache.clear()
+    current_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    prereq_store = shared_data["prereq_store"]
+    num_prereq_trees = sum(
+        1 for acad_year in shared_data["list_of_ays"] for module_code in prereq_store.get_module_codes(acad_year=acad_year)
+        if prereq_store.get_prereq_tree(module_code=module_code, acad_year=acad_year) is not None
+    )
+    results = {
+        "num_modules": len(shared_data["module_catalog"]),
+        "num_prereq_trees": num_prereq_trees,
+        "memory_per_checker": (current_memory - base_memory) / num_plans
+    }
+    for timing_name, _ in TIMINGS:
+        results[timing_name] = statistics.median(timings[timing_name]) * 1e6
+
+    return results
+
+
+### REPORTING ###
+def print_results(results_by_size: dict[str, dict[str, float]]) -> None:
+    sizes = list(results_by_size.keys())
+    column_width = 12
+    print(f"{'Number of modules':<50}" + "".join(f"{size:>{column_width}}" for size in sizes))
+    print(f"{'Number of prerequisite trees (all AYs)':<50}" + "".join(f"{results_by_size[size]['num_prereq_trees']:>{column_width}}" for size in sizes))
+    for timing_name, description in TIMINGS:
+        print(f"{description + ' (us)':<50}" + "".join(f"{results_by_size[size][timing_name]:>{column_width}.1f}" for size in sizes))
+
+    print(f"{'Memory per checker (KiB)':<50}" + "".join(f"{results_by_size[size]['memory_per_checker'] / 1024:>{column_width}.1f}" for size in sizes))
+
+
+def find_regressions(results_by_size: dict[str, dict[str, float]], baseline_results_by_size: dict[str, dict[str, float]], tolerance: float) -> list[str]:
+    # Timings (and memory) that are worse than the baseline by more than the tolerance, eg. 0.25 = 25% slower
+    regressions = list()
+    for size, results in results_by_size.items():
+        baseline_results = baseline_results_by_size.get(size)
+        if baseline_results is None:
+            continue
+
+        for result_name in [timing_name for timing_name, _ in TIMINGS] + ["memory_per_checker"]:
+            # Baselines saved by older versions of the benchmark may not have every result
+            if result_name not in baseline_results:
+                continue
+
+            if results[result_name] > baseline_results[result_name] * (1 + tolerance):
+                regressions.append(f"{result_name} ({size} modules): {baseline_results[result_name]:.1f} -> {results[result_name]:.1f}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the course plan checker on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1500, 3000, 6000], help="Number of modules in each synthetic catalog")
+    parser.add_argument("--num-plans", type=int, default=50, help="Number of plans checked for each catalog")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generating the synthetic data")
+    parser.add_argument("--save-results", help="Save the results to this JSON file, for use as a baseline later on")
+    parser.add_argument("--baseline", help="Compare the results against a baseline saved earlier, and fail if anything has regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="How much worse than the baseline a result can be, before it counts as a regression")
+    args = parser.parse_args()
+
+    # JSON keys are strings, so sizes are kept as strings throughout
+    results_by_size = dict()
+    for num_modules in args.sizes:
+        print(f"Benchmarking with {num_modules} modules...", file=sys.stderr)
+        results_by_size[str(num_modules)] = run_benchmark(num_modules=num_modules, num_plans=args.num_plans, seed=args.seed)
+
+    print_results(results_by_size=results_by_size)
+
+    if args.save_results:
+        with open(args.save_results, "w", encoding="utf-8") as f:
+            json.dump(results_by_size, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_results_by_size = json.load(f)
+
+        regressions = find_regressions(results_by_size=results_by_size, baseline_results_by_size=baseline_results_by_size, tolerance=args.tolerance)
+        if regressions:
+            print("Regressions found:")
+            for regression in regressions:
+                print(f"- {regression}")
+
+            sys.exit(1)
+
+        print("No regressions found.")
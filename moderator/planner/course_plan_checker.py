@@ -1,52 +1,29 @@
 from moderator.config import AVERAGE_MCS_PER_AY, MAX_MCS_FIRST_SEM, IBLOCS_SEM_NUM
-from moderator.sql.credit_internships import GET_CREDIT_INTERNSHIPS_QUERY
+from moderator.planner.module_catalog import ModuleCatalog
+from moderator.planner.offers_index import OffersIndex
+from moderator.planner.prereq_evaluator import CompiledPrereq, CompletedCodeIndex
+from moderator.planner.prereq_graph import PrereqGraph
+from moderator.planner.prereq_store import PrereqStore
+from moderator.planner.shared_data import load_module_catalog, load_offers_index, load_prereq_graph, load_prereq_store
+from moderator.planner.validation_cache import validation_cache
 from moderator.sql.majors import GET_EXISTING_MAJOR_QUERY
-from moderator.sql.modules import GET_IBLOC_AY_MODULES_QUERY, GET_MODULES_INFO_FOR_PLANNER_QUERY, GET_SPECIFIC_TERM_MODULES_QUERY, GET_TERMS_OFFERED_FOR_SPECIFIC_MODULE_QUERY
-from moderator.utils.helpers import get_semester_info
-from moderator.utils.user import User
-import numpy as np
-import re
-import requests
 import streamlit as st
+from typing import TYPE_CHECKING
 
+# Only needed for type hints. Importing it for real needs the app's secrets and the chatbot stack,
+# which the headless tools (eg. batch validation and the benchmark) must run without
+if TYPE_CHECKING:
+    from moderator.utils.user import User
 
-class CoursePlanChecker(object):
-    ### FUNCTIONS FOR CHECKER INITIALISATION ###    
-    def get_credit_internships(self) -> set[str]:
-        # Query the modules that are credit-bearing internships
-        credit_internships = set(
-            self._conn.query(
-                GET_CREDIT_INTERNSHIPS_QUERY,
-                ttl=3600
-            )["internship_code"]
-        )
-
-        return credit_internships
-
-
-    def get_module_infos(self) -> dict[str, dict[str, float | bool]]:
-        rows_queried = self._conn.query(
-            GET_MODULES_INFO_FOR_PLANNER_QUERY,
-            ttl=3600
-        ).values.tolist()
-
-        # Maps each module to its number of MCs, and whether or not it is year-long
-        module_infos = {
-            module_code: {
-                "num_mcs": float(num_mcs),
-                "is_year_long": is_year_long
-            } for module_code, num_mcs, is_year_long in rows_queried
-        }
-
-        return module_infos
 
-
-    def __init__(self, conn: st.connections.SQLConnection, user: User, list_of_ays: list[str]):
+class CoursePlanChecker(object):
+    ### FUNCTIONS FOR CHECKER INITIALISATION ###
+    def __init__(self, conn: st.connections.SQLConnection, user: "User", list_of_ays: list[str]):
         # Assign connection as an attribute
         self._conn = conn
 
         # Get number of years that user is required to study for, based on his / her major
-        self._num_years_to_grad = self._conn.query(
+        num_years_to_grad = self._conn.query(
             GET_EXISTING_MAJOR_QUERY,
             params={
                 "major": user.major
@@ -54,27 +31,45 @@ class CoursePlanChecker(object):
             ttl=3600
         ).iloc[0]["num_years"]
 
+        # Get module info required for planner (MCs, year-long modules, credit-bearing internships and semester info)
+        # These are shared by all users
+        self.load_shared_data()
+
+        # Set up the user's plan
+        self.initialise_plan_state(list_of_ays=list_of_ays, matriculation_ay=user.matriculation_ay, num_years_to_grad=num_years_to_grad)
+
+
+    # Creates a checker from shared planner data that has already been loaded, without a database connection or a Streamlit session
+    # Useful for checking plans outside of the app (eg. batch validation)
+    @classmethod
+    def from_shared_data(cls, module_catalog: ModuleCatalog, prereq_store: PrereqStore, offers_index: OffersIndex, list_of_ays: list[str], matriculation_ay: str, num_years_to_grad: int) -> "CoursePlanChecker":
+        checker = cls.__new__(cls)
+        checker._conn = None
+        checker._module_catalog = module_catalog
+        checker._sem_info = module_catalog.sem_info
+        checker._prereq_store = prereq_store
+        checker._offers_index = offers_index
+        checker._prereq_graphs = dict()
+        checker.initialise_plan_state(list_of_ays=list_of_ays, matriculation_ay=matriculation_ay, num_years_to_grad=num_years_to_grad)
+
+        return checker
+
+
+    def initialise_plan_state(self, list_of_ays: list[str], matriculation_ay: str, num_years_to_grad: int) -> None:
+        # Number of years that user is required to study for
+        self._num_years_to_grad = num_years_to_grad
+
         # Assign other relevant parameters for course checking
         self._max_mcs_first_sem = MAX_MCS_FIRST_SEM      # Max number of MCs that can be taken in user's first semester
         self._min_mcs_to_grad = self._num_years_to_grad * AVERAGE_MCS_PER_AY      # Min number of MCs needed to graduate. On average, 40 MCs are taken per year
 
         # Get the AYs during which the user will be studying (capped off by current AY)
-        first_ay = user.matriculation_ay
+        first_ay = matriculation_ay
         first_ay_index = list_of_ays.index(first_ay)
         ibloc_ay_index = first_ay_index - 1     # IBLOCs are taken in the AY before the user matriculates (eg. Special Term 1)
         ibloc_ay = list_of_ays[ibloc_ay_index]
         self._ays_for_user = list_of_ays[ibloc_ay_index: first_ay_index + self._num_years_to_grad]
 
-        # Get module info required for planner
-        # Maps each module to its number of MCs, and whether or not it is year-long
-        self._module_infos = self.get_module_infos()
-
-        # Get semester info (list) in the form (sem_num, sem_name, min_mcs)
-        self._sem_info = get_semester_info(conn=self._conn)
-
-        # Get list of credit-bearing internships
-        self._credit_internships = self.get_credit_internships()
-
         # Initialise default selections for selectboxes (memorise user's choices)
         # Structure: Keys are AYs. Values are themselves dictionaries, with keys = sem_num and 
         # values = list of default module names for that semester's selectbox
@@ -86,15 +81,45 @@ class CoursePlanChecker(object):
         # NOTE: If this is None, it means the plan has already become invalid somewhere along the line
         self._plan = dict()
 
-        # Initialise dictionary of plans that have already been checked for their validity
-        # Keys: Tuple of frozensets, one frozenset per term representing the set of module codes
-        # taken that term. Frozensets are in chronological order of terms
-        # Values: A dictionary consisting of the type of Streamlit display message that the user will receive, alongside the message content
-        self._course_plans_checked = dict()
-
         # Track total number of MCs taken
         self._total_mcs_taken = 0.0
 
+        # Index of the module codes in the plan, for resolving prerequisites. Kept in sync with the plan as terms are added
+        self._completed_code_index = CompletedCodeIndex()
+
+        # Terms that the user can plan for, in chronological order, in the form (acad_year, sem_num)
+        self._terms = [(ibloc_ay, IBLOCS_SEM_NUM)] + [(ay, sem_num) for ay in self._ays_for_user[1:] for sem_num, _, _ in self._sem_info]
+        self._term_indices = {term: term_index for term_index, term in enumerate(self._terms)}
+
+        # Validated state of each term handled so far, in chronological order. The state of a term only depends on the
+        # terms before it, so on a rerun, terms before the first edited term can be reused without being checked again
+        # Each state is a dictionary with keys "selected_module_codes", "message_type", "message", "selected_total_mcs",
+        # "total_mcs_taken_before", "is_plan_valid_before" and "is_added_to_plan"
+        self._term_states = list()
+
+        # Maps each term to the list of module names offered to the user. Only depends on the terms before it
+        self._term_mod_choices = dict()
+
+        # Index of the earliest term whose selection has been edited since the last rerun
+        self._first_dirty_term_index = 0
+
+
+    def load_shared_data(self) -> None:
+        # Get the catalog of modules, shared by all users
+        self._module_catalog = load_module_catalog(_conn=self._conn)
+
+        # Get semester info (tuple) in the form (sem_num, sem_name, min_mcs)
+        self._sem_info = self._module_catalog.sem_info
+
+        # Get the prerequisite trees of all modules, shared by all users
+        self._prereq_store = load_prereq_store(_conn=self._conn)
+
+        # Get the offerings of all modules, shared by all users
+        self._offers_index = load_offers_index(_conn=self._conn)
+
+        # Prerequisite graphs of the AYs used so far, fetched on first use
+        self._prereq_graphs = dict()
+
 
     ### GETTERS ###
     @property
@@ -103,8 +128,8 @@ class CoursePlanChecker(object):
     
 
     @property
-    def sem_info(self) -> list[list[int | str | np.float64]]:
-        return self._ays_for_user
+    def sem_info(self) -> tuple[tuple[int, str, float], ...]:
+        return self._sem_info
     
 
     @property
@@ -127,23 +152,40 @@ class CoursePlanChecker(object):
         return self._min_mcs_to_grad
     
 
+    @property
+    def max_mcs_first_sem(self) -> float:
+        return self._max_mcs_first_sem
+    
+
+    @property
+    def terms(self) -> list[tuple[str, int]]:
+        return self._terms
+    
+
+    @property
+    def module_catalog(self) -> ModuleCatalog:
+        return self._module_catalog
+    
+
     ### MANAGING COURSE PLANS IN DIFFERENT FORMATS ###
-    def convert_plan_to_frozenset_format(self) -> tuple[frozenset[str]]:
-        # Structure of frozenset format: Tuple of frozensets, one frozenset per term representing the set of module codes
-        # taken that term. Frozensets are in chronological order of terms
-        frozensets_of_module_codes = list()
-        for acad_year, acad_year_plan in self._plan.items():
-            for sem_num, module_codes in acad_year_plan.items():
-                module_codes_for_term = frozenset(module_codes)
-                frozensets_of_module_codes.append(module_codes_for_term)
-        
-        return tuple(frozensets_of_module_codes)
+    def get_validation_cache_key(self, acad_year: str, sem_num: int, selected_module_codes: list[str], sem_min_mcs: float, is_y1s1_for_user: bool) -> tuple:
+        # Plans are shared across users, so the key must contain everything that the validation result depends on
+        # Structure: (min_mcs_to_grad, sem_min_mcs, is_y1s1_for_user, terms), where terms is a tuple with one entry per term
+        # in chronological order, ending with the new selection. Each entry is in the form (acad_year, sem_num, sorted module codes)
+        terms = list()
+        for plan_acad_year in sorted(self._plan.keys()):
+            for plan_sem_num in sorted(self._plan[plan_acad_year].keys()):
+                terms.append((plan_acad_year, plan_sem_num, tuple(sorted(self._plan[plan_acad_year][plan_sem_num]))))
+
+        terms.append((acad_year, sem_num, tuple(sorted(selected_module_codes))))
+
+        return (float(self._min_mcs_to_grad), float(sem_min_mcs), is_y1s1_for_user, tuple(terms))
     
 
     ### MANAGE DEFAULT SELECTBOX SELECTIONS ###
     def get_default_selection_for_term_during_check(self, acad_year: str, sem_num: int) -> list[str]:
         # If plan is already invalid, set default options for selectbox to an empty list
-        if self._plan is None:
+        if not self.is_plan_valid_before_term(acad_year=acad_year, sem_num=sem_num):
             self._course_default_selections[acad_year][sem_num] = list()
 
         return self._course_default_selections[acad_year][sem_num]
@@ -151,15 +193,20 @@ class CoursePlanChecker(object):
 
     def set_default_selection_for_term(self, acad_year: str, sem_num: int, new_default_selection: list[str]) -> None:
         self._course_default_selections[acad_year][sem_num] = new_default_selection
+        self.mark_term_dirty(acad_year=acad_year, sem_num=sem_num)
 
 
     # If a default selection is edited, make sure to remove these modules from subsequent default selections
     # This ensures default selections never include module names from earlier default selections
-    def remove_edited_selection_from_subsequent_selections(self, edited_selection: list[str], subsequent_selection_acad_year: str, subsequent_selection_sem_num: int) -> None:
+    def remove_edited_selection_from_subsequent_selections(self, edited_selection: set[str], subsequent_selection_acad_year: str, subsequent_selection_sem_num: int) -> None:
         subsequent_selection = self._course_default_selections[subsequent_selection_acad_year][subsequent_selection_sem_num]
-        for module_name in edited_selection:
-            if module_name in subsequent_selection:
-                subsequent_selection.remove(module_name)
+        if edited_selection.isdisjoint(subsequent_selection):
+            return
+
+        self._course_default_selections[subsequent_selection_acad_year][subsequent_selection_sem_num] = [
+            module_name for module_name in subsequent_selection if module_name not in edited_selection
+        ]
+        self.mark_term_dirty(acad_year=subsequent_selection_acad_year, sem_num=subsequent_selection_sem_num)
     
 
     # If a default selection is edited, we want to ensure that the AY is consistent, with regards to year-long modules
@@ -172,7 +219,7 @@ class CoursePlanChecker(object):
         year_long_module_names_in_edited_selection = dict()
         for edited_module_name in edited_selection:
             edited_module_code = edited_module_name.split()[0]
-            edited_module_is_year_long = self._module_infos[edited_module_code]["is_year_long"]
+            edited_module_is_year_long = self._module_catalog.is_year_long(edited_module_code)
             if edited_module_is_year_long:
                 # Get the sem_nums in which this year-long module is being offered, for this AY
                 terms_offered = self.get_terms_offered_for_module(module_code=edited_module_code, acad_year=acad_year)
@@ -182,9 +229,10 @@ class CoursePlanChecker(object):
 
         # Get new list of module names for the target selection
         new_target_selection = list()
+        new_target_selection_set = set()
         for target_module_name in target_selection:
             target_module_code = target_module_name.split()[0]
-            target_module_is_year_long = self._module_infos[target_module_code]["is_year_long"]
+            target_module_is_year_long = self._module_catalog.is_year_long(target_module_code)
             if target_module_is_year_long:
                 # Get the sem_nums in which this year-long module is being offered, for this AY
                 target_module_terms_offered = self.get_terms_offered_for_module(module_code=target_module_code, acad_year=acad_year)
@@ -196,15 +244,18 @@ class CoursePlanChecker(object):
 
             # Module should still stay in the target selection
             new_target_selection.append(target_module_name)
+            new_target_selection_set.add(target_module_name)
 
         # Add new year-long modules from the edited selection into the target selection,
         # if these modules are also offered in the term corresponding to the target selection
         for year_long_module_name, year_long_module_terms_offered in year_long_module_names_in_edited_selection.items():
-            if year_long_module_name not in new_target_selection and target_sem_num in year_long_module_terms_offered:
+            if year_long_module_name not in new_target_selection_set and target_sem_num in year_long_module_terms_offered:
                 new_target_selection.append(year_long_module_name)
         
         # Update target selection
-        self._course_default_selections[acad_year][target_sem_num] = new_target_selection
+        if new_target_selection != target_selection:
+            self._course_default_selections[acad_year][target_sem_num] = new_target_selection
+            self.mark_term_dirty(acad_year=acad_year, sem_num=target_sem_num)
 
 
     ### RESET CHECKER ###
@@ -212,45 +263,91 @@ class CoursePlanChecker(object):
         # Reset the course plan built and the total number of MCs
         self._plan = dict()
         self._total_mcs_taken = 0.0
+        self._completed_code_index.clear()
+
+        # Forget the validated state of all terms
+        self._term_states = list()
+        self._term_mod_choices = dict()
+        self._first_dirty_term_index = 0
+
+
+    def is_plan_valid_before_term(self, acad_year: str, sem_num: int) -> bool:
+        # Terms that have already been handled remember whether the plan was valid before them
+        term_index = self._term_indices[(acad_year, sem_num)]
+        if term_index < len(self._term_states):
+            return self._term_states[term_index]["is_plan_valid_before"]
+
+        return self._plan is not None
+
+
+    def mark_term_dirty(self, acad_year: str, sem_num: int) -> None:
+        # This term, and all terms after it, will be checked again on the next rerun
+        term_index = self._term_indices.get((acad_year, sem_num))
+        if term_index is not None:
+            self._first_dirty_term_index = min(self._first_dirty_term_index, term_index)
+
+
+    def roll_back_to_term(self, term_index: int) -> None:
+        # Undo the terms from the given term onwards, so that the checker is left in the state right before that term
+        if term_index >= len(self._term_states):
+            return
+
+        for acad_year, sem_num in self._terms[term_index + 1:]:
+            # Module choices for the terms after the given term depend on the given term, so they are no longer valid
+            self._term_mod_choices.pop((acad_year, sem_num), None)
+
+        for (acad_year, sem_num), term_state in reversed(list(zip(self._terms[term_index:], self._term_states[term_index:]))):
+            if term_state["is_added_to_plan"]:
+                # Remove this term's modules from the plan
+                for module_code in term_state["selected_module_codes"]:
+                    self._completed_code_index.remove(module_code)
+
+                if self._plan is not None:
+                    del self._plan[acad_year][sem_num]
+                    if not self._plan[acad_year]:
+                        del self._plan[acad_year]
+
+        # Restore total number of MCs taken, right before the given term
+        self._total_mcs_taken = self._term_states[term_index]["total_mcs_taken_before"]
+        del self._term_states[term_index:]
+
+        # If the plan only became invalid from the given term onwards, it is valid again - rebuild it from the remaining terms
+        if self._plan is None and all(term_state["is_added_to_plan"] for term_state in self._term_states):
+            self._plan = dict()
+            for (acad_year, sem_num), term_state in zip(self._terms, self._term_states):
+                self._plan.setdefault(acad_year, dict())[sem_num] = list(term_state["selected_module_codes"])
+
+
+    def prepare_for_rerun(self) -> None:
+        # If the shared data has been reloaded (eg. after an admin refresh), switch over to it, and check all terms again
+        module_catalog, prereq_store, offers_index = self._module_catalog, self._prereq_store, self._offers_index
+        self.load_shared_data()
+        if self._module_catalog is not module_catalog or self._prereq_store is not prereq_store or self._offers_index is not offers_index:
+            self.reset()
+
+        # Only the terms from the earliest edited term onwards need to be checked again
+        # The states of the terms before it are reused as they are
+        self.roll_back_to_term(term_index=self._first_dirty_term_index)
+        self._first_dirty_term_index = len(self._terms)
 
 
     ### PREPARATION FOR USER'S COURSE SELECTION ###
-    def get_available_modules_for_term(self, acad_year: str, sem_num: int) -> list[list[str]]:
+    def get_available_module_options_for_term(self, acad_year: str, sem_num: int) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        # Options are in the form (module_codes, formatted_module_names), precomputed for each term and shared by all users
         # Check if selected AY is the IBLOC AY for user
         if acad_year == self._ays_for_user[0]:
             # Selected AY is the IBLOC AY - only retrieve the IBLOC modules
-            available_modules = self._conn.query(
-                GET_IBLOC_AY_MODULES_QUERY,
-                ttl=3600
-            ).values.tolist()
+            return self._offers_index.get_ibloc_module_options()
 
-        else:
-            # Query the modules available for the selected term - a list of lists in the form (module_code, module_title)
-            available_modules = self._conn.query(
-                GET_SPECIFIC_TERM_MODULES_QUERY,
-                params={
-                    "acad_year": acad_year,
-                    "sem_num": sem_num
-                },
-                ttl=3600
-            ).values.tolist()
-
-        return available_modules
-    
-
-    def get_completed_module_codes_from_plan(self) -> list[str]:
-        completed_module_codes = list()
-
-        for acad_year, acad_year_plan in self._plan.items():
-            for sem_num, module_codes in acad_year_plan.items():
-                # We have already ensured that there will never be repeated module codes across the terms (except for year-long modules)
-                # This is because user will only choose among modules that they have not taken yet
-                completed_module_codes.extend(module_codes)
-
-        return completed_module_codes
+        # Get the modules available for the selected term
+        return self._offers_index.get_term_module_options(acad_year=acad_year, sem_num=sem_num)
 
 
     def get_list_of_mod_choices_for_term(self, acad_year: str, sem_num: int) -> list[str]:
+        # Reuse the module choices for this term, if the terms before it have not changed
+        if (acad_year, sem_num) in self._term_mod_choices:
+            return self._term_mod_choices[(acad_year, sem_num)]
+
         # If current plan is None (already invalid), there should be no selections given
         if self._plan is None:
             return list()
@@ -259,55 +356,47 @@ class CoursePlanChecker(object):
         if not self._plan:
             # If plan is empty (current term is the very first term), set previous term's module selection is empty
             previous_term_ay = None
-            previous_term_sem_num = None
-            previous_term_module_selection = list()
+            previous_term_module_selection = frozenset()
 
         else:
-            previous_term_ay = sorted(self._plan.keys())[-1]
-            previous_term_sem_num = sorted(self._plan[previous_term_ay].keys())[-1]
-            previous_term_module_selection = self._plan[previous_term_ay][previous_term_sem_num]
-
-        # Get modules offered for this term in this AY - a list of lists in the form (module_code, module_title)
-        available_modules = self.get_available_modules_for_term(acad_year=acad_year, sem_num=sem_num)
+            previous_term_ay = max(self._plan.keys())
+            previous_term_sem_num = max(self._plan[previous_term_ay].keys())
+            previous_term_module_selection = frozenset(self._plan[previous_term_ay][previous_term_sem_num])
 
-        # Get list of module codes completed already
-        completed_module_codes = self.get_completed_module_codes_from_plan()
+        # Get modules offered for this term in this AY
+        available_module_codes, available_module_names = self.get_available_module_options_for_term(acad_year=acad_year, sem_num=sem_num)
 
         # Get list of formatted names corresponding to all the remaining modules that have not been taken yet
+        # Module codes completed already are looked up in the index of the plan's module codes
         module_name_selections = list()
-        for module_code, module_title in available_modules:
-            if module_code in completed_module_codes:
+        for module_code, formatted_module_name in zip(available_module_codes, available_module_names):
+            if module_code in self._completed_code_index:
                 # Edge case to handle: Module has been completed already, but...
                 # - It is a year-long module
                 # - It was taken in the previous term
                 # - The previous term is still in the same academic year as this current term
                 # Which means this module should still be taken this term
-                module_is_year_long = self._module_infos[module_code]["is_year_long"]
-                if not (module_is_year_long and module_code in previous_term_module_selection and previous_term_ay == acad_year):
+                if not (previous_term_ay == acad_year and module_code in previous_term_module_selection and self._module_catalog.is_year_long(module_code)):
                     # Not the edge case - skip this module as it should not be taken this term
                     continue
 
-            formatted_module_name = f"{module_code} {module_title}"
             module_name_selections.append(formatted_module_name)
 
+        self._term_mod_choices[(acad_year, sem_num)] = module_name_selections
+
         return module_name_selections
     
 
-    ### GET DETAILS OF USER'S SELECTION ###
-    def get_terms_offered_for_module(self, module_code: str, acad_year: str) -> list[int]:
-        # Query the semester numbers that have the given module
-        terms_offered = list(
-            self._conn.query(
-                GET_TERMS_OFFERED_FOR_SPECIFIC_MODULE_QUERY,
-                params={
-                    "module_code": module_code,
-                    "acad_year": acad_year
-                },
-                ttl=3600
-            )["sem_num"]
-        )
+    def rank_mod_choices_by_unlocks(self, module_name_choices: list[str], acad_year: str) -> list[str]:
+        # Modules that eventually unlock the most other modules come first. Ties keep their original order
+        prereq_graph = self.get_prereq_graph(acad_year=acad_year)
+        return sorted(module_name_choices, key=lambda module_name: -prereq_graph.get_num_modules_unlocked(module_name.split()[0]))
+
 
-        return terms_offered
+    ### GET DETAILS OF USER'S SELECTION ###
+    def get_terms_offered_for_module(self, module_code: str, acad_year: str) -> tuple[int, ...]:
+        # Get the semester numbers that have the given module
+        return self._offers_index.get_terms_offered(module_code=module_code, acad_year=acad_year)
 
 
     def get_total_mcs_for_term(self, module_codes_for_term: list[str], acad_year: str) -> float:
@@ -315,7 +404,7 @@ class CoursePlanChecker(object):
 
         # Get number of MCs for each module chosen for the term
         for module_code in module_codes_for_term:
-            module_mcs, module_is_year_long = self._module_infos[module_code]["num_mcs"], self._module_infos[module_code]["is_year_long"]
+            module_mcs, module_is_year_long = self._module_catalog.get_num_mcs(module_code), self._module_catalog.is_year_long(module_code)
 
             # If module is year-long, number of MCs should be divided equally across each term that it is being taken
             # We also make sure that we do not do this for year-long modules in IBLOC AY, but it should be impossible
@@ -331,89 +420,96 @@ class CoursePlanChecker(object):
 
     ### CHECK USER'S SELECTION ###
     def get_prereq_tree(self, module_code: str, acad_year: str) -> dict | None:
-        # NUSMods has no information on prerequisite trees for AY2022-2023. 
-        # Use data from AY2023-2024 instead - it's close enough bro
-        if acad_year == "2022-2023":
-            acad_year = "2023-2024"
+        # Prerequisite trees are fetched from NUSMods during the academic database refresh, and shared by all users
+        # NOTE: NUSMods has no information on prerequisite trees for AY2022-2023 - this is handled during the refresh
+        return self._prereq_store.get_prereq_tree(module_code=module_code, acad_year=acad_year)
 
-        # Use NUSMods API to get detailed information about the specified module, for the chosen academic year
-        nusmods_endpoint_url = f"https://api.nusmods.com/v2/{acad_year}/modules/{module_code}.json"
-        response = requests.get(url=nusmods_endpoint_url)
 
-        if response.status_code != 200:
-            raise Exception("Unsuccessful request to NUSMods API")
+    def get_compiled_prereq(self, module_code: str, acad_year: str) -> CompiledPrereq | None:
+        # Trees are compiled once, and shared by all users
+        return self._prereq_store.get_compiled_prereq(module_code=module_code, acad_year=acad_year)
 
-        # Successful GET request
-        module_info = response.json()
 
-        if "prereqTree" not in module_info:
-            # Module has no prerequisites
-            return None
+    def get_prereq_graph(self, acad_year: str) -> PrereqGraph:
+        # Graphs are precomputed once for each AY, and shared by all users
+        if acad_year not in self._prereq_graphs:
+            if self._conn is None:
+                # Checker was created from shared data directly - build the graph from that same data
+                self._prereq_graphs[acad_year] = PrereqGraph.build(module_catalog=self._module_catalog, prereq_store=self._prereq_store, acad_year=acad_year)
 
-        return module_info["prereqTree"]
+            else:
+                self._prereq_graphs[acad_year] = load_prereq_graph(_conn=self._conn, acad_year=acad_year)
 
+        return self._prereq_graphs[acad_year]
 
-    def check_if_prereqs_satisfied(self, prereq_tree: dict | str | None, completed_module_codes: list[str]) -> bool:
-        if prereq_tree is None:
-            # Base case 1: No prerequisites, vacuously true
-            return True
-        
-        if type(prereq_tree) == str:
-            # Base case 2: Tree is simply a module - check if it has been taken already
-            # Remove grade. The module code obtained might have %, which is a wildcard
-            # Eg. CS1010% = Any module starting with CS1010
-            module_code_with_wildcard = prereq_tree.split(":")[0]
-
-            # Change any % sign into the correct regex
-            module_code_regex = module_code_with_wildcard.replace("%", ".*")
-
-            # Check for at least one match in the list of completed module codes
-            for completed_module_code in completed_module_codes:
-                if re.search(module_code_regex, completed_module_code):
-                    return True
-            
-            return False
-
-        # How the next layer of trees are aggregated (can be "and", "or", "nOf")
-        [operation,] = list(prereq_tree.keys())
-
-        if operation == "and":
-            # Get list of trees in the layer below
-            next_layer_trees = prereq_tree[operation]
-
-            for tree in next_layer_trees:
-                # For "and" operation, all the next layer trees must be satisfied
-                if not self.check_if_prereqs_satisfied(prereq_tree=tree, completed_module_codes=completed_module_codes):
-                    return False
-            
-            return True
 
-        if operation == "or":
-            # Get list of trees in the layer below
-            next_layer_trees = prereq_tree[operation]
+    def get_compiled_preclusion(self, module_code: str, acad_year: str) -> CompiledPrereq | None:
+        return self._prereq_store.get_compiled_preclusion(module_code=module_code, acad_year=acad_year)
 
-            for tree in next_layer_trees:
-                # For "or" operation, at least one of the next layer trees must be satisfied
-                if self.check_if_prereqs_satisfied(prereq_tree=tree, completed_module_codes=completed_module_codes):
-                    return True
-            
-            return False
 
-        # Operation is "nOf" - at least n (minimum number of requirements to be fulfilled)
-        # Get n and list of trees in the layer below
-        min_num_requirements, next_layer_trees = prereq_tree[operation]
+    def is_preclusion_from_text(self, module_code: str, acad_year: str) -> bool:
+        return self._prereq_store.is_preclusion_from_text(module_code=module_code, acad_year=acad_year)
 
-        num_requirements_fulfilled = 0
 
-        for tree in next_layer_trees:
-            # For "nOf" operation, at least n of the next layer trees must be satisfied
-            if self.check_if_prereqs_satisfied(prereq_tree=tree, completed_module_codes=completed_module_codes):
-                num_requirements_fulfilled += 1
+    def get_compiled_coreq(self, module_code: str, acad_year: str) -> CompiledPrereq | None:
+        return self._prereq_store.get_compiled_coreq(module_code=module_code, acad_year=acad_year)
 
-                if num_requirements_fulfilled == min_num_requirements:
-                    return True
-        
-        return False
+
+    def check_preclusions_and_coreqs(self, acad_year: str, selected_module_codes: list[str], completed_code_index: CompletedCodeIndex | None = None) -> tuple[list[str], list[str]]:
+        # Returns the selected modules that are precluded, and the selected modules whose corequisites are not met
+        # Modules in the same term can preclude each other, and corequisites can be taken in the same term, so the selection
+        # is checked together with the modules taken before it. Uses the checker's own index, unless another one is given
+        if completed_code_index is None:
+            completed_code_index = self._completed_code_index
+
+        # Most modules have neither preclusions nor corequisites
+        module_requirements = list()
+        for selected_module_code in selected_module_codes:
+            compiled_preclusion = self.get_compiled_preclusion(module_code=selected_module_code, acad_year=acad_year)
+            compiled_coreq = self.get_compiled_coreq(module_code=selected_module_code, acad_year=acad_year)
+            if compiled_preclusion is not None or compiled_coreq is not None:
+                module_requirements.append((selected_module_code, compiled_preclusion, compiled_coreq))
+
+        if not module_requirements:
+            return list(), list()
+
+        module_codes_precluded = list()
+        module_codes_with_failed_coreqs = list()
+        for selected_module_code in selected_module_codes:
+            completed_code_index.add(selected_module_code)
+
+        try:
+            for selected_module_code, compiled_preclusion, compiled_coreq in module_requirements:
+                # A module never precludes itself (eg. CS1010S, with a preclusion of CS1010%), even if it is year-long and
+                # was already taken in the previous term. Hide it from the index while checking its own requirements
+                num_times_taken = completed_code_index.get_count(selected_module_code)
+                for _ in range(num_times_taken):
+                    completed_code_index.remove(selected_module_code)
+
+                if compiled_preclusion is not None and compiled_preclusion.is_satisfied(completed_code_index=completed_code_index):
+                    module_codes_precluded.append(selected_module_code)
+
+                if compiled_coreq is not None and not compiled_coreq.is_satisfied(completed_code_index=completed_code_index):
+                    module_codes_with_failed_coreqs.append(selected_module_code)
+
+                for _ in range(num_times_taken):
+                    completed_code_index.add(selected_module_code)
+
+        finally:
+            # Restore the index
+            for selected_module_code in selected_module_codes:
+                completed_code_index.remove(selected_module_code)
+
+        return module_codes_precluded, module_codes_with_failed_coreqs
+
+
+    def check_if_prereqs_satisfied(self, compiled_prereq: CompiledPrereq | None) -> bool:
+        if compiled_prereq is None:
+            # No prerequisites, vacuously true
+            return True
+
+        # Leaves are resolved against the index of module codes completed so far
+        return compiled_prereq.is_satisfied(completed_code_index=self._completed_code_index)
 
 
     def check_module_selection_for_term(self, acad_year: str, selected_module_codes: list[str], selected_total_mcs: float, sem_min_mcs: float, is_y1s1_for_user: bool) -> dict[str, bool | str]:
@@ -424,7 +520,7 @@ class CoursePlanChecker(object):
         # Check if a credit-bearing internship is being taken
         is_taking_cred_internship = False
         for selected_module_code in selected_module_codes:
-            if selected_module_code in self._credit_internships:
+            if self._module_catalog.is_credit_internship(selected_module_code):
                 is_taking_cred_internship = True
 
         # Get remaining MCs to clear (before current selection), in order to graduate
@@ -445,21 +541,31 @@ class CoursePlanChecker(object):
             result["message"] = f"You have exceeded the limit of {self._max_mcs_first_sem} MCs."
             return result
 
-        # Get the module codes that have already been taken
-        completed_module_codes = self.get_completed_module_codes_from_plan()
-        
+        # Check for preclusions and corequisites, against the modules taken before this term, along with this selection
+        module_codes_precluded, module_codes_with_failed_coreqs = self.check_preclusions_and_coreqs(acad_year=acad_year, selected_module_codes=selected_module_codes)
+
+        # Preclusions guessed from plain text (when NUSMods has no rule for them) can pick up modules that are only
+        # mentioned in passing, so they only give a warning
+        module_codes_possibly_precluded = [module_code for module_code in module_codes_precluded if self.is_preclusion_from_text(module_code=module_code, acad_year=acad_year)]
+        module_codes_precluded = [module_code for module_code in module_codes_precluded if module_code not in module_codes_possibly_precluded]
+        if module_codes_precluded:
+            result["type"] = "error"
+            result["message"] = f"The following courses are precluded by other courses in your plan: {', '.join(module_codes_precluded)}."
+            return result
+
         # Check if prerequisites have already been taken
         # Loop through each module chosen
         module_codes_with_failed_prereqs = list()
         for selected_module_code in selected_module_codes:
-            # Get prerequisite tree
-            selected_module_prereq_tree = self.get_prereq_tree(module_code=selected_module_code, acad_year=acad_year)
+            # Get compiled prerequisite tree
+            selected_module_compiled_prereq = self.get_compiled_prereq(module_code=selected_module_code, acad_year=acad_year)
 
             # Check if prerequisites have been met, for this module
-            if not self.check_if_prereqs_satisfied(prereq_tree=selected_module_prereq_tree, completed_module_codes=completed_module_codes):
+            if not self.check_if_prereqs_satisfied(compiled_prereq=selected_module_compiled_prereq):
                 # Update list of modules whose prerequisites have not been met
                 module_codes_with_failed_prereqs.append(selected_module_code)
 
+        warning_messages = list()
         if module_codes_with_failed_prereqs:
             # There are some modules whose prerequisites may not have been taken
             # We can only give a warning and not an error, because checking for prerequisites using trees alone
@@ -470,8 +576,19 @@ class CoursePlanChecker(object):
             # A student that has not taken these modules can still take DSA1101 if he / she has taken A Math,
             # but he / she will still fail the tree requirements. But it would be unfair to flag an error here
 
+            warning_messages.append(f"You may not have satisfied the prerequisites for the following courses: {', '.join(module_codes_with_failed_prereqs)}.")
+
+        if module_codes_with_failed_coreqs:
+            # Corequisites must be taken in the same term (or before). Just like prerequisites, the rules can omit
+            # non-modular requirements, so only a warning is given
+            warning_messages.append(f"You may not have satisfied the corequisites for the following courses: {', '.join(module_codes_with_failed_coreqs)}.")
+
+        if module_codes_possibly_precluded:
+            warning_messages.append(f"The following courses may be precluded by other courses in your plan: {', '.join(module_codes_possibly_precluded)}.")
+
+        if warning_messages:
             result["type"] = "warning"
-            result["message"] = f"You may not have satisfied the prerequisites for the following courses: {', '.join(module_codes_with_failed_prereqs)}. Please verify before proceeding."
+            result["message"] = f"{' '.join(warning_messages)} Please verify before proceeding."
             return result
         
         # Selection is valid
@@ -490,6 +607,10 @@ class CoursePlanChecker(object):
 
             self._plan[acad_year][sem_num] = selected_module_codes
 
+            # Later terms can use the modules in this selection to satisfy their prerequisites
+            for selected_module_code in selected_module_codes:
+                self._completed_code_index.add(selected_module_code)
+
             # Update total number of MCs taken
             self._total_mcs_taken += selected_total_mcs
 
@@ -504,10 +625,48 @@ class CoursePlanChecker(object):
             self._course_default_selections[acad_year][sem_num] = list()
 
 
+    def reject_selection_for_term(self, acad_year: str, sem_num: int, selected_module_codes: list[str], message: str) -> None:
+        # Mark the term as invalid without checking it (eg. the selection has modules that cannot be chosen for this term)
+        total_mcs_taken_before = self._total_mcs_taken
+        is_plan_valid_before = self._plan is not None
+
+        self.update_checker(
+            acad_year=acad_year,
+            sem_num=sem_num,
+            selected_module_codes=selected_module_codes,
+            selected_module_names=list(),
+            selected_total_mcs=0.0,
+            message_type="error"
+        )
+
+        self._term_states.append({
+            "selected_module_codes": tuple(selected_module_codes),
+            "message_type": "error",
+            "message": message,
+            "selected_total_mcs": 0.0,
+            "total_mcs_taken_before": total_mcs_taken_before,
+            "is_plan_valid_before": is_plan_valid_before,
+            "is_added_to_plan": False
+        })
+
+
     def handle_user_selection_for_term(self, selected_module_names: list[str], acad_year: str, sem_num: int, sem_min_mcs: float, is_y1s1_for_user: bool) -> tuple[str, str, float]:
         # Get list of selected module codes from the module names
         selected_module_codes = [module_name.split()[0] for module_name in selected_module_names]
 
+        # If this term has already been checked, and neither it nor the terms before it have changed, reuse its state
+        term_index = self._term_indices[(acad_year, sem_num)]
+        if term_index < len(self._term_states):
+            term_state = self._term_states[term_index]
+            if term_state["selected_module_codes"] == tuple(selected_module_codes):
+                return term_state["message_type"], term_state["message"], term_state["selected_total_mcs"]
+
+            # Selection has changed - this term, and all terms after it, must be checked again
+            self.roll_back_to_term(term_index=term_index)
+
+        # Keep track of the state before this term, in case it has to be rolled back later
+        total_mcs_taken_before = self._total_mcs_taken
+
         # Get number of MCs in the current selection
         selected_total_mcs = self.get_total_mcs_for_term(module_codes_for_term=selected_module_codes, acad_year=acad_year)
 
@@ -515,22 +674,30 @@ class CoursePlanChecker(object):
         if self._plan is None:
             message_type = "error"
             message = "Course selections for previous terms are already invalid. Please review."
+            self._term_states.append({
+                "selected_module_codes": tuple(selected_module_codes),
+                "message_type": message_type,
+                "message": message,
+                "selected_total_mcs": selected_total_mcs,
+                "total_mcs_taken_before": total_mcs_taken_before,
+                "is_plan_valid_before": False,
+                "is_added_to_plan": False
+            })
             return message_type, message, selected_total_mcs
 
         # Check if user's selection is valid
-        # Get course plan with the user's new selection, in frozenset format
-        plan_with_new_selection_frozenset = self.convert_plan_to_frozenset_format() + (frozenset(selected_module_codes),)
-        
-        if plan_with_new_selection_frozenset in self._course_plans_checked:
-            # If course plan (with the user's new selection) has already been checked before,
-            # simply get the pre-saved result
-            # Result comprises of: 
-            # - Type of Streamlit display message that the user will receive
-            # - The message content
-            message_type = self._course_plans_checked[plan_with_new_selection_frozenset]["message_type"]
-            message = self._course_plans_checked[plan_with_new_selection_frozenset]["message"]
+        # Get course plan with the user's new selection, in the format used by the validation cache
+        validation_cache_key = self.get_validation_cache_key(
+            acad_year=acad_year,
+            sem_num=sem_num,
+            selected_module_codes=selected_module_codes,
+            sem_min_mcs=sem_min_mcs,
+            is_y1s1_for_user=is_y1s1_for_user
+        )
+        result = validation_cache.get(key=validation_cache_key)
 
-        else:
+        if result is None:
+            # Course plan (with the user's new selection) has not been checked before, by any user
             # Check whether or not the new selection is valid
             result = self.check_module_selection_for_term(
                 acad_year=acad_year,
@@ -540,14 +707,14 @@ class CoursePlanChecker(object):
                 is_y1s1_for_user=is_y1s1_for_user
             )
 
-            message_type = result["type"]
-            message = result["message"]
+            # Add course plan with the new selection to the validation cache for memoisation
+            validation_cache.put(key=validation_cache_key, value=result)
 
-            # Add course plan with the new selection (frozenset format) to session state for memoisation
-            self._course_plans_checked[plan_with_new_selection_frozenset] = {
-                "message_type": message_type,
-                "message": message
-            }
+        # Result comprises of: 
+        # - Type of Streamlit display message that the user will receive
+        # - The message content
+        message_type = result["type"]
+        message = result["message"]
         
         # Update the checker according to the result of the validation
         self.update_checker(
@@ -559,4 +726,15 @@ class CoursePlanChecker(object):
             message_type=message_type
         )
 
+        # Save the state of this term, so that it can be reused on later reruns
+        self._term_states.append({
+            "selected_module_codes": tuple(selected_module_codes),
+            "message_type": message_type,
+            "message": message,
+            "selected_total_mcs": selected_total_mcs,
+            "total_mcs_taken_before": total_mcs_taken_before,
+            "is_plan_valid_before": True,
+            "is_added_to_plan": self._plan is not None
+        })
+
         return message_type, message, selected_total_mcs
\ No newline at end of file
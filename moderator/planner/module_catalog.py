@@ -0,0 +1,84 @@
+from array import array
+import sys
+
+# Bit flags describing a module
+IS_YEAR_LONG_FLAG = 1
+IS_CREDIT_INTERNSHIP_FLAG = 2
+
+
+# Read-only, compact catalog of the module information needed by the planner, shared by all users
+# Module codes are interned, and the MCs and flags of the modules are stored in arrays, indexed by module
+class ModuleCatalog(object):
+    def __init__(self, module_codes: tuple[str, ...], num_mcs: array, flags: bytearray, sem_info: tuple[tuple[int, str, float], ...]) -> None:
+        self._module_codes = module_codes
+        self._num_mcs = num_mcs
+        self._flags = flags
+        self._sem_info = sem_info
+
+        # Maps each module code to its position in the arrays
+        self._module_code_indices = {module_code: module_index for module_index, module_code in enumerate(module_codes)}
+
+
+    @classmethod
+    def from_rows(cls, module_rows: list[list[str | float | bool]], credit_internship_codes: set[str], sem_info_rows: list[list[int | str | float]]) -> "ModuleCatalog":
+        module_codes = list()
+        num_mcs = array("d")
+        flags = bytearray()
+
+        # Module rows are in the form (module_code, num_mcs, is_year_long)
+        for module_code, module_num_mcs, module_is_year_long in module_rows:
+            module_codes.append(sys.intern(module_code))
+            num_mcs.append(float(module_num_mcs))
+
+            module_flags = 0
+            if module_is_year_long:
+                module_flags |= IS_YEAR_LONG_FLAG
+
+            if module_code in credit_internship_codes:
+                module_flags |= IS_CREDIT_INTERNSHIP_FLAG
+
+            flags.append(module_flags)
+
+        # Semester info rows are in the form (sem_num, sem_name, min_mcs)
+        sem_info = tuple((int(sem_num), sem_name, float(min_mcs)) for sem_num, sem_name, min_mcs in sem_info_rows)
+
+        return cls(module_codes=tuple(module_codes), num_mcs=num_mcs, flags=flags, sem_info=sem_info)
+
+
+    @property
+    def module_codes(self) -> tuple[str, ...]:
+        return self._module_codes
+
+
+    @property
+    def sem_info(self) -> tuple[tuple[int, str, float], ...]:
+        return self._sem_info
+
+
+    def __contains__(self, module_code: str) -> bool:
+        return module_code in self._module_code_indices
+
+
+    def __len__(self) -> int:
+        return len(self._module_codes)
+
+
+    def get_module_index(self, module_code: str) -> int | None:
+        return self._module_code_indices.get(module_code)
+
+
+    def get_num_mcs(self, module_code: str) -> float:
+        return self._num_mcs[self._module_code_indices[module_code]]
+
+
+    def is_year_long(self, module_code: str) -> bool:
+        return bool(self._flags[self._module_code_indices[module_code]] & IS_YEAR_LONG_FLAG)
+
+
+    def is_credit_internship(self, module_code: str) -> bool:
+        # Credit-bearing internships might not be in the catalog
+        module_index = self._module_code_indices.get(module_code)
+        if module_index is None:
+            return False
+
+        return bool(self._flags[module_index] & IS_CREDIT_INTERNSHIP_FLAG)
@@ -0,0 +1,176 @@
+from collections import Counter
+import heapq
+from itertools import islice
+from rapidfuzz import fuzz, process
+import re
+
+# Characters that are not letters or digits are ignored when searching
+NON_ALPHANUMERIC_REGEX = re.compile(r"[^a-z0-9]+")
+
+# Bonuses added to the fuzzy score of a module, so that the most direct matches come first
+CODE_PREFIX_BONUS = 100
+TITLE_MATCH_BONUS = 20
+DESCRIPTION_MATCH_BONUS = 10
+
+# Max number of candidates (found through the trigram index) that are scored for each search
+MAX_TRIGRAM_CANDIDATES = 500
+
+# Min score for a module to be returned, when every module has to be scored (ie. nothing was found through the index)
+FALLBACK_MIN_SCORE = 60
+
+
+# Read-only search index over the code, title and description of every module, shared by all users
+# - Codes and titles are indexed by their trigrams, so that partial and slightly misspelt queries still find candidates
+# - Descriptions are indexed by their words, since they are much longer
+# Candidates found through the index are then ranked with RapidFuzz, so only a small fraction of modules are ever scored
+class ModuleSearchIndex(object):
+    def __init__(self, module_codes: tuple[str, ...], search_texts: tuple[str, ...], trigram_postings: dict[str, tuple[int, ...]], word_postings: dict[str, tuple[int, ...]]) -> None:
+        self._module_codes = module_codes
+
+        # Normalised "code title" of each module, used for fuzzy scoring
+        self._search_texts = search_texts
+
+        # Maps each trigram (of codes and titles) / word (of descriptions) to the positions of the modules containing it
+        self._trigram_postings = trigram_postings
+        self._word_postings = word_postings
+
+        self._module_code_indices = {module_code: module_index for module_index, module_code in enumerate(module_codes)}
+
+
+    @staticmethod
+    def normalise(text: str) -> str:
+        return NON_ALPHANUMERIC_REGEX.sub(" ", text.lower()).strip()
+
+
+    @staticmethod
+    def get_trigrams(text: str) -> set[str]:
+        # Trigrams of each word, padded so that the start of each word is also indexed (eg. " cs" for "CS1010")
+        trigrams = set()
+        for word in text.split():
+            padded_word = f" {word}"
+            for start in range(len(padded_word) - 2):
+                trigrams.add(padded_word[start:start + 3])
+
+        return trigrams
+
+
+    @classmethod
+    def from_rows(cls, rows: list[list[str | None]]) -> "ModuleSearchIndex":
+        # Rows are in the form (module_code, module_title, module_description)
+        module_codes = list()
+        search_texts = list()
+        trigram_postings = dict()
+        word_postings = dict()
+        for module_index, (module_code, module_title, module_description) in enumerate(rows):
+            module_codes.append(module_code)
+            search_text = cls.normalise(f"{module_code} {module_title}")
+            search_texts.append(search_text)
+
+            for trigram in cls.get_trigrams(search_text):
+                trigram_postings.setdefault(trigram, list()).append(module_index)
+
+            for word in set(cls.normalise(module_description or "").split()):
+                if len(word) >= 3:
+                    word_postings.setdefault(word, list()).append(module_index)
+
+        # Freeze the postings, since the index is shared
+        return cls(
+            module_codes=tuple(module_codes),
+            search_texts=tuple(search_texts),
+            trigram_postings={trigram: tuple(module_indices) for trigram, module_indices in trigram_postings.items()},
+            word_postings={word: tuple(module_indices) for word, module_indices in word_postings.items()}
+        )
+
+
+    def __len__(self) -> int:
+        return len(self._module_codes)
+
+
+    def get_candidate_bonuses(self, query: str, allowed_module_indices: set[int]) -> dict[int, int]:
+        # Maps each candidate module (by position) to the bonus added to its score
+        # Only the allowed modules (eg. the modules offered for a term) can be candidates
+        query_trigrams = self.get_trigrams(query)
+        trigram_hits = Counter()
+        for trigram in query_trigrams:
+            trigram_hits.update(module_index for module_index in self._trigram_postings.get(trigram, ()) if module_index in allowed_module_indices)
+
+        # Candidates must share at least half of the query's trigrams
+        min_trigram_hits = max(1, len(query_trigrams) // 2)
+        candidate_bonuses = {module_index: 0 for module_index, num_hits in trigram_hits.items() if num_hits >= min_trigram_hits}
+
+        # Modules whose code (or title) starts with the query come first, followed by those containing every word of the query
+        query_words = query.split()
+        for module_index in candidate_bonuses:
+            search_text = self._search_texts[module_index]
+            if search_text.startswith(query):
+                candidate_bonuses[module_index] += CODE_PREFIX_BONUS
+
+            elif all(query_word in search_text for query_word in query_words):
+                candidate_bonuses[module_index] += TITLE_MATCH_BONUS
+
+        # Modules whose descriptions mention every (long enough) word of the query
+        description_words = [query_word for query_word in query_words if len(query_word) >= 3]
+        if description_words:
+            description_matches = set(self._word_postings.get(description_words[0], ()))
+            for query_word in description_words[1:]:
+                description_matches.intersection_update(self._word_postings.get(query_word, ()))
+
+            for module_index in description_matches:
+                if module_index in allowed_module_indices:
+                    candidate_bonuses[module_index] = candidate_bonuses.get(module_index, 0) + DESCRIPTION_MATCH_BONUS
+
+        # Only the most promising candidates are scored - those with the largest bonuses and trigram hits
+        # Ties go to the modules that come first (ie. in order of module code)
+        if len(candidate_bonuses) > MAX_TRIGRAM_CANDIDATES:
+            top_module_indices = heapq.nlargest(
+                MAX_TRIGRAM_CANDIDATES,
+                candidate_bonuses,
+                key=lambda module_index: (candidate_bonuses[module_index] + trigram_hits[module_index], -module_index)
+            )
+            candidate_bonuses = {module_index: candidate_bonuses[module_index] for module_index in top_module_indices}
+
+        return candidate_bonuses
+
+
+    # Returns the module names (in the form "CODE Title") that best match the query, among the given module names
+    def search(self, query: str, module_names: list[str], limit: int) -> list[str]:
+        query = self.normalise(query)
+        if not query:
+            return module_names[:limit]
+
+        # Only the given module names can be returned (eg. the modules offered for a term)
+        module_indices_to_names = dict()
+        for module_name in module_names:
+            module_index = self._module_code_indices.get(module_name.split()[0])
+            if module_index is not None:
+                module_indices_to_names[module_index] = module_name
+
+        # Queries that are too short to have trigrams (eg. "c") are matched against the start of each word
+        if not self.get_trigrams(query):
+            matching_module_names = (
+                module_name for module_index, module_name in module_indices_to_names.items()
+                if any(word.startswith(query) for word in self._search_texts[module_index].split())
+            )
+            return list(islice(matching_module_names, limit))
+
+        candidate_bonuses = self.get_candidate_bonuses(query=query, allowed_module_indices=set(module_indices_to_names))
+
+        if not candidate_bonuses:
+            # Nothing found through the index (eg. a badly misspelt query) - fall back to scoring every module given
+            matches = process.extract(
+                query,
+                {module_index: self._search_texts[module_index] for module_index in module_indices_to_names},
+                scorer=fuzz.WRatio,
+                limit=limit,
+                score_cutoff=FALLBACK_MIN_SCORE
+            )
+            return [module_indices_to_names[module_index] for _, _, module_index in matches]
+
+        # Rank the candidates by their fuzzy scores, along with their bonuses
+        scored_candidates = [
+            (fuzz.WRatio(query, self._search_texts[module_index]) + bonus, module_indices_to_names[module_index])
+            for module_index, bonus in candidate_bonuses.items()
+        ]
+        scored_candidates.sort(key=lambda scored_candidate: (-scored_candidate[0], scored_candidate[1]))
+
+        return [module_name for _, module_name in scored_candidates[:limit]]
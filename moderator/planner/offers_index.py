@@ -0,0 +1,70 @@
+# Read-only, in-memory index of module offerings, shared by all users
+# Built from a single query, so that the planner never needs to query offerings on a page rerun
+class OffersIndex(object):
+    def __init__(self, terms_offered: dict[str, dict[str, tuple[int, ...]]], term_modules: dict[tuple[str, int], list[list[str]]], ibloc_modules: list[list[str]]) -> None:
+        # Maps each module code to a dictionary, which maps each AY to the sem_nums in which the module is offered
+        self._terms_offered = terms_offered
+
+        # Maps each (acad_year, sem_num) to the modules offered that term - a list of lists in the form (module_code, module_title),
+        # sorted by module code
+        self._term_modules = term_modules
+
+        # IBLOC modules - a list of lists in the form (module_code, module_title), sorted by module code
+        self._ibloc_modules = ibloc_modules
+
+        # Options for the planner's selectboxes, precomputed for each term
+        # Maps each (acad_year, sem_num) to a tuple in the form (module_codes, formatted_module_names), where
+        # the i-th formatted module name corresponds to the i-th module code
+        self._term_module_options = {
+            term: self.make_module_options(modules=modules) for term, modules in self._term_modules.items()
+        }
+        self._ibloc_module_options = self.make_module_options(modules=self._ibloc_modules)
+
+
+    @classmethod
+    def from_rows(cls, offer_rows: list[list[str | int]], ibloc_rows: list[list[str]]) -> "OffersIndex":
+        terms_offered = dict()
+        term_modules = dict()
+
+        # Offer rows are in the form (module_code, module_title, acad_year, sem_num), sorted by AY, sem_num then module code
+        for module_code, module_title, acad_year, sem_num in offer_rows:
+            sem_num = int(sem_num)
+            terms_offered.setdefault(module_code, dict()).setdefault(acad_year, list()).append(sem_num)
+            term_modules.setdefault((acad_year, sem_num), list()).append([module_code, module_title])
+
+        # Freeze the sem_nums, since the index is shared
+        terms_offered = {
+            module_code: {acad_year: tuple(sem_nums) for acad_year, sem_nums in terms_offered_by_ay.items()}
+            for module_code, terms_offered_by_ay in terms_offered.items()
+        }
+
+        return cls(terms_offered=terms_offered, term_modules=term_modules, ibloc_modules=ibloc_rows)
+
+
+    @staticmethod
+    def make_module_options(modules: list[list[str]]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        module_codes = tuple(module_code for module_code, _ in modules)
+        formatted_module_names = tuple(f"{module_code} {module_title}" for module_code, module_title in modules)
+
+        return module_codes, formatted_module_names
+
+
+    def get_terms_offered(self, module_code: str, acad_year: str) -> tuple[int, ...]:
+        return self._terms_offered.get(module_code, dict()).get(acad_year, tuple())
+
+
+    # NOTE: The lists returned are shared by all users, and must not be modified
+    def get_term_modules(self, acad_year: str, sem_num: int) -> list[list[str]]:
+        return self._term_modules.get((acad_year, sem_num), list())
+
+
+    def get_ibloc_modules(self) -> list[list[str]]:
+        return self._ibloc_modules
+
+
+    def get_term_module_options(self, acad_year: str, sem_num: int) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        return self._term_module_options.get((acad_year, sem_num), (tuple(), tuple()))
+
+
+    def get_ibloc_module_options(self) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        return self._ibloc_module_options
@@ -0,0 +1,398 @@
+from moderator.planner.course_plan_checker import CoursePlanChecker
+from moderator.planner.prereq_evaluator import CompletedCodeIndex
+import time
+
+
+# Raised internally when the search runs out of time
+class PlanGenerationTimeout(Exception):
+    pass
+
+
+# Generates a course plan that includes a given set of target modules, following the same rules as CoursePlanChecker:
+# - Each term must meet its minimum number of MCs (unless graduation requirements are met, or an internship is taken)
+# - The first semester must not exceed its maximum number of MCs
+# - Modules can only be taken in the terms that they are offered
+# - Year-long modules must be taken across all the terms that they are offered, within the same AY
+# - Modules are only taken after their prerequisites, whenever these prerequisites can be satisfied by the target modules
+#   (prerequisites that can never be satisfied this way are non-modular requirements, eg. A Level Math, and are skipped)
+# Terms are filled in chronological order, and target modules are tried in topological order of their prerequisites.
+# Partial plans that are known to fail are memorised, so that they are not searched again
+class PlanGenerator(object):
+    def __init__(self, checker: CoursePlanChecker, max_branches: int) -> None:
+        self._checker = checker
+        self._max_branches = max_branches
+        self._module_catalog = checker.module_catalog
+        self._terms = checker.terms
+        self._sem_min_mcs = {sem_num: sem_min_mcs for sem_num, _, sem_min_mcs in checker.sem_info}
+
+        # Keep track of how the last search went
+        self._stats = {
+            "num_states_explored": 0,
+            "num_states_pruned": 0,
+            "is_timed_out": False,
+            "unavailable_module_codes": list()
+        }
+
+
+    @property
+    def stats(self) -> dict[str, int | bool | list[str]]:
+        return self._stats.copy()
+
+
+    ### PREPARATION FOR SEARCH ###
+    def get_term_module_codes(self) -> list[set[str]]:
+        # Get the module codes offered in each term
+        term_module_codes = list()
+        for acad_year, sem_num in self._terms:
+            available_module_codes, _ = self._checker.get_available_module_options_for_term(acad_year=acad_year, sem_num=sem_num)
+            term_module_codes.append(set(available_module_codes))
+
+        return term_module_codes
+
+
+    def get_starting_term_indices(self, module_code: str, term_module_codes: list[set[str]]) -> list[int]:
+        # Get the terms in which the module can be started
+        # A year-long module can only be started in the first term that it is offered, in each AY
+        starting_term_indices = list()
+        acad_years_started = set()
+        for term_index, (acad_year, _) in enumerate(self._terms):
+            if module_code not in term_module_codes[term_index]:
+                continue
+
+            if self._module_catalog.is_year_long(module_code) and term_index > 0:
+                if acad_year in acad_years_started:
+                    continue
+
+                acad_years_started.add(acad_year)
+
+            starting_term_indices.append(term_index)
+
+        return starting_term_indices
+
+
+    def is_prereq_satisfied(self, module_code: str, term_index: int, completed_code_index: CompletedCodeIndex) -> bool:
+        acad_year, _ = self._terms[term_index]
+        compiled_prereq = self._checker.get_compiled_prereq(module_code=module_code, acad_year=acad_year)
+
+        return compiled_prereq is None or compiled_prereq.is_satisfied(completed_code_index=completed_code_index)
+
+
+    def get_prereq_constraints(self, target_module_codes: list[str], starting_term_indices: dict[str, list[int]]) -> tuple[dict[tuple[str, int], bool], dict[str, set[str]]]:
+        # Index containing all the target modules, as if they have all been completed
+        all_targets_index = CompletedCodeIndex()
+        for module_code in target_module_codes:
+            all_targets_index.add(module_code)
+
+        # Prerequisites are only enforced if they can be satisfied by the target modules (for the AY of each term)
+        is_prereq_enforced = dict()
+        for module_code in target_module_codes:
+            for term_index in starting_term_indices[module_code]:
+                is_prereq_enforced[(module_code, term_index)] = self.is_prereq_satisfied(module_code=module_code, term_index=term_index, completed_code_index=all_targets_index)
+
+        # Get the target modules that must come before each target module - ie. its prerequisites cannot be satisfied without them
+        # Only the earliest term that the module can be started is considered
+        required_module_codes = {module_code: set() for module_code in target_module_codes}
+        for module_code in target_module_codes:
+            if not starting_term_indices[module_code]:
+                continue
+
+            earliest_term_index = starting_term_indices[module_code][0]
+            if not is_prereq_enforced[(module_code, earliest_term_index)]:
+                continue
+
+            for other_module_code in target_module_codes:
+                if other_module_code == module_code:
+                    continue
+
+                all_targets_index.remove(other_module_code)
+                if not self.is_prereq_satisfied(module_code=module_code, term_index=earliest_term_index, completed_code_index=all_targets_index):
+                    required_module_codes[module_code].add(other_module_code)
+
+                all_targets_index.add(other_module_code)
+
+        return is_prereq_enforced, required_module_codes
+
+
+    def get_earliest_term_indices(self, target_module_codes: list[str], starting_term_indices: dict[str, list[int]], required_module_codes: dict[str, set[str]]) -> dict[str, int] | None:
+        # Propagate prerequisites in topological order: a module can only start after all the modules it requires
+        # Returns None if some module can never be taken
+        earliest_term_indices = dict()
+        remaining_module_codes = set(target_module_codes)
+        while remaining_module_codes:
+            # Modules whose required modules have all been placed
+            ready_module_codes = [module_code for module_code in remaining_module_codes if required_module_codes[module_code].isdisjoint(remaining_module_codes)]
+            if not ready_module_codes:
+                # Cycle of prerequisites
+                return None
+
+            for module_code in ready_module_codes:
+                lower_bound = max((earliest_term_indices[required_module_code] + 1 for required_module_code in required_module_codes[module_code]), default=0)
+                later_term_indices = [term_index for term_index in starting_term_indices[module_code] if term_index >= lower_bound]
+                if not later_term_indices:
+                    return None
+
+                earliest_term_indices[module_code] = later_term_indices[0]
+                remaining_module_codes.remove(module_code)
+
+        return earliest_term_indices
+
+
+    ### SEARCH ###
+    def get_year_long_term_indices(self, module_code: str, starting_term_index: int) -> list[int]:
+        # Get the other terms in the same AY in which a year-long module, started in the given term, must be continued
+        acad_year, _ = self._terms[starting_term_index]
+        terms_offered = self._checker.get_terms_offered_for_module(module_code=module_code, acad_year=acad_year)
+
+        return [
+            term_index for term_index in range(starting_term_index + 1, len(self._terms))
+            if self._terms[term_index][0] == acad_year and self._terms[term_index][1] in terms_offered
+        ]
+
+
+    def is_term_load_valid(self, term_index: int, module_codes: list[str], term_mcs: float, total_mcs_taken: float) -> bool:
+        # Same MC rules as CoursePlanChecker.check_module_selection_for_term
+        _, sem_num = self._terms[term_index]
+        is_taking_cred_internship = any(self._module_catalog.is_credit_internship(module_code) for module_code in module_codes)
+        outstanding_mc_balance = self._checker.min_mcs_to_grad - total_mcs_taken
+        if term_mcs < self._sem_min_mcs[sem_num] and term_mcs < outstanding_mc_balance and not is_taking_cred_internship:
+            return False
+
+        # Term at index 1 is the user's first semester (index 0 is the IBLOC term)
+        if term_index == 1 and term_mcs > self._checker.max_mcs_first_sem:
+            return False
+
+        return True
+
+
+    def add_filler_modules(self, term_index: int, module_codes: list[str], total_mcs_taken: float, excluded_module_codes: set[str]) -> list[str] | None:
+        # Top up the term with other modules offered that term, which have no prerequisites and are not year-long
+        # Returns None if the term still does not meet the MC rules
+        acad_year, _ = self._terms[term_index]
+        module_codes = module_codes.copy()
+        term_mcs = self._checker.get_total_mcs_for_term(module_codes_for_term=module_codes, acad_year=acad_year)
+        available_module_codes, _ = self._checker.get_available_module_options_for_term(acad_year=acad_year, sem_num=self._terms[term_index][1])
+        for filler_module_code in available_module_codes:
+            if self.is_term_load_valid(term_index=term_index, module_codes=module_codes, term_mcs=term_mcs, total_mcs_taken=total_mcs_taken):
+                return module_codes
+
+            if filler_module_code in excluded_module_codes or self._module_catalog.is_year_long(filler_module_code):
+                continue
+
+            if self._checker.get_compiled_prereq(module_code=filler_module_code, acad_year=acad_year) is not None:
+                continue
+
+            # Fillers with preclusions or corequisites could clash with the rest of the plan
+            if self._checker.get_compiled_preclusion(module_code=filler_module_code, acad_year=acad_year) is not None or self._checker.get_compiled_coreq(module_code=filler_module_code, acad_year=acad_year) is not None:
+                continue
+
+            module_codes.append(filler_module_code)
+            term_mcs += self._module_catalog.get_num_mcs(filler_module_code)
+
+        if self.is_term_load_valid(term_index=term_index, module_codes=module_codes, term_mcs=term_mcs, total_mcs_taken=total_mcs_taken):
+            return module_codes
+
+        return None
+
+
+    def get_selections_for_term(self, term_index: int, continued_module_codes: list[str], ready_module_codes: list[str], urgent_module_codes: list[str], remaining_target_mcs: float) -> list[list[str]]:
+        # Modules that are continued from an earlier term, or can no longer be taken after this term, must be taken now
+        mandatory_module_codes = continued_module_codes + urgent_module_codes
+        optional_module_codes = [module_code for module_code in ready_module_codes if module_code not in urgent_module_codes]
+
+        # Aim to spread the remaining target modules evenly across the remaining regular terms (ie. those with a minimum
+        # number of MCs, as opposed to special terms), but at least meet the minimum MCs
+        _, sem_num = self._terms[term_index]
+        num_remaining_regular_terms = sum(1 for _, later_sem_num in self._terms[term_index:] if self._sem_min_mcs[later_sem_num] > 0)
+        target_term_mcs = max(self._sem_min_mcs[sem_num], remaining_target_mcs / max(num_remaining_regular_terms, 1))
+
+        # Candidate selections take the mandatory modules, along with the first few optional modules
+        # Try the selections whose MCs are closest to the target first
+        candidate_selections = list()
+        selection_mcs = sum(self._module_catalog.get_num_mcs(module_code) for module_code in mandatory_module_codes)
+        for num_optional_modules in range(len(optional_module_codes) + 1):
+            if num_optional_modules > 0:
+                selection_mcs += self._module_catalog.get_num_mcs(optional_module_codes[num_optional_modules - 1])
+
+            candidate_selections.append((abs(selection_mcs - target_term_mcs), num_optional_modules))
+
+        candidate_selections.sort()
+
+        return [mandatory_module_codes + optional_module_codes[:num_optional_modules] for _, num_optional_modules in candidate_selections[:self._max_branches]]
+
+
+    def search(self, term_index: int, plan_so_far: list[list[str]], scheduled_module_codes: set[str], continued_module_codes: dict[int, list[str]], completed_code_index: CompletedCodeIndex, total_mcs_taken: float) -> list[list[str]] | None:
+        if time.monotonic() > self._deadline:
+            raise PlanGenerationTimeout()
+
+        self._stats["num_states_explored"] += 1
+        unscheduled_target_codes = self._target_module_codes - scheduled_module_codes
+
+        if term_index == len(self._terms):
+            # All terms have been filled - plan is feasible if every target module has been taken
+            return plan_so_far if not unscheduled_target_codes else None
+
+        # Skip partial plans that have already failed before
+        # The outcome also depends on the year-long modules still to be continued, and the MCs taken so far
+        # (which decide whether a term can be underloaded)
+        pending_continued_module_codes = frozenset(
+            (later_term_index, module_code) for later_term_index, module_codes in continued_module_codes.items() if later_term_index >= term_index
+            for module_code in module_codes
+        )
+        state_key = (term_index, frozenset(scheduled_module_codes), pending_continued_module_codes, total_mcs_taken)
+        if state_key in self._failed_states:
+            self._stats["num_states_pruned"] += 1
+            return None
+
+        # Prune if some target module can no longer be taken in any of the remaining terms
+        for module_code in unscheduled_target_codes:
+            if not any(starting_term_index >= term_index for starting_term_index in self._starting_term_indices[module_code]):
+                self._failed_states.add(state_key)
+                self._stats["num_states_pruned"] += 1
+                return None
+
+        # Get the target modules that can be started this term, in topological order
+        ready_module_codes = list()
+        urgent_module_codes = list()
+        for module_code in self._topological_order:
+            if module_code not in unscheduled_target_codes or term_index not in self._starting_term_indices[module_code]:
+                continue
+
+            if term_index < self._earliest_term_indices[module_code]:
+                continue
+
+            if self._is_prereq_enforced[(module_code, term_index)] and not self.is_prereq_satisfied(module_code=module_code, term_index=term_index, completed_code_index=completed_code_index):
+                continue
+
+            ready_module_codes.append(module_code)
+            if self._starting_term_indices[module_code][-1] == term_index:
+                # Last chance to take this module
+                urgent_module_codes.append(module_code)
+
+        remaining_target_mcs = sum(self._module_catalog.get_num_mcs(module_code) for module_code in unscheduled_target_codes)
+        selections = self.get_selections_for_term(
+            term_index=term_index,
+            continued_module_codes=continued_module_codes.get(term_index, list()),
+            ready_module_codes=ready_module_codes,
+            urgent_module_codes=urgent_module_codes,
+            remaining_target_mcs=remaining_target_mcs
+        )
+
+        acad_year, _ = self._terms[term_index]
+        for selection in selections:
+            if self._use_filler_modules:
+                selection = self.add_filler_modules(
+                    term_index=term_index,
+                    module_codes=selection,
+                    total_mcs_taken=total_mcs_taken,
+                    excluded_module_codes=scheduled_module_codes | self._target_module_codes
+                )
+                if selection is None:
+                    continue
+
+            term_mcs = self._checker.get_total_mcs_for_term(module_codes_for_term=selection, acad_year=acad_year)
+            if not self.is_term_load_valid(term_index=term_index, module_codes=selection, term_mcs=term_mcs, total_mcs_taken=total_mcs_taken):
+                continue
+
+            # Selections with precluded modules are rejected by the checker
+            module_codes_precluded, _ = self._checker.check_preclusions_and_coreqs(acad_year=acad_year, selected_module_codes=selection, completed_code_index=completed_code_index)
+            if module_codes_precluded:
+                continue
+
+            # Year-long modules started this term must be continued in the other terms of the AY
+            new_module_codes = [module_code for module_code in selection if module_code not in scheduled_module_codes]
+            new_continued_module_codes = {later_term_index: module_codes.copy() for later_term_index, module_codes in continued_module_codes.items()}
+            for module_code in new_module_codes:
+                if self._module_catalog.is_year_long(module_code):
+                    for later_term_index in self.get_year_long_term_indices(module_code=module_code, starting_term_index=term_index):
+                        new_continued_module_codes.setdefault(later_term_index, list()).append(module_code)
+
+            # Take the selection, and move on to the next term
+            for module_code in selection:
+                completed_code_index.add(module_code)
+
+            result = self.search(
+                term_index=term_index + 1,
+                plan_so_far=plan_so_far + [selection],
+                scheduled_module_codes=scheduled_module_codes | set(new_module_codes),
+                continued_module_codes=new_continued_module_codes,
+                completed_code_index=completed_code_index,
+                total_mcs_taken=total_mcs_taken + term_mcs
+            )
+
+            for module_code in selection:
+                completed_code_index.remove(module_code)
+
+            if result is not None:
+                return result
+
+        self._failed_states.add(state_key)
+        return None
+
+
+    # Returns the plan in the same structure as CoursePlanChecker.plan, or None if no feasible plan was found within the time budget
+    def generate(self, target_module_codes: list[str], time_budget: float, use_filler_modules: bool) -> dict[str, dict[int, list[str]]] | None:
+        self._stats = {
+            "num_states_explored": 0,
+            "num_states_pruned": 0,
+            "is_timed_out": False,
+            "unavailable_module_codes": list()
+        }
+        self._deadline = time.monotonic() + time_budget
+        self._use_filler_modules = use_filler_modules
+        self._failed_states = set()
+
+        # Get the terms in which each target module can be started
+        target_module_codes = sorted(set(module_code for module_code in target_module_codes if module_code in self._module_catalog))
+        self._target_module_codes = set(target_module_codes)
+        term_module_codes = self.get_term_module_codes()
+        self._starting_term_indices = {
+            module_code: self.get_starting_term_indices(module_code=module_code, term_module_codes=term_module_codes) for module_code in target_module_codes
+        }
+
+        # Target modules that are not offered in any of the user's terms can never be taken
+        self._stats["unavailable_module_codes"] = [module_code for module_code in target_module_codes if not self._starting_term_indices[module_code]]
+        if self._stats["unavailable_module_codes"]:
+            return None
+
+        # Work out which prerequisites are enforced, and the earliest term that each target module can be started
+        self._is_prereq_enforced, required_module_codes = self.get_prereq_constraints(target_module_codes=target_module_codes, starting_term_indices=self._starting_term_indices)
+        earliest_term_indices = self.get_earliest_term_indices(target_module_codes=target_module_codes, starting_term_indices=self._starting_term_indices, required_module_codes=required_module_codes)
+        if earliest_term_indices is None:
+            return None
+
+        self._earliest_term_indices = earliest_term_indices
+
+        # Modules that unlock the most other target modules go first, followed by modules with the fewest chances to be taken
+        num_dependents = {module_code: 0 for module_code in target_module_codes}
+        for module_code in target_module_codes:
+            for required_module_code in required_module_codes[module_code]:
+                num_dependents[required_module_code] += 1
+
+        self._topological_order = sorted(
+            target_module_codes,
+            key=lambda module_code: (earliest_term_indices[module_code], -num_dependents[module_code], self._starting_term_indices[module_code][-1], module_code)
+        )
+
+        try:
+            plan_as_list = self.search(
+                term_index=0,
+                plan_so_far=list(),
+                scheduled_module_codes=set(),
+                continued_module_codes=dict(),
+                completed_code_index=CompletedCodeIndex(),
+                total_mcs_taken=0.0
+            )
+
+        except PlanGenerationTimeout:
+            self._stats["is_timed_out"] = True
+            return None
+
+        if plan_as_list is None:
+            return None
+
+        # Convert to the same structure as CoursePlanChecker.plan
+        plan = dict()
+        for (acad_year, sem_num), module_codes in zip(self._terms, plan_as_list):
+            plan.setdefault(acad_year, dict())[sem_num] = module_codes
+
+        return plan
@@ -0,0 +1,191 @@
+import re
+
+# Opcodes of the nodes in a compiled prerequisite tree
+LEAF_EXACT = 0      # Leaf is a module code, eg. "CS1010"
+LEAF_PREFIX = 1     # Leaf is a module code ending with a wildcard, eg. "CS1010%" = Any module starting with CS1010
+LEAF_PATTERN = 2    # Leaf has a wildcard elsewhere in the module code (rare)
+NODE_AND = 3
+NODE_OR = 4
+NODE_N_OF = 5
+
+
+# Keeps track of the module codes completed so far, so that prerequisite leaves can be resolved in O(length of module code)
+# Every prefix of every completed module code is counted. Counts (rather than a set) allow a module code to be added more
+# than once (eg. year-long modules, taken across two terms) and removed again
+class CompletedCodeIndex(object):
+    def __init__(self) -> None:
+        self._code_counts = dict()
+        self._prefix_counts = dict()
+
+
+    def __contains__(self, module_code: str) -> bool:
+        return module_code in self._code_counts
+
+
+    def __len__(self) -> int:
+        return len(self._code_counts)
+
+
+    def get_count(self, module_code: str) -> int:
+        return self._code_counts.get(module_code, 0)
+
+
+    def add(self, module_code: str) -> None:
+        self._code_counts[module_code] = self._code_counts.get(module_code, 0) + 1
+        for prefix_length in range(1, len(module_code) + 1):
+            prefix = module_code[:prefix_length]
+            self._prefix_counts[prefix] = self._prefix_counts.get(prefix, 0) + 1
+
+
+    def remove(self, module_code: str) -> None:
+        if module_code not in self._code_counts:
+            return
+
+        # Decrement counts, forgetting the ones that hit zero
+        self._code_counts[module_code] -= 1
+        if self._code_counts[module_code] == 0:
+            del self._code_counts[module_code]
+
+        for prefix_length in range(1, len(module_code) + 1):
+            prefix = module_code[:prefix_length]
+            self._prefix_counts[prefix] -= 1
+            if self._prefix_counts[prefix] == 0:
+                del self._prefix_counts[prefix]
+
+
+    def clear(self) -> None:
+        self._code_counts.clear()
+        self._prefix_counts.clear()
+
+
+    def has_prefix(self, prefix: str) -> bool:
+        return prefix in self._prefix_counts
+
+
+    def matches_pattern(self, module_code_pattern: re.Pattern) -> bool:
+        # Fallback for wildcards that are not at the end of the module code - scan through the completed module codes
+        for completed_module_code in self._code_counts:
+            if module_code_pattern.fullmatch(completed_module_code):
+                return True
+
+        return False
+
+
+# A prerequisite tree, flattened into a tuple of nodes in post-order, so that it can be evaluated in a single pass
+# without recursion. Each node is a tuple in the form (opcode, operand, num_children)
+# - Leaves: operand is the module code (or prefix / regex) to look for, num_children is 0
+# - "and" / "or": operand is unused
+# - "nOf": operand is n, the minimum number of children to be satisfied
+class CompiledPrereq(object):
+    def __init__(self, nodes: tuple[tuple[int, str | int | re.Pattern | None, int], ...]) -> None:
+        self._nodes = nodes
+
+
+    @classmethod
+    def compile(cls, prereq_tree: dict | str | None) -> "CompiledPrereq | None":
+        # No prerequisites - nothing to evaluate
+        if prereq_tree is None:
+            return None
+
+        nodes = list()
+        cls.compile_into(prereq_tree=prereq_tree, nodes=nodes)
+
+        return cls(nodes=tuple(nodes))
+
+
+    @classmethod
+    def compile_leaf(cls, prereq_tree: str) -> tuple[int, str | re.Pattern, int]:
+        # Remove grade. The module code obtained might have %, which is a wildcard
+        # Eg. CS1010% = Any module starting with CS1010
+        module_code_with_wildcard = prereq_tree.split(":")[0]
+
+        if "%" not in module_code_with_wildcard:
+            return (LEAF_EXACT, module_code_with_wildcard, 0)
+
+        if module_code_with_wildcard.index("%") == len(module_code_with_wildcard) - 1:
+            return (LEAF_PREFIX, module_code_with_wildcard[:-1], 0)
+
+        # Change any % sign into the correct regex
+        module_code_regex = ".*".join(re.escape(part) for part in module_code_with_wildcard.split("%"))
+        return (LEAF_PATTERN, re.compile(module_code_regex), 0)
+
+
+    @classmethod
+    def get_children(cls, prereq_tree: dict, operation: str) -> list[dict | str]:
+        # Children of an "and" / "or" node, with nested nodes of the same operation merged in
+        # Eg. (A and (B and C)) = (A and B and C)
+        children = list()
+        for tree in prereq_tree[operation]:
+            if isinstance(tree, dict) and list(tree.keys()) == [operation]:
+                children.extend(cls.get_children(prereq_tree=tree, operation=operation))
+
+            else:
+                children.append(tree)
+
+        return children
+
+
+    @classmethod
+    def compile_into(cls, prereq_tree: dict | str, nodes: list[tuple[int, str | int | re.Pattern | None, int]]) -> None:
+        if isinstance(prereq_tree, str):
+            nodes.append(cls.compile_leaf(prereq_tree=prereq_tree))
+            return
+
+        # How the next layer of trees are aggregated (can be "and", "or", "nOf")
+        [operation,] = list(prereq_tree.keys())
+
+        if operation == "nOf":
+            min_num_requirements, next_layer_trees = prereq_tree[operation]
+            for tree in next_layer_trees:
+                cls.compile_into(prereq_tree=tree, nodes=nodes)
+
+            nodes.append((NODE_N_OF, min_num_requirements, len(next_layer_trees)))
+            return
+
+        next_layer_trees = cls.get_children(prereq_tree=prereq_tree, operation=operation)
+
+        # A node with a single child is equivalent to the child itself
+        if len(next_layer_trees) == 1:
+            cls.compile_into(prereq_tree=next_layer_trees[0], nodes=nodes)
+            return
+
+        for tree in next_layer_trees:
+            cls.compile_into(prereq_tree=tree, nodes=nodes)
+
+        nodes.append((NODE_AND if operation == "and" else NODE_OR, None, len(next_layer_trees)))
+
+
+    def get_leaves(self) -> list[tuple[int, str | re.Pattern]]:
+        # Get the leaves of the tree, in the form (opcode, operand)
+        return [(opcode, operand) for opcode, operand, _ in self._nodes if opcode in (LEAF_EXACT, LEAF_PREFIX, LEAF_PATTERN)]
+
+
+    def is_satisfied(self, completed_code_index: CompletedCodeIndex) -> bool:
+        # Post-order evaluation - children always come right before their parent
+        values = list()
+        for opcode, operand, num_children in self._nodes:
+            if opcode == LEAF_EXACT:
+                values.append(operand in completed_code_index)
+
+            elif opcode == LEAF_PREFIX:
+                values.append(completed_code_index.has_prefix(operand))
+
+            elif opcode == LEAF_PATTERN:
+                values.append(completed_code_index.matches_pattern(operand))
+
+            else:
+                # Pop the values of this node's children
+                child_values = values[len(values) - num_children:]
+                del values[len(values) - num_children:]
+
+                if opcode == NODE_AND:
+                    values.append(all(child_values))
+
+                elif opcode == NODE_OR:
+                    values.append(any(child_values))
+
+                else:
+                    # For "nOf" operation, at least n of the next layer trees must be satisfied
+                    values.append(sum(child_values) >= operand)
+
+        return values[-1]
@@ -0,0 +1,227 @@
+from bisect import bisect_left
+from moderator.planner.module_catalog import ModuleCatalog
+from moderator.planner.prereq_evaluator import LEAF_EXACT, LEAF_PREFIX
+from moderator.planner.prereq_store import PrereqStore
+
+
+# Graph of the prerequisite relationships between the modules of an AY, built once from the stored prerequisite trees
+# There is an edge from module A to module B if A appears anywhere in the prerequisite tree of B (ie. A can help to unlock B)
+# Modules are numbered by their position in the module catalog, so that sets of modules can be stored as bitsets (Python ints)
+class PrereqGraph(object):
+    def __init__(self, module_codes: tuple[str, ...], prereq_indices: dict[int, tuple[int, ...]]) -> None:
+        self._module_codes = module_codes
+        self._module_code_indices = {module_code: module_index for module_index, module_code in enumerate(module_codes)}
+
+        # Forward edges (module -> modules it helps to unlock) and reverse edges (module -> modules in its prerequisite tree)
+        self._prereq_indices = prereq_indices
+        unlocked_indices = dict()
+        for module_index, module_prereq_indices in prereq_indices.items():
+            for prereq_index in module_prereq_indices:
+                unlocked_indices.setdefault(prereq_index, list()).append(module_index)
+
+        self._unlocked_indices = {prereq_index: tuple(module_indices) for prereq_index, module_indices in unlocked_indices.items()}
+
+        # Levels and transitive closures, for modules that have at least one edge
+        # Level of a module = Length of the longest chain of prerequisites leading up to it (0 if it has no prerequisites)
+        self._levels = dict()
+        self._prereq_chain_bits = dict()
+        self._all_unlocked_bits = dict()
+        self.compute_closures()
+
+
+    @classmethod
+    def build(cls, module_catalog: ModuleCatalog, prereq_store: PrereqStore, acad_year: str) -> "PrereqGraph":
+        module_codes = module_catalog.module_codes
+
+        # Sorted module codes, so that the modules matching a wildcard prefix form a contiguous range
+        sorted_module_codes = sorted(module_codes)
+
+        prereq_indices = dict()
+        for module_code in prereq_store.get_module_codes(acad_year=acad_year):
+            module_index = module_catalog.get_module_index(module_code)
+            compiled_prereq = prereq_store.get_compiled_prereq(module_code=module_code, acad_year=acad_year)
+            if module_index is None or compiled_prereq is None:
+                continue
+
+            # Resolve each leaf of the prerequisite tree into the modules in the catalog that satisfy it
+            module_prereq_indices = set()
+            for opcode, operand in compiled_prereq.get_leaves():
+                if opcode == LEAF_EXACT:
+                    matching_module_codes = [operand] if operand in module_catalog else list()
+
+                elif opcode == LEAF_PREFIX:
+                    matching_module_codes = list()
+                    position = bisect_left(sorted_module_codes, operand)
+                    while position < len(sorted_module_codes) and sorted_module_codes[position].startswith(operand):
+                        matching_module_codes.append(sorted_module_codes[position])
+                        position += 1
+
+                else:
+                    matching_module_codes = [other_module_code for other_module_code in sorted_module_codes if operand.fullmatch(other_module_code)]
+
+                module_prereq_indices.update(module_catalog.get_module_index(other_module_code) for other_module_code in matching_module_codes)
+
+            # A module never unlocks itself
+            module_prereq_indices.discard(module_index)
+            if module_prereq_indices:
+                prereq_indices[module_index] = tuple(sorted(module_prereq_indices))
+
+        return cls(module_codes=module_codes, prereq_indices=prereq_indices)
+
+
+    def get_components(self, module_indices: list[int]) -> list[list[int]]:
+        # Group modules caught in a cycle of prerequisites (eg. two modules listing each other as alternatives) together
+        # Uses Tarjan's algorithm (without recursion), which returns the groups with every group after all of its prerequisites
+        visit_orders = dict()
+        low_links = dict()
+        stack = list()
+        on_stack = set()
+        components = list()
+
+        for root_index in module_indices:
+            if root_index in visit_orders:
+                continue
+
+            # Each frame is in the form (module_index, iterator over its prerequisites)
+            visit_orders[root_index] = low_links[root_index] = len(visit_orders)
+            stack.append(root_index)
+            on_stack.add(root_index)
+            frames = [(root_index, iter(self._prereq_indices.get(root_index, ())))]
+
+            while frames:
+                module_index, prereq_iterator = frames[-1]
+                prereq_index = next(prereq_iterator, None)
+
+                if prereq_index is not None:
+                    if prereq_index not in visit_orders:
+                        # Visit the prerequisite next
+                        visit_orders[prereq_index] = low_links[prereq_index] = len(visit_orders)
+                        stack.append(prereq_index)
+                        on_stack.add(prereq_index)
+                        frames.append((prereq_index, iter(self._prereq_indices.get(prereq_index, ()))))
+
+                    elif prereq_index in on_stack:
+                        low_links[module_index] = min(low_links[module_index], visit_orders[prereq_index])
+
+                    continue
+
+                # All prerequisites of this module have been visited
+                frames.pop()
+                if frames:
+                    parent_index = frames[-1][0]
+                    low_links[parent_index] = min(low_links[parent_index], low_links[module_index])
+
+                if low_links[module_index] == visit_orders[module_index]:
+                    # This module is the root of a group - pop the whole group off the stack
+                    component = list()
+                    while True:
+                        member_index = stack.pop()
+                        on_stack.discard(member_index)
+                        component.append(member_index)
+                        if member_index == module_index:
+                            break
+
+                    components.append(component)
+
+        return components
+
+
+    def compute_closures(self) -> None:
+        components = self.get_components(module_indices=sorted(set(self._prereq_indices) | set(self._unlocked_indices)))
+        component_indices = {module_index: component_index for component_index, component in enumerate(components) for module_index in component}
+
+        # Modules in the same group share the same level and closures
+        # Groups are processed after their prerequisites, so their prerequisites' chains are already complete
+        component_levels = list()
+        component_prereq_chain_bits = list()
+        for component_index, component in enumerate(components):
+            level = 0
+            prereq_chain_bits = 0
+            for module_index in component:
+                for prereq_index in self._prereq_indices.get(module_index, ()):
+                    prereq_component_index = component_indices[prereq_index]
+                    prereq_chain_bits |= 1 << prereq_index
+                    if prereq_component_index != component_index:
+                        prereq_chain_bits |= component_prereq_chain_bits[prereq_component_index]
+                        level = max(level, component_levels[prereq_component_index] + 1)
+
+            component_levels.append(level)
+            component_prereq_chain_bits.append(prereq_chain_bits)
+
+        # Likewise, in the opposite direction
+        component_all_unlocked_bits = [0] * len(components)
+        for component_index in reversed(range(len(components))):
+            all_unlocked_bits = 0
+            for module_index in components[component_index]:
+                for unlocked_index in self._unlocked_indices.get(module_index, ()):
+                    unlocked_component_index = component_indices[unlocked_index]
+                    all_unlocked_bits |= 1 << unlocked_index
+                    if unlocked_component_index != component_index:
+                        all_unlocked_bits |= component_all_unlocked_bits[unlocked_component_index]
+
+            component_all_unlocked_bits[component_index] = all_unlocked_bits
+
+        # Within a cycle, the shared closures contain every member of the group. A module is never its own prerequisite
+        # (nor does it unlock itself), so it is left out of its own closures
+        for module_index, component_index in component_indices.items():
+            module_bit = 1 << module_index
+            self._levels[module_index] = component_levels[component_index]
+            self._prereq_chain_bits[module_index] = component_prereq_chain_bits[component_index] & ~module_bit
+            self._all_unlocked_bits[module_index] = component_all_unlocked_bits[component_index] & ~module_bit
+
+
+    def bits_to_module_codes(self, bits: int) -> list[str]:
+        # Module codes of the set bits, in catalog order
+        module_codes = list()
+        while bits:
+            lowest_bit = bits & -bits
+            module_codes.append(self._module_codes[lowest_bit.bit_length() - 1])
+            bits ^= lowest_bit
+
+        return module_codes
+
+
+    def get_level(self, module_code: str) -> int:
+        module_index = self._module_code_indices.get(module_code)
+        return self._levels.get(module_index, 0)
+
+
+    def get_prereq_module_codes(self, module_code: str) -> list[str]:
+        # Modules that appear directly in the prerequisite tree of the given module
+        module_index = self._module_code_indices.get(module_code)
+        return [self._module_codes[prereq_index] for prereq_index in self._prereq_indices.get(module_index, ())]
+
+
+    def get_unlocked_module_codes(self, module_code: str) -> list[str]:
+        # Modules that have the given module directly in their prerequisite trees
+        module_index = self._module_code_indices.get(module_code)
+        return [self._module_codes[unlocked_index] for unlocked_index in self._unlocked_indices.get(module_index, ())]
+
+
+    def get_prereq_chain(self, module_code: str) -> list[str]:
+        # All modules that the given module eventually depends on, from the most basic ones
+        module_index = self._module_code_indices.get(module_code)
+        prereq_chain = self.bits_to_module_codes(bits=self._prereq_chain_bits.get(module_index, 0))
+
+        return sorted(prereq_chain, key=lambda prereq_module_code: (self.get_level(prereq_module_code), prereq_module_code))
+
+
+    def get_all_unlocked_module_codes(self, module_code: str) -> list[str]:
+        # All modules that the given module eventually helps to unlock
+        module_index = self._module_code_indices.get(module_code)
+        return self.bits_to_module_codes(bits=self._all_unlocked_bits.get(module_index, 0))
+
+
+    def get_num_modules_unlocked(self, module_code: str) -> int:
+        module_index = self._module_code_indices.get(module_code)
+        return self._all_unlocked_bits.get(module_index, 0).bit_count()
+
+
+    def is_in_prereq_chain(self, prereq_module_code: str, module_code: str) -> bool:
+        # Whether the first module is anywhere in the chain of prerequisites of the second module
+        prereq_index = self._module_code_indices.get(prereq_module_code)
+        module_index = self._module_code_indices.get(module_code)
+        if prereq_index is None or module_index is None:
+            return False
+
+        return bool(self._prereq_chain_bits.get(module_index, 0) >> prereq_index & 1)
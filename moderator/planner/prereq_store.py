@@ -0,0 +1,90 @@
+from moderator.planner.prereq_evaluator import CompiledPrereq
+
+
+# Read-only, in-memory map of prerequisite trees, keyed by (module_code, acad_year)
+# Trees are fetched in bulk from NUSMods during the academic database refresh, so checking a plan needs no network at all
+# Preclusions and corequisites are stored as trees of the same structure, so they are compiled and evaluated in the same way
+class PrereqStore(object):
+    def __init__(self, prereq_trees: dict[tuple[str, str], dict | str | None], preclusion_trees: dict[tuple[str, str], dict | str] | None = None, coreq_trees: dict[tuple[str, str], dict | str] | None = None, text_preclusion_keys: set[tuple[str, str]] | None = None) -> None:
+        self._prereq_trees = prereq_trees
+
+        # Only modules that have preclusions / corequisites are stored
+        self._preclusion_trees = preclusion_trees or dict()
+        self._coreq_trees = coreq_trees or dict()
+
+        # Modules whose preclusion trees were guessed from the plain-text preclusions, rather than parsed from rules
+        self._text_preclusion_keys = text_preclusion_keys or set()
+
+        # Trees are compiled on first use, and the compiled trees are shared by all users
+        self._compiled_prereqs = dict()
+        self._compiled_preclusions = dict()
+        self._compiled_coreqs = dict()
+
+
+    @classmethod
+    def from_rows(cls, rows: list[list[str | dict | None]]) -> "PrereqStore":
+        # Rows are in the form (module_code, acad_year, prereq_tree, preclusion_tree, coreq_tree, is_preclusion_from_text)
+        prereq_trees, preclusion_trees, coreq_trees, text_preclusion_keys = dict(), dict(), dict(), set()
+        for module_code, acad_year, prereq_tree, preclusion_tree, coreq_tree, is_preclusion_from_text in rows:
+            prereq_trees[(module_code, acad_year)] = prereq_tree
+            if preclusion_tree is not None:
+                preclusion_trees[(module_code, acad_year)] = preclusion_tree
+                if is_preclusion_from_text:
+                    text_preclusion_keys.add((module_code, acad_year))
+
+            if coreq_tree is not None:
+                coreq_trees[(module_code, acad_year)] = coreq_tree
+
+        return cls(prereq_trees=prereq_trees, preclusion_trees=preclusion_trees, coreq_trees=coreq_trees, text_preclusion_keys=text_preclusion_keys)
+
+
+    def __len__(self) -> int:
+        return len(self._prereq_trees)
+
+
+    def get_module_codes(self, acad_year: str) -> list[str]:
+        # Get the modules that have a stored tree for the given AY
+        return [module_code for module_code, tree_acad_year in self._prereq_trees if tree_acad_year == acad_year]
+
+
+    def get_prereq_tree(self, module_code: str, acad_year: str) -> dict | str | None:
+        # Modules without a stored tree have no prerequisites
+        return self._prereq_trees.get((module_code, acad_year))
+
+
+    @staticmethod
+    def get_compiled_tree(trees: dict[tuple[str, str], dict | str | None], compiled_trees: dict[tuple[str, str], CompiledPrereq | None], key: tuple[str, str]) -> CompiledPrereq | None:
+        if key not in compiled_trees:
+            # Compiling is idempotent, so concurrent sessions racing to compile the same tree is harmless
+            compiled_trees[key] = CompiledPrereq.compile(prereq_tree=trees.get(key))
+
+        return compiled_trees[key]
+
+
+    def get_compiled_prereq(self, module_code: str, acad_year: str) -> CompiledPrereq | None:
+        # None means that the module has no prerequisites
+        return self.get_compiled_tree(trees=self._prereq_trees, compiled_trees=self._compiled_prereqs, key=(module_code, acad_year))
+
+
+    def get_compiled_preclusion(self, module_code: str, acad_year: str) -> CompiledPrereq | None:
+        # None means that the module has no preclusions
+        # The tree is satisfied if a precluded module has been taken
+        key = (module_code, acad_year)
+        if key not in self._preclusion_trees:
+            return None
+
+        return self.get_compiled_tree(trees=self._preclusion_trees, compiled_trees=self._compiled_preclusions, key=key)
+
+
+    def is_preclusion_from_text(self, module_code: str, acad_year: str) -> bool:
+        # Preclusions guessed from plain text may include modules that are only mentioned in passing
+        return (module_code, acad_year) in self._text_preclusion_keys
+
+
+    def get_compiled_coreq(self, module_code: str, acad_year: str) -> CompiledPrereq | None:
+        # None means that the module has no corequisites
+        key = (module_code, acad_year)
+        if key not in self._coreq_trees:
+            return None
+
+        return self.get_compiled_tree(trees=self._coreq_trees, compiled_trees=self._compiled_coreqs, key=key)
@@ -0,0 +1,184 @@
+import re
+
+# NUSMods gives preclusions and corequisites as rules in text form, eg.
+# "PROGRAM_TYPES IF_IN Undergraduate Degree THEN ( COURSES ( 1 ) CS1010:D,CS1010E:D OR COURSES ( 2 ) MA1301:D,MA1301X:D,MA1301FC:D )"
+# These are parsed into trees with the same structure as NUSMods' prerequisite trees, so that they can be compiled
+# and evaluated in exactly the same way
+RULE_TOKEN_REGEX = re.compile(r"\(|\)|,|[^\s(),]+")
+
+# Rules can have a branch for each type of programme, eg. "PROGRAM_TYPES IF_IN Undergraduate Degree THEN ( ... )
+# OR PROGRAM_TYPES IF_IN Graduate Degree Coursework THEN ( ... )". Only the branch for undergraduates is kept
+CONDITION_OPERATORS = ("IF_IN", "IF_NOT_IN")
+UNDERGRADUATE_PROGRAM_TYPE = "Undergraduate Degree"
+
+# Module codes mentioned in free text, eg. "CS1010 or its equivalents"
+MODULE_CODE_REGEX = re.compile(r"\b[A-Z]{2,4}\d{4}[A-Z]{0,3}\b")
+
+
+# Raised when a rule uses a construct that cannot be expressed as a tree of modules (eg. a minimum number of units)
+class UnsupportedRuleError(Exception):
+    pass
+
+
+class RuleParser(object):
+    def __init__(self, tokens: list[str]) -> None:
+        self._tokens = tokens
+        self._position = 0
+
+
+    def peek(self) -> str | None:
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+
+        return None
+
+
+    def consume(self, expected_token: str | None = None) -> str:
+        token = self.peek()
+        if token is None or (expected_token is not None and token != expected_token):
+            raise UnsupportedRuleError(f"Expected {expected_token or 'a token'}, got {token}")
+
+        self._position += 1
+
+        return token
+
+
+    def parse(self) -> dict | str:
+        tree = self.parse_or()
+        if self.peek() is not None:
+            raise UnsupportedRuleError(f"Unexpected token {self.peek()}")
+
+        return tree
+
+
+    def parse_or(self) -> dict | str:
+        # "AND" binds more tightly than "OR"
+        trees = [self.parse_and()]
+        while self.peek() == "OR":
+            self.consume("OR")
+            trees.append(self.parse_and())
+
+        return trees[0] if len(trees) == 1 else {"or": trees}
+
+
+    def parse_and(self) -> dict | str:
+        trees = [self.parse_operand()]
+        while self.peek() == "AND":
+            self.consume("AND")
+            trees.append(self.parse_operand())
+
+        return trees[0] if len(trees) == 1 else {"and": trees}
+
+
+    def parse_operand(self) -> dict | str:
+        if self.peek() == "(":
+            self.consume("(")
+            tree = self.parse_or()
+            self.consume(")")
+            return tree
+
+        # Only lists of modules are supported, in the form COURSES ( n ) code,code,...
+        self.consume("COURSES")
+        self.consume("(")
+        min_num_requirements = int(self.consume())
+        self.consume(")")
+
+        module_codes = [self.consume()]
+        while self.peek() == ",":
+            self.consume(",")
+            module_codes.append(self.consume())
+
+        if len(module_codes) == 1:
+            return module_codes[0]
+
+        if min_num_requirements <= 1:
+            return {"or": module_codes}
+
+        if min_num_requirements >= len(module_codes):
+            return {"and": module_codes}
+
+        return {"nOf": [min_num_requirements, module_codes]}
+
+
+def split_rule_into_branches(tokens: list[str]) -> list[tuple[list[str], list[str]]]:
+    # Returns the branches of the rule, in the form (condition_tokens, body_tokens)
+    # A rule without conditions has a single branch, with no condition
+    # Conditions nested within parentheses are left in the body (and are not supported by the parser)
+    condition_starts = list()
+    depth = 0
+    for position, token in enumerate(tokens):
+        if token == "(":
+            depth += 1
+
+        elif token == ")":
+            depth -= 1
+
+        elif depth == 0 and token in CONDITION_OPERATORS and position > 0:
+            # The condition starts with the attribute being checked (eg. PROGRAM_TYPES)
+            condition_starts.append(position - 1)
+
+    if not condition_starts:
+        return [(list(), tokens)]
+
+    branches = list()
+    for branch_num, condition_start in enumerate(condition_starts):
+        branch_end = condition_starts[branch_num + 1] if branch_num + 1 < len(condition_starts) else len(tokens)
+        branch_tokens = tokens[condition_start:branch_end]
+        if "THEN" not in branch_tokens:
+            raise UnsupportedRuleError("Expected THEN after the condition")
+
+        then_position = branch_tokens.index("THEN")
+        body_tokens = branch_tokens[then_position + 1:]
+
+        # Drop the operator joining this branch to the next one
+        if branch_end < len(tokens) and body_tokens and body_tokens[-1] in ("AND", "OR"):
+            body_tokens = body_tokens[:-1]
+
+        branches.append((branch_tokens[:then_position], body_tokens))
+
+    return branches
+
+
+def is_condition_for_undergraduates(condition_tokens: list[str]) -> bool:
+    # Only conditions on the type of programme can be checked - the other conditions (eg. on cohorts) are taken to hold
+    if not condition_tokens or condition_tokens[0] != "PROGRAM_TYPES":
+        return True
+
+    condition_operator = condition_tokens[1]
+    program_types = [program_type.strip() for program_type in " ".join(condition_tokens[2:]).split(",")]
+    is_undergraduate_listed = UNDERGRADUATE_PROGRAM_TYPE in program_types
+
+    return is_undergraduate_listed if condition_operator == "IF_IN" else not is_undergraduate_listed
+
+
+def parse_requirement_rule(rule: str | None) -> dict | str | None:
+    # Returns the tree for the rule, or None if there is no rule, or if it cannot be parsed
+    if not rule:
+        return None
+
+    tokens = RULE_TOKEN_REGEX.findall(rule)
+
+    try:
+        # Keep the first branch that applies to undergraduates. If there is none, the rule does not apply to them
+        branches = split_rule_into_branches(tokens=tokens)
+        undergraduate_branches = [body_tokens for condition_tokens, body_tokens in branches if is_condition_for_undergraduates(condition_tokens=condition_tokens)]
+        if not undergraduate_branches:
+            return None
+
+        return RuleParser(tokens=undergraduate_branches[0]).parse()
+
+    except (UnsupportedRuleError, ValueError):
+        print(f"Unable to parse requirement rule: {rule}")
+        return None
+
+
+def parse_preclusion_text(preclusion_text: str | None) -> dict | str | None:
+    # Fallback for modules without a preclusion rule - taking any module mentioned in the text is a preclusion
+    if not preclusion_text:
+        return None
+
+    module_codes = list(dict.fromkeys(MODULE_CODE_REGEX.findall(preclusion_text)))
+    if not module_codes:
+        return None
+
+    return module_codes[0] if len(module_codes) == 1 else {"or": module_codes}
@@ -0,0 +1,75 @@
+from moderator.planner.module_catalog import ModuleCatalog
+from moderator.planner.module_search import ModuleSearchIndex
+from moderator.planner.offers_index import OffersIndex
+from moderator.planner.prereq_graph import PrereqGraph
+from moderator.planner.prereq_store import PrereqStore
+from moderator.planner.validation_cache import validation_cache
+from moderator.sql.credit_internships import GET_CREDIT_INTERNSHIPS_QUERY
+from moderator.sql.module_requirements import GET_MODULE_REQUIREMENTS_QUERY
+from moderator.sql.modules import GET_IBLOC_AY_MODULES_QUERY, GET_MODULES_INFO_FOR_PLANNER_QUERY, GET_MODULES_TEXT_FOR_SEARCH_QUERY
+from moderator.sql.offers import GET_ALL_OFFERS_FOR_PLANNER_QUERY
+from moderator.utils.helpers import get_semester_info
+import streamlit as st
+
+
+# Planner data that is identical for every user is loaded once per process, and shared by all sessions
+# It only changes when an admin refreshes the academic database - reload_shared_planner_data() must then be called
+# Each loader returns a new object rather than modifying the old one, so a reload is atomic for the sessions using it
+@st.cache_resource(show_spinner=False)
+def load_module_catalog(_conn: st.connections.SQLConnection) -> ModuleCatalog:
+    # List of lists in the form (module_code, num_mcs, is_year_long)
+    module_rows = _conn.query(GET_MODULES_INFO_FOR_PLANNER_QUERY, ttl=0).values.tolist()
+
+    # Modules that are credit-bearing internships
+    credit_internship_codes = set(_conn.query(GET_CREDIT_INTERNSHIPS_QUERY, ttl=0)["internship_code"])
+
+    # List of lists in the form (sem_num, sem_name, min_mcs)
+    sem_info_rows = get_semester_info(conn=_conn)
+
+    return ModuleCatalog.from_rows(module_rows=module_rows, credit_internship_codes=credit_internship_codes, sem_info_rows=sem_info_rows)
+
+
+@st.cache_resource(show_spinner=False)
+def load_prereq_store(_conn: st.connections.SQLConnection) -> PrereqStore:
+    # List of lists in the form (module_code, acad_year, prereq_tree)
+    rows_queried = _conn.query(GET_MODULE_REQUIREMENTS_QUERY, ttl=0).values.tolist()
+
+    return PrereqStore.from_rows(rows=rows_queried)
+
+
+@st.cache_resource(show_spinner=False)
+def load_offers_index(_conn: st.connections.SQLConnection) -> OffersIndex:
+    # List of lists in the form (module_code, module_title, acad_year, sem_num)
+    offer_rows = _conn.query(GET_ALL_OFFERS_FOR_PLANNER_QUERY, ttl=0).values.tolist()
+
+    # List of lists in the form (module_code, module_title)
+    ibloc_rows = _conn.query(GET_IBLOC_AY_MODULES_QUERY, ttl=0).values.tolist()
+
+    return OffersIndex.from_rows(offer_rows=offer_rows, ibloc_rows=ibloc_rows)
+
+
+@st.cache_resource(show_spinner=False)
+def load_prereq_graph(_conn: st.connections.SQLConnection, acad_year: str) -> PrereqGraph:
+    # Built from the catalog and the prerequisite trees, once for each AY
+    return PrereqGraph.build(module_catalog=load_module_catalog(_conn=_conn), prereq_store=load_prereq_store(_conn=_conn), acad_year=acad_year)
+
+
+@st.cache_resource(show_spinner=False)
+def load_module_search_index(_conn: st.connections.SQLConnection) -> ModuleSearchIndex:
+    # List of lists in the form (module_code, module_title, module_description)
+    rows_queried = _conn.query(GET_MODULES_TEXT_FOR_SEARCH_QUERY, ttl=0).values.tolist()
+
+    return ModuleSearchIndex.from_rows(rows=rows_queried)
+
+
+def reload_shared_planner_data() -> None:
+    # Drop the shared planner data, so that it is reloaded from the database on next use
+    # Sessions still holding the old data are unaffected
+    load_module_catalog.clear()
+    load_prereq_store.clear()
+    load_offers_index.clear()
+    load_prereq_graph.clear()
+    load_module_search_index.clear()
+
+    # Validation results computed from the old data are no longer valid
+    validation_cache.clear()
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from moderator.config import VALIDATION_CACHE_MAX_ENTRIES, VALIDATION_CACHE_MAX_BYTES
+import sys
+import threading
+from typing import Hashable
+
+
+def estimate_size(obj: object) -> int:
+    # Rough number of bytes taken up by a cache key or value, including the objects nested in it
+    # Strings are counted fully, even though module codes are shared with the rest of the app
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list, frozenset)):
+        size += sum(estimate_size(item) for item in obj)
+
+    elif isinstance(obj, dict):
+        size += sum(estimate_size(key) + estimate_size(value) for key, value in obj.items())
+
+    return size
+
+
+# Process-wide memo of course plan validation results, shared by all users
+# Least recently used results are evicted once there are too many of them, or once they take up too much memory
+class ValidationCache(object):
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # Maps each key to a tuple in the form (value, size), from least to most recently used
+        self._entries = OrderedDict()
+        self._num_bytes = 0
+
+        # Keep track of how well the cache is doing
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            stats = self._stats.copy()
+            stats["num_entries"] = len(self._entries)
+            stats["num_bytes"] = self._num_bytes
+
+        num_lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / num_lookups if num_lookups else 0.0
+
+        return stats
+
+
+    # Returns None if the key is not in the cache
+    def get(self, key: Hashable) -> dict[str, str] | None:
+        with self._lock:
+            if key not in self._entries:
+                self._stats["misses"] += 1
+                return None
+
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+
+            return self._entries[key][0]
+
+
+    def put(self, key: Hashable, value: dict[str, str]) -> None:
+        size = estimate_size(key) + estimate_size(value)
+
+        # Too big to be cached at all
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._num_bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size)
+            self._num_bytes += size
+
+            # Evict least recently used entries until the cache is within its limits again
+            while len(self._entries) > self._max_entries or self._num_bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._num_bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._num_bytes = 0
+
+
+# Process-wide validation cache, shared by all sessions
+validation_cache = ValidationCache(
+    max_entries=VALIDATION_CACHE_MAX_ENTRIES,
+    max_bytes=VALIDATION_CACHE_MAX_BYTES
+)
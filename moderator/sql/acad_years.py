@@ -1,6 +1,7 @@
 INSERT_NEW_ACAD_YEAR_STATEMENT = """
 INSERT INTO acad_years
-VALUES (:acad_year);
+VALUES (:acad_year)
+ON CONFLICT (acad_year) DO NOTHING;
 """
 
 GET_LIST_OF_AYS_QUERY = """
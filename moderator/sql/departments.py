@@ -1,8 +1,17 @@
+# WHERE: Skip the write if the department offers modules in an AY later than the one being written
+# (so that older AYs never overwrite the information from newer ones)
 INSERT_NEW_DEPARTMENT_STATEMENT = """
 INSERT INTO departments
 VALUES (:department, :faculty)
 ON CONFLICT (department) DO UPDATE SET
-faculty = EXCLUDED.faculty;
+faculty = EXCLUDED.faculty
+WHERE NOT EXISTS (
+    SELECT *
+    FROM modules m, offers o
+    WHERE m.department = EXCLUDED.department
+    AND m.code = o.module_code
+    AND o.acad_year > :acad_year
+);
 """
 
 DELETE_OUTDATED_DEPARTMENTS_STATEMENT = """
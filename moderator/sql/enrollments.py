@@ -28,4 +28,37 @@ WHERE e.sem_num = s.num
 AND e.module_code = m.code
 AND e.username = :username
 ORDER BY e.acad_year ASC, e.sem_num ASC, e.module_code ASC;
-"""
\ No newline at end of file
+"""
+
+SAVE_USER_PLAN_STATEMENT = """
+WITH new_enrollments AS (
+    SELECT n.acad_year, n.sem_num, n.module_code
+    FROM unnest(CAST(:acad_years AS VARCHAR[]), CAST(:sem_nums AS INT[]), CAST(:module_codes AS VARCHAR[])) AS n(acad_year, sem_num, module_code)
+),
+deleted_enrollments AS (
+    DELETE FROM enrollments e
+    WHERE e.username = :username
+    AND NOT EXISTS (
+        SELECT 1
+        FROM new_enrollments n
+        WHERE n.acad_year = e.acad_year
+        AND n.sem_num = e.sem_num
+        AND n.module_code = e.module_code
+    )
+),
+inserted_enrollments AS (
+    INSERT INTO enrollments (username, module_code, acad_year, sem_num)
+    SELECT :username, n.module_code, n.acad_year, n.sem_num
+    FROM new_enrollments n
+    ON CONFLICT (username, module_code, acad_year, sem_num) DO NOTHING
+)
+SELECT n.acad_year, s.name, n.module_code, m.title, e.rating
+FROM new_enrollments n
+JOIN semesters s ON n.sem_num = s.num
+JOIN modules m ON n.module_code = m.code
+LEFT JOIN enrollments e ON e.username = :username
+AND e.module_code = n.module_code
+AND e.acad_year = n.acad_year
+AND e.sem_num = n.sem_num
+ORDER BY n.acad_year ASC, n.sem_num ASC, n.module_code ASC;
+"""
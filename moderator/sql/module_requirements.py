@@ -0,0 +1,17 @@
+GET_MODULE_REQUIREMENTS_QUERY = """
+SELECT mr.module_code, mr.acad_year, mr.prereq_tree, mr.preclusion_tree, mr.coreq_tree, mr.is_preclusion_from_text
+FROM module_requirements mr;
+"""
+
+# WHERE: Skip the write if the stored trees are unchanged
+INSERT_MODULE_REQUIREMENTS_STATEMENT = """
+INSERT INTO module_requirements (module_code, acad_year, prereq_tree, preclusion_tree, coreq_tree, is_preclusion_from_text)
+VALUES (:module_code, :acad_year, CAST(:prereq_tree AS JSONB), CAST(:preclusion_tree AS JSONB), CAST(:coreq_tree AS JSONB), :is_preclusion_from_text)
+ON CONFLICT (module_code, acad_year) DO UPDATE SET
+prereq_tree = EXCLUDED.prereq_tree,
+preclusion_tree = EXCLUDED.preclusion_tree,
+coreq_tree = EXCLUDED.coreq_tree,
+is_preclusion_from_text = EXCLUDED.is_preclusion_from_text
+WHERE (module_requirements.prereq_tree, module_requirements.preclusion_tree, module_requirements.coreq_tree, module_requirements.is_preclusion_from_text)
+IS DISTINCT FROM (EXCLUDED.prereq_tree, EXCLUDED.preclusion_tree, EXCLUDED.coreq_tree, EXCLUDED.is_preclusion_from_text);
+"""
\ No newline at end of file
@@ -3,11 +3,25 @@ SELECT m.code
 FROM modules m;
 """
 
+GET_MODULE_CONTENT_HASHES_QUERY = """
+SELECT m.code, m.content_hash
+FROM modules m;
+"""
+
+# WHERE: Skip the write if the stored fingerprint already matches, or if the module is offered in an AY later than
+# the one being written (so that older AYs never overwrite the information from newer ones)
 INSERT_NEW_MODULE_STATEMENT = """
 INSERT INTO modules
-VALUES (:code, :title, :department, :description, :num_mcs, :is_year_long)
+VALUES (:code, :title, :department, :description, :num_mcs, :is_year_long, :content_hash)
 ON CONFLICT (code) DO UPDATE SET
-title = EXCLUDED.title, department = EXCLUDED.department, description = EXCLUDED.description, num_mcs = EXCLUDED.num_mcs, is_year_long = EXCLUDED.is_year_long;
+title = EXCLUDED.title, department = EXCLUDED.department, description = EXCLUDED.description, num_mcs = EXCLUDED.num_mcs, is_year_long = EXCLUDED.is_year_long, content_hash = EXCLUDED.content_hash
+WHERE modules.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+AND NOT EXISTS (
+    SELECT *
+    FROM offers o
+    WHERE o.module_code = EXCLUDED.code
+    AND o.acad_year > :acad_year
+);
 """
 
 COUNT_SPECIFIC_AY_MODULES_QUERY = """
@@ -52,6 +66,12 @@ SELECT m.code, m.num_mcs, m.is_year_long
 FROM modules m;
 """
 
+GET_MODULES_TEXT_FOR_SEARCH_QUERY = """
+SELECT m.code, m.title, m.description
+FROM modules m
+ORDER BY m.code ASC;
+"""
+
 GET_TERMS_OFFERED_FOR_SPECIFIC_MODULE_QUERY = """
 SELECT o.sem_num
 FROM offers o
@@ -3,3 +3,18 @@ INSERT INTO offers
 VALUES (:module_code, :acad_year, :sem_num)
 ON CONFLICT (module_code, acad_year, sem_num) DO NOTHING;
 """
+
+
+GET_SPECIFIC_AY_OFFERS_QUERY = """
+SELECT o.module_code, o.sem_num
+FROM offers o
+WHERE o.acad_year = :acad_year;
+"""
+
+
+GET_ALL_OFFERS_FOR_PLANNER_QUERY = """
+SELECT o.module_code, m.title, o.acad_year, o.sem_num
+FROM offers o, modules m
+WHERE o.module_code = m.code
+ORDER BY o.acad_year ASC, o.sem_num ASC, o.module_code ASC;
+"""
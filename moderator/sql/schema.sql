@@ -17,6 +17,7 @@ CREATE TABLE IF NOT EXISTS modules (
     description TEXT,
     num_mcs NUMERIC(10, 2) NOT NULL,
     is_year_long BOOLEAN NOT NULL,
+    content_hash VARCHAR(64),
     FOREIGN KEY (department) REFERENCES departments(department) ON DELETE CASCADE ON UPDATE CASCADE,
     CHECK (num_mcs >= 0)
 );
@@ -129,4 +130,16 @@ CREATE TABLE IF NOT EXISTS announcements (
     publish_date TIMESTAMP,
     PRIMARY KEY (username, message, publish_date),
     FOREIGN KEY (username) REFERENCES users(username) ON UPDATE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS module_requirements (
+    module_code VARCHAR(255),
+    acad_year VARCHAR(255),
+    prereq_tree JSONB,
+    preclusion_tree JSONB,
+    coreq_tree JSONB,
+    is_preclusion_from_text BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (module_code, acad_year),
+    FOREIGN KEY (module_code) REFERENCES modules(code) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (acad_year) REFERENCES acad_years(acad_year) ON DELETE CASCADE ON UPDATE CASCADE
 );
\ No newline at end of file
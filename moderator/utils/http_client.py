@@ -0,0 +1,166 @@
+import hashlib
+import json
+from moderator.config import HTTP_CACHE_DIR, HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_DOWNLOAD_CHUNK_SIZE
+import os
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from typing import Any
+
+
+# Raised when upstream responds with an unexpected status code
+class HttpRequestError(Exception):
+    def __init__(self, url: str, status_code: int) -> None:
+        super().__init__(f"Unsuccessful request to {url} (status code {status_code})")
+        self.status_code = status_code
+
+
+# HTTP client shared by everything that fetches upstream data (NUSMods, GitHub raw, data.gov.sg)
+# Connections are pooled, and response bodies are cached on disk. Once a cached response is older than its TTL,
+# it is revalidated with a conditional request, so that unchanged upstream data costs a 304 instead of a full download
+class CachedHttpClient(object):
+    def __init__(self, cache_dir: str, pool_size: int, timeout: float, chunk_size: int) -> None:
+        self._cache_dir = cache_dir
+        self._timeout = timeout
+        self._chunk_size = chunk_size
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+        # Keep-alive connections are reused across requests to the same host
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        # Keep track of how each request was served
+        # "local_hits": Served from disk without contacting upstream
+        # "revalidated": Upstream responded with 304 - cached copy is still valid
+        # "downloaded": Full response downloaded from upstream
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "local_hits": 0,
+            "revalidated": 0,
+            "downloaded": 0
+        }
+
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return self._stats.copy()
+
+
+    def increment_stat(self, stat_name: str) -> None:
+        with self._stats_lock:
+            self._stats[stat_name] += 1
+
+
+    def get_cache_paths(self, url: str, params: dict[str, str] | None) -> tuple[str, str]:
+        # Each (url, params) pair is cached as a body file and a metadata file
+        cache_key_content = json.dumps([url, sorted((params or dict()).items())])
+        cache_key = hashlib.sha256(cache_key_content.encode("utf-8")).hexdigest()
+        body_file_path = os.path.join(self._cache_dir, f"{cache_key}.body")
+        meta_file_path = os.path.join(self._cache_dir, f"{cache_key}.meta.json")
+
+        return body_file_path, meta_file_path
+
+
+    def read_cache_meta(self, body_file_path: str, meta_file_path: str) -> dict[str, str | float | None] | None:
+        # Cached response is only usable if both the body and its metadata exist
+        if not (os.path.exists(body_file_path) and os.path.exists(meta_file_path)):
+            return None
+
+        try:
+            with open(meta_file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        except (OSError, json.JSONDecodeError):
+            # Metadata is unreadable - treat as a cache miss
+            return None
+
+
+    def write_cache_meta(self, meta_file_path: str, cache_meta: dict[str, str | float | None]) -> None:
+        # Write to a temporary file first, so that concurrent readers never see a partial file
+        temp_file_path = f"{meta_file_path}.{threading.get_ident()}.part"
+        with open(temp_file_path, "w", encoding="utf-8") as f:
+            json.dump(cache_meta, f)
+
+        os.replace(temp_file_path, meta_file_path)
+
+
+    # Returns the path to a file on disk containing the (possibly cached) response body
+    # The body is streamed to disk, so large responses are never held in memory
+    def fetch_to_file(self, url: str, ttl: float, params: dict[str, str] | None = None) -> str:
+        body_file_path, meta_file_path = self.get_cache_paths(url=url, params=params)
+        cache_meta = self.read_cache_meta(body_file_path=body_file_path, meta_file_path=meta_file_path)
+
+        if cache_meta is not None and time.time() - cache_meta["fetched_at"] < ttl:
+            # Cached response is still fresh - no need to contact upstream
+            self.increment_stat("local_hits")
+            return body_file_path
+
+        # Cached response is stale (or missing). If we have validators for it, make a conditional request
+        request_headers = dict()
+        if cache_meta is not None:
+            if cache_meta.get("etag"):
+                request_headers["If-None-Match"] = cache_meta["etag"]
+
+            if cache_meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = cache_meta["last_modified"]
+
+        with self._session.get(url=url, params=params, headers=request_headers, stream=True, timeout=self._timeout) as response:
+            if response.status_code == 304 and cache_meta is not None:
+                # Upstream data has not changed - mark the cached copy as fresh again
+                cache_meta["fetched_at"] = time.time()
+                self.write_cache_meta(meta_file_path=meta_file_path, cache_meta=cache_meta)
+                self.increment_stat("revalidated")
+                return body_file_path
+
+            if response.status_code != 200:
+                # Something went wrong with the fetch
+                raise HttpRequestError(url=url, status_code=response.status_code)
+
+            # Stream the new body to disk. Write to a temporary file first, so that a failed download
+            # never leaves a truncated body behind
+            temp_file_path = f"{body_file_path}.{threading.get_ident()}.part"
+            try:
+                with open(temp_file_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=self._chunk_size):
+                        f.write(chunk)
+
+                os.replace(temp_file_path, body_file_path)
+
+            finally:
+                # If the download failed part way, the temporary file is still there - clean it up
+                if os.path.exists(temp_file_path):
+                    os.remove(temp_file_path)
+
+            # Save the validators that upstream gave us, for revalidation later on
+            self.write_cache_meta(
+                meta_file_path=meta_file_path,
+                cache_meta={
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time()
+                }
+            )
+            self.increment_stat("downloaded")
+
+        return body_file_path
+
+
+    def get_json(self, url: str, ttl: float, params: dict[str, str] | None = None) -> Any:
+        # Get the (possibly cached) response body, and parse it as JSON
+        body_file_path = self.fetch_to_file(url=url, ttl=ttl, params=params)
+        with open(body_file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+# Process-wide client, shared by all sessions
+http_client = CachedHttpClient(
+    cache_dir=HTTP_CACHE_DIR,
+    pool_size=HTTP_POOL_SIZE,
+    timeout=HTTP_TIMEOUT,
+    chunk_size=HTTP_DOWNLOAD_CHUNK_SIZE
+)
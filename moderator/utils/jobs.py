@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import json
+from moderator.config import JOBS_STATE_FILE, JOBS_MAX_WORKERS, JOBS_HISTORY_LIMIT, JOBS_PROGRESS_SAVE_INTERVAL
+from moderator.utils.helpers import adjust_to_timezone
+import os
+import threading
+import time
+import traceback
+from typing import Callable
+import uuid
+
+# Possible states of a job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+# Runs long admin tasks (eg. database refreshes) in worker threads, independently of any Streamlit session
+# Job state is persisted to disk, so that it can be polled from any page rerun, and is not lost when the admin navigates away
+class JobRunner(object):
+    def __init__(self, state_file_path: str, max_workers: int, history_limit: int, progress_save_interval: float) -> None:
+        self._state_file_path = state_file_path
+        self._history_limit = history_limit
+        self._progress_save_interval = progress_save_interval
+        self._last_saved_at = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="moderator_job")
+        self._lock = threading.Lock()
+
+        # Keeps track of the job being run by each worker thread, so that tasks can report their progress
+        self._thread_local = threading.local()
+
+        # Maps job ids to job states
+        # Each job state is a dictionary with keys "job_id", "job_name", "status", "stage", "num_items_processed",
+        # "error", "created_at", "started_at" and "ended_at"
+        self._jobs = self.load_jobs()
+
+
+    def load_jobs(self) -> dict[str, dict[str, str | int | None]]:
+        if not os.path.exists(self._state_file_path):
+            return dict()
+
+        try:
+            with open(self._state_file_path, "r", encoding="utf-8") as f:
+                jobs = json.load(f)
+
+        except (OSError, json.JSONDecodeError):
+            # State file is unreadable - start afresh
+            return dict()
+
+        # Jobs that were still active when the app last stopped will never complete - mark them as failed
+        for job in jobs.values():
+            if job["status"] in ACTIVE_JOB_STATUSES:
+                job["status"] = JOB_FAILED
+                job["error"] = "Interrupted by an app restart."
+
+        return jobs
+
+
+    def prune_jobs(self) -> None:
+        # Must be called while holding the lock
+        # Forget the oldest finished jobs, so that the job history does not grow without bound
+        finished_jobs = sorted(
+            (job for job in self._jobs.values() if job["status"] not in ACTIVE_JOB_STATUSES),
+            key=lambda job: job["created_at"]
+        )
+        num_jobs_to_forget = len(self._jobs) - self._history_limit
+        for job in finished_jobs[:max(num_jobs_to_forget, 0)]:
+            del self._jobs[job["job_id"]]
+
+
+    def save_jobs(self) -> None:
+        # Must be called while holding the lock
+        # Write to a temporary file first, so that the state file is never left half-written
+        os.makedirs(os.path.dirname(self._state_file_path) or ".", exist_ok=True)
+        temp_file_path = f"{self._state_file_path}.part"
+        with open(temp_file_path, "w", encoding="utf-8") as f:
+            json.dump(self._jobs, f, default=str)
+
+        os.replace(temp_file_path, self._state_file_path)
+        self._last_saved_at = time.monotonic()
+
+
+    def update_job(self, job_id: str, **job_updates: str | int | None) -> None:
+        with self._lock:
+            self._jobs[job_id].update(job_updates)
+            self.save_jobs()
+
+
+    # Returns the id of the submitted job, or None if a job with the same name is already queued or running
+    def submit(self, job_name: str, job_function: Callable[[], None]) -> str | None:
+        with self._lock:
+            # Reject duplicate jobs
+            for job in self._jobs.values():
+                if job["job_name"] == job_name and job["status"] in ACTIVE_JOB_STATUSES:
+                    return None
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "job_name": job_name,
+                "status": JOB_QUEUED,
+                "stage": None,
+                "num_items_processed": 0,
+                "error": None,
+                "created_at": adjust_to_timezone(time=datetime.datetime.now()).isoformat(),
+                "started_at": None,
+                "ended_at": None
+            }
+            self.prune_jobs()
+            self.save_jobs()
+
+        self._executor.submit(self.run_job, job_id, job_function)
+
+        return job_id
+
+
+    def run_job(self, job_id: str, job_function: Callable[[], None]) -> None:
+        self._thread_local.job_id = job_id
+        self.update_job(job_id, status=JOB_RUNNING, started_at=adjust_to_timezone(time=datetime.datetime.now()).isoformat())
+
+        try:
+            job_function()
+
+        except Exception:
+            # Keep the traceback so that the admin can see what went wrong
+            traceback.print_exc()
+            self.update_job(job_id, status=JOB_FAILED, error=traceback.format_exc(limit=5), ended_at=adjust_to_timezone(time=datetime.datetime.now()).isoformat())
+
+        else:
+            self.update_job(job_id, status=JOB_DONE, stage=None, ended_at=adjust_to_timezone(time=datetime.datetime.now()).isoformat())
+
+        finally:
+            self._thread_local.job_id = None
+
+
+    def report_progress(self, stage: str, num_items_processed: int | None = None) -> None:
+        # Only applicable when called from within a job - otherwise, do nothing
+        job_id = getattr(self._thread_local, "job_id", None)
+        if job_id is None:
+            return
+
+        with self._lock:
+            job = self._jobs[job_id]
+            is_new_stage = job["stage"] != stage
+            job["stage"] = stage
+            if num_items_processed is not None:
+                job["num_items_processed"] = num_items_processed
+
+            # Progress can be reported very frequently - only persist it periodically, or when the stage changes
+            if is_new_stage or time.monotonic() - self._last_saved_at >= self._progress_save_interval:
+                self.save_jobs()
+
+
+    def get_latest_job(self, job_name: str) -> dict[str, str | int | None] | None:
+        # Get the most recently created job with the given name, if any
+        with self._lock:
+            jobs_with_name = [job.copy() for job in self._jobs.values() if job["job_name"] == job_name]
+
+        if not jobs_with_name:
+            return None
+
+        return max(jobs_with_name, key=lambda job: job["created_at"])
+
+
+    def has_active_jobs(self) -> bool:
+        with self._lock:
+            return any(job["status"] in ACTIVE_JOB_STATUSES for job in self._jobs.values())
+
+
+# Process-wide job runner, shared by all sessions
+job_runner = JobRunner(
+    state_file_path=JOBS_STATE_FILE,
+    max_workers=JOBS_MAX_WORKERS,
+    history_limit=JOBS_HISTORY_LIMIT,
+    progress_save_interval=JOBS_PROGRESS_SAVE_INTERVAL
+)
+
+
+def report_job_progress(stage: str, num_items_processed: int | None = None) -> None:
+    # Report progress of the job running in the current thread, if any
+    job_runner.report_progress(stage=stage, num_items_processed=num_items_processed)
@@ -0,0 +1,62 @@
+import json
+import re
+from typing import Any, Iterator
+
+# Matches the whitespace and commas that separate the elements of a JSON array
+JSON_ARRAY_SEPARATOR_REGEX = re.compile(r"[\s,]*")
+
+# Characters that can follow a complete element of a JSON array
+JSON_ELEMENT_DELIMITERS = frozenset(",] \t\n\r")
+
+
+def iter_json_array(file_path: str, chunk_size: int) -> Iterator[Any]:
+    # Incrementally parse a file containing a top-level JSON array, yielding one element at a time
+    # Only the current chunk (and the element being parsed) is held in memory
+    decoder = json.JSONDecoder()
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size)
+        is_eof = not buffer
+
+        # Skip to the opening bracket of the array
+        buffer = buffer.lstrip()
+        while not buffer and not is_eof:
+            buffer = f.read(chunk_size).lstrip()
+            is_eof = not buffer
+
+        if not buffer.startswith("["):
+            raise ValueError(f"{file_path} does not contain a JSON array")
+
+        pos = 1
+        while True:
+            # Skip separators between elements
+            pos = JSON_ARRAY_SEPARATOR_REGEX.match(buffer, pos).end()
+
+            if pos < len(buffer) and buffer[pos] == "]":
+                # Reached the end of the array
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+
+                # A number that has been cut off at the end of the buffer can still decode (eg. "1.5" cut off as "1." decodes
+                # to 1), so it is only accepted if a delimiter follows it. Objects, arrays and strings end with their own
+                # brackets or quotes. Either way, an element is accepted if there is nothing more to read
+                is_complete = isinstance(element, (dict, list, str)) or (end < len(buffer) and buffer[end] in JSON_ELEMENT_DELIMITERS)
+                if is_complete or is_eof:
+                    yield element
+                    pos = end
+                    continue
+
+            except json.JSONDecodeError:
+                if is_eof:
+                    raise
+
+            # Element is incomplete - drop what has been consumed and read the next chunk
+            chunk = f.read(chunk_size)
+            is_eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+            if is_eof and not buffer.strip():
+                raise ValueError(f"{file_path} ended before the JSON array was closed")
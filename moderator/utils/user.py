@@ -1,10 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import hashlib
+import json
 from langchain_core.documents.base import Document
 from langchain_core.vectorstores import VectorStore
 from langchain_huggingface.embeddings.huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_text_splitters.character import RecursiveCharacterTextSplitter
-from moderator.config import DISQUS_RETRIEVAL_LIMIT, DISQUS_SHORT_NAME, SEMESTER_LIST, CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDINGS_MODEL_NAME, PINECONE_BATCH_SIZE, BUS_STOPS_URL, BUS_ROUTES_URL
+from moderator.bus_services.shared_data import reload_shared_bus_data
+from moderator.config import DISQUS_RETRIEVAL_LIMIT, DISQUS_SHORT_NAME, MODULE_INFO_PARSE_CHUNK_SIZE, MODULE_WRITE_BATCH_SIZE, BACKFILL_MAX_WORKERS, REQUIREMENTS_FETCH_MAX_WORKERS, PREREQ_FALLBACK_ACAD_YEARS, SEMESTER_LIST, CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDINGS_MODEL_NAME, PINECONE_BATCH_SIZE, BUS_STOPS_URL, BUS_ROUTES_URL, NUSMODS_MODULE_INFO_CACHE_TTL, NUSMODS_MODULE_CACHE_TTL, BUS_DATA_CACHE_TTL
 from moderator.sql.acad_years import INSERT_NEW_ACAD_YEAR_STATEMENT
 from moderator.sql.announcements import ADD_NEW_ANNOUNCEMENT_STATEMENT
 from moderator.sql.bus_numbers import GET_BUS_NUMBERS_QUERY, INSERT_BUS_NUMBER_STATEMENT, DELETE_BUS_NUMBER_STATEMENT
@@ -12,15 +16,22 @@ from moderator.sql.bus_routes import GET_BUS_ROUTES_QUERY, INSERT_BUS_ROUTE_STAT
 from moderator.sql.bus_stops import GET_BUS_STOPS_QUERY, INSERT_BUS_STOP_STATEMENT, DELETE_BUS_STOP_STATEMENT
 from moderator.sql.departments import INSERT_NEW_DEPARTMENT_STATEMENT, DELETE_OUTDATED_DEPARTMENTS_STATEMENT
 from moderator.sql.majors import GET_EXISTING_MAJOR_QUERY, INSERT_NEW_MAJOR_QUERY
-from moderator.sql.modules import GET_MODULE_CODES_QUERY, INSERT_NEW_MODULE_STATEMENT
-from moderator.sql.offers import INSERT_NEW_OFFER_STATEMENT
+from moderator.sql.module_requirements import INSERT_MODULE_REQUIREMENTS_STATEMENT
+from moderator.sql.modules import GET_MODULE_CODES_QUERY, GET_MODULE_CONTENT_HASHES_QUERY, INSERT_NEW_MODULE_STATEMENT
+from moderator.sql.offers import GET_SPECIFIC_AY_OFFERS_QUERY, INSERT_NEW_OFFER_STATEMENT
 from moderator.sql.reviews import INSERT_NEW_REVIEW_STATEMENT
 from moderator.sql.users import GET_EXISTING_USER_QUERY, MAKE_USER_ADMIN_STATEMENT
 from moderator.sql.vector_store_update import GET_MODULE_COMBINED_REVIEWS_QUERY
+from moderator.planner.shared_data import reload_shared_planner_data
+from moderator.planner.requirement_rules import parse_preclusion_text, parse_requirement_rule
 from moderator.utils.helpers import adjust_to_timezone
+from moderator.utils.http_client import http_client, HttpRequestError
+from moderator.utils.jobs import report_job_progress
+from moderator.utils.streaming import iter_json_array
 import requests
 import streamlit as st
 from sqlalchemy import text
+from typing import Iterator
 
 DISQUS_API_KEY = st.secrets["DISQUS_API_KEY"]
 PINECONE_INDEX_NAME = st.secrets["PINECONE_INDEX_NAME"]
@@ -93,23 +104,29 @@ class Admin(User):
 
     ### ACADEMIC DATABASE UPDATE ###
     # Admin can update the academic-related tables in PostgreSQL database
-    def get_module_info_this_acad_year(self, acad_year: str) -> tuple[list[dict[str, int | str | list[int]]], dict[str, str]]:
-        print(f"Getting module information for AY{acad_year}...")
+    def make_module_content_hash(self, module_title: str, module_dept: str, module_description: str, module_mcs: str, module_is_year_long: bool) -> str:
+        # Fingerprint the fields of a module that we persist in the "modules" table
+        # If the fingerprint is unchanged between refreshes, the row does not need to be rewritten
+        module_content = json.dumps([module_title, module_dept, module_description, str(module_mcs), bool(module_is_year_long)], ensure_ascii=False)
+        
+        return hashlib.sha256(module_content.encode("utf-8")).hexdigest()
 
+
+    def fetch_module_info_file(self, acad_year: str) -> str:
         # Use NUSMods API to get detailed information of modules, for the chosen academic year
+        # The file is tens of MB, so it is streamed to disk (and cached there) instead of being loaded into memory
         nusmods_endpoint_url = f"https://api.nusmods.com/v2/{acad_year}/moduleInfo.json"
-        response = requests.get(url=nusmods_endpoint_url)
+        return http_client.fetch_to_file(url=nusmods_endpoint_url, ttl=NUSMODS_MODULE_INFO_CACHE_TTL)
 
-        if response.status_code != 200:
-            raise Exception("Unsuccessful request to NUSMods API")
 
-        # Successful GET request
-        module_infos = response.json()
-        
-        # Loop through each module retrieved from NUSMods API
-        available_modules_this_ay = list()
-        departments_to_faculties_this_ay = dict()
-        for module_info in module_infos:
+    def get_module_info_this_acad_year(self, acad_year: str) -> Iterator[dict[str, int | str | list[int]]]:
+        print(f"Getting module information for AY{acad_year}...")
+
+        # Get the file with the detailed information of modules, for the chosen academic year
+        module_info_file_path = self.fetch_module_info_file(acad_year=acad_year)
+
+        # Parse the downloaded file incrementally, and loop through each module retrieved from NUSMods API
+        for module_info in iter_json_array(file_path=module_info_file_path, chunk_size=MODULE_INFO_PARSE_CHUNK_SIZE):
             # Get details of this module
             module_code, module_title, module_dept, module_faculty, module_description, module_sem_data, module_mcs = module_info["moduleCode"], module_info["title"], module_info["department"], module_info["faculty"], module_info["description"], module_info["semesterData"], module_info["moduleCredit"]
             
@@ -129,32 +146,32 @@ class Admin(User):
                 continue
 
             print(f"{module_code} {module_title} is offered for AY{acad_year}.")
-
-            # Update mapping of departments to faculties for this academic year
-            # NOTE: For the NUSMods dataset, it is actually possible that a department belongs to multiple faculties
-            # for the same academic year. But oh well, we shall overwrite the faculty for now - it doesn't
-            # really matter for our use case at the moment
-            departments_to_faculties_this_ay[module_dept] = module_faculty
                 
             # Get the semesters where the module will be offered
             # 1 = Sem 1 only, 2 = Sem 2, 3 = Special Term 1, 4 = Special Term 2
             sems_offered = [sem_data["semester"] for sem_data in module_sem_data]
 
-            # Update list of available modules this academic year
-            available_modules_this_ay.append({
+            # Yield this available module, one at a time
+            yield {
                 "code": module_code,
                 "title": module_title,
                 "department": module_dept,
+                "faculty": module_faculty,
                 "description": module_description,
                 "num_mcs": module_mcs,
                 "sems_offered": sems_offered,
-                "is_year_long": module_is_year_long
-            })
-
-        return available_modules_this_ay, departments_to_faculties_this_ay
+                "is_year_long": module_is_year_long,
+                "content_hash": self.make_module_content_hash(
+                    module_title=module_title,
+                    module_dept=module_dept,
+                    module_description=module_description,
+                    module_mcs=module_mcs,
+                    module_is_year_long=module_is_year_long
+                )
+            }
         
         
-    def update_departments_table(self, conn: st.connections.SQLConnection, departments_to_faculties_this_ay: dict[str, str]) -> None:
+    def update_departments_table(self, conn: st.connections.SQLConnection, acad_year: str, departments_to_faculties_this_ay: dict[str, str]) -> None:
         print("Updating departments table...")
 
         with conn.session as s:
@@ -163,45 +180,140 @@ class Admin(User):
                 print(f"Adding / updating department information for {department}...")
                 
                 # Either insert new row for this department, or:
-                # If department already exists in table, update the row
+                # If department already exists in table, update the row, unless it is offering modules in a later AY
                 s.execute(
                     text(INSERT_NEW_DEPARTMENT_STATEMENT),
                     params={
                         "department": department,
-                        "faculty": faculty
+                        "faculty": faculty,
+                        "acad_year": acad_year
                     }
                 )
             
             s.commit()
 
 
-    def update_modules_table(self, conn: st.connections.SQLConnection, available_modules_this_ay: list[dict[str, int | str | list[int]]]) -> None:
+    def get_existing_module_hashes(self, conn: st.connections.SQLConnection) -> dict[str, str | None]:
+        # Get the content fingerprints of the modules that are already in the "modules" table
+        return dict(conn.query(GET_MODULE_CONTENT_HASHES_QUERY, ttl=0).values.tolist())
+
+
+    def update_modules_table(self, conn: st.connections.SQLConnection, acad_year: str, available_modules_this_ay: list[dict[str, int | str | list[int]]], existing_module_hashes: dict[str, str | None] | None = None) -> None:
         print("Updating modules table...")
 
-        with conn.session as s:
-            # For the available modules this academic year, we need to update the table
-            for available_module in available_modules_this_ay:
-                # Get information for this module
-                available_module_code, available_module_title, available_module_dept, available_module_description, available_module_num_mcs, available_module_is_year_long = available_module["code"], available_module["title"], available_module["department"], available_module["description"], available_module["num_mcs"], available_module["is_year_long"]
-                
-                print(f"Adding / updating module information for {available_module_code}...")
+        # Get the content fingerprints of the modules that are already in the table, if they have not been given
+        if existing_module_hashes is None:
+            existing_module_hashes = self.get_existing_module_hashes(conn=conn)
 
-                # Either insert new row for this module, or:
-                # If module already exists in table, update the row
-                s.execute(
-                    text(INSERT_NEW_MODULE_STATEMENT),
-                    params={
-                        "code": available_module_code,
-                        "title": available_module_title,
-                        "department": available_module_dept,
-                        "description": available_module_description,
-                        "num_mcs": available_module_num_mcs,
-                        "is_year_long": available_module_is_year_long
-                    }
-                )
+        # Only new modules, or modules whose persisted fields have changed, need to be written
+        changed_module_rows = list()
+        for available_module in available_modules_this_ay:
+            # Get information for this module
+            available_module_code, available_module_hash = available_module["code"], available_module["content_hash"]
+
+            if existing_module_hashes.get(available_module_code) == available_module_hash:
+                # Module is unchanged since the last refresh - skip it
+                continue
+
+            print(f"Adding / updating module information for {available_module_code}...")
+
+            changed_module_rows.append({
+                "code": available_module_code,
+                "title": available_module["title"],
+                "department": available_module["department"],
+                "description": available_module["description"],
+                "num_mcs": available_module["num_mcs"],
+                "is_year_long": available_module["is_year_long"],
+                "content_hash": available_module_hash,
+                "acad_year": acad_year
+            })
+
+        print(f"{len(changed_module_rows)} out of {len(available_modules_this_ay)} modules are new or have changed.")
+
+        if not changed_module_rows:
+            return
+
+        with conn.session as s:
+            # Either insert new rows for these modules, or:
+            # If module already exists in table, update the row, unless it is offered in a later AY
+            # All the rows are sent in a single batch
+            s.execute(text(INSERT_NEW_MODULE_STATEMENT), changed_module_rows)
             
             s.commit()
 
+        # Keep the fingerprints up to date, in case they are reused for subsequent batches
+        for changed_module_row in changed_module_rows:
+            existing_module_hashes[changed_module_row["code"]] = changed_module_row["content_hash"]
+
+
+    def get_module_requirements_from_nusmods(self, module_code: str, acad_year: str) -> tuple[dict | str | None, dict | str | None, dict | str | None, bool]:
+        # Returns the trees in the form (prereq_tree, preclusion_tree, coreq_tree, is_preclusion_from_text). None means there are no such requirements
+        # is_preclusion_from_text is True if the preclusion tree was guessed from the plain-text preclusion, rather than parsed from a rule
+        # NUSMods has no information on prerequisite trees for some AYs (eg. AY2022-2023)
+        # Use data from a neighbouring AY instead - it's close enough bro
+        source_acad_year = PREREQ_FALLBACK_ACAD_YEARS.get(acad_year, acad_year)
+
+        # Use NUSMods API to get detailed information about the specified module, for the chosen academic year
+        nusmods_endpoint_url = f"https://api.nusmods.com/v2/{source_acad_year}/modules/{module_code}.json"
+        try:
+            module_info = http_client.get_json(url=nusmods_endpoint_url, ttl=NUSMODS_MODULE_CACHE_TTL)
+        
+        except HttpRequestError as e:
+            if e.status_code != 404:
+                raise
+
+            # Module does not exist for the source AY (possible when falling back to another AY) - treat it as having no requirements
+            print(f"No NUSMods information for {module_code} in AY{source_acad_year}.")
+            return None, None, None, False
+
+        # If there is no tree, module has no prerequisites
+        prereq_tree = module_info.get("prereqTree")
+
+        # Preclusions and corequisites only come as rules in text form, which have to be parsed into trees
+        # Some modules only describe their preclusions in plain text - use the module codes mentioned in it instead
+        preclusion_tree = parse_requirement_rule(rule=module_info.get("preclusionRule"))
+        is_preclusion_from_text = False
+        if preclusion_tree is None:
+            preclusion_tree = parse_preclusion_text(preclusion_text=module_info.get("preclusion"))
+            is_preclusion_from_text = preclusion_tree is not None
+
+        coreq_tree = parse_requirement_rule(rule=module_info.get("corequisiteRule"))
+
+        return prereq_tree, preclusion_tree, coreq_tree, is_preclusion_from_text
+
+
+    def update_module_requirements_table(self, conn: st.connections.SQLConnection, acad_year: str, module_codes: list[str]) -> None:
+        print(f"Updating module requirements table for AY{acad_year}...")
+
+        # Fetch the requirements (prerequisites, preclusions and corequisites) of each module concurrently, from NUSMods API
+        # Responses are cached, so unchanged modules only cost a revalidation
+        report_job_progress(stage=f"Fetching course requirements for AY{acad_year}", num_items_processed=0)
+        module_requirement_rows = list()
+        with ThreadPoolExecutor(max_workers=REQUIREMENTS_FETCH_MAX_WORKERS) as executor:
+            module_requirements = executor.map(lambda module_code: self.get_module_requirements_from_nusmods(module_code=module_code, acad_year=acad_year), module_codes)
+            for module_code, (prereq_tree, preclusion_tree, coreq_tree, is_preclusion_from_text) in zip(module_codes, module_requirements):
+                module_requirement_rows.append({
+                    "module_code": module_code,
+                    "acad_year": acad_year,
+                    "prereq_tree": json.dumps(prereq_tree),
+                    "preclusion_tree": json.dumps(preclusion_tree),
+                    "coreq_tree": json.dumps(coreq_tree),
+                    "is_preclusion_from_text": is_preclusion_from_text
+                })
+
+                if len(module_requirement_rows) % MODULE_WRITE_BATCH_SIZE == 0:
+                    report_job_progress(stage=f"Fetching course requirements for AY{acad_year}", num_items_processed=len(module_requirement_rows))
+
+        if not module_requirement_rows:
+            return
+
+        with conn.session as s:
+            # Either insert new rows for these modules, or:
+            # If the module already has a row for this AY, update it if any of its trees have changed
+            s.execute(text(INSERT_MODULE_REQUIREMENTS_STATEMENT), module_requirement_rows)
+
+            s.commit()
+
 
     def delete_outdated_departments(self, conn: st.connections.SQLConnection) -> None:
         print("Deleting outdated departments...")
@@ -284,7 +396,9 @@ class Admin(User):
         module_code_records = set(conn.query(GET_MODULE_CODES_QUERY, ttl=0)["code"])
 
         # Loop through each thread retrieved from Disqus
-        for thread_id, reviews in thread_ids_to_posts.items():
+        for num_threads_processed, (thread_id, reviews) in enumerate(thread_ids_to_posts.items()):
+            report_job_progress(stage="Updating reviews", num_items_processed=num_threads_processed)
+
             # Get module information
             module_name = thread_ids_to_names[thread_id]["thread_name"]
             module_code = module_name.split()[0]
@@ -316,6 +430,17 @@ class Admin(User):
                     
                 s.commit()
 
+
+    def update_reviews_from_disqus(self, conn: st.connections.SQLConnection) -> None:
+        # Retrieve reviews, by fetching latest information from Disqus API
+        report_job_progress(stage="Retrieving reviews from Disqus")
+        thread_ids_to_names, thread_ids_to_posts = self.use_disqus_api(short_name=DISQUS_SHORT_NAME, retrieval_limit=DISQUS_RETRIEVAL_LIMIT)
+
+        # Update "reviews" table in PostgreSQL database
+        report_job_progress(stage="Updating reviews")
+        self.update_reviews_table(conn=conn, thread_ids_to_names=thread_ids_to_names, thread_ids_to_posts=thread_ids_to_posts)
+
+
     def update_acad_years_table(self, conn: st.connections.SQLConnection, acad_year: str) -> None:
         print("Updating academic years table...")
 
@@ -331,67 +456,191 @@ class Admin(User):
             s.commit()
 
 
-    def update_offers_table(self, conn: st.connections.SQLConnection, acad_year: str, available_modules_this_ay: list[dict[str, int | str | list[int]]], semester_list: list[dict[str, int | str]]) -> None:
-        # For the available modules this academic year, we need to update the "offers" table
+    def get_existing_offers(self, conn: st.connections.SQLConnection, acad_year: str) -> set[tuple[str, int]]:
+        # Get the set of (module_code, sem_num) offers that are already recorded for this academic year
+        return set(
+            (module_code, sem_num) for module_code, sem_num in conn.query(
+                GET_SPECIFIC_AY_OFFERS_QUERY,
+                params={
+                    "acad_year": acad_year
+                },
+                ttl=0
+            ).values.tolist()
+        )
+
+
+    def update_offers_table(self, conn: st.connections.SQLConnection, acad_year: str, available_modules_this_ay: list[dict[str, int | str | list[int]]], semester_list: list[dict[str, int | str]], existing_offers: set[tuple[str, int]] | None = None) -> None:
+        print("Updating offers table...")
+
+        # Get the offers that are already recorded for this academic year, if they have not been given
+        if existing_offers is None:
+            existing_offers = self.get_existing_offers(conn=conn, acad_year=acad_year)
+
+        # Get the list of all semesters
+        all_sems = [sem_data["num"] for sem_data in semester_list]
+
+        # For the available modules this academic year, only the offers that have not been recorded need to be written
+        new_offer_rows = list()
+        for available_module in available_modules_this_ay:
+            # Get the list of semesters when this module is offered
+            available_module_code, available_module_sems_offered = available_module["code"], available_module["sems_offered"]
+
+            # Loop through each semester and check whether module is offered
+            for sem_num in all_sems:
+                if sem_num in available_module_sems_offered and (available_module_code, sem_num) not in existing_offers:
+                    # Module is offered for this semester, and this offer is new
+                    new_offer_rows.append({
+                        "module_code": available_module_code,
+                        "acad_year": acad_year,
+                        "sem_num": sem_num
+                    })
+
+        print(f"{len(new_offer_rows)} new offers found for AY{acad_year}.")
+
+        if not new_offer_rows:
+            return
+
         with conn.session as s:
-            for available_module in available_modules_this_ay:
-                # Get the list of semesters when this module is offered
-                available_module_code, available_module_sems_offered = available_module["code"], available_module["sems_offered"]
-                
-                print(f"Adding offer information for {available_module_code}...")
-
-                # Get the list of all semesters
-                all_sems = [sem_data["num"] for sem_data in semester_list]
-
-                # Loop through each semester and check whether module is offered
-                for sem_num in all_sems:
-                    if sem_num in available_module_sems_offered:
-                        # Module is offered for this semester
-                        # Either insert new row for this offer, or:
-                        # If offer already exists, do nothing
-                        s.execute(
-                            text(INSERT_NEW_OFFER_STATEMENT),
-                            params={
-                                "module_code": available_module_code,
-                                "acad_year": acad_year,
-                                "sem_num": sem_num
-                            }
-                        )
+            # Insert the new offers in a single batch
+            # If offer already exists, do nothing
+            s.execute(text(INSERT_NEW_OFFER_STATEMENT), new_offer_rows)
 
             s.commit()
 
+        # Keep the recorded offers up to date, in case they are reused for subsequent batches
+        existing_offers.update((new_offer_row["module_code"], new_offer_row["sem_num"]) for new_offer_row in new_offer_rows)
 
-    # This updates the departments, modules, reviews, acad_years and offers tables
-    # Useful when NUSMods data for the new AY has just been released        
-    def update_acad_db(self, conn: st.connections.SQLConnection, acad_year: str) -> None:
-        # Fetch latest information from NUSMods API
-        # Get the modules offered, the modules not offered, and the departments available this academic year
-        available_modules_this_ay, departments_to_faculties_this_ay = self.get_module_info_this_acad_year(acad_year=acad_year)
+
+    def update_tables_for_module_batch(self, conn: st.connections.SQLConnection, acad_year: str, available_modules_in_batch: list[dict[str, int | str | list[int]]], departments_to_faculties_this_ay: dict[str, str], existing_module_hashes: dict[str, str | None], existing_offers: set[tuple[str, int]]) -> None:
+        # Get the departments in this batch that have not been written yet, or whose faculty has changed
+        # NOTE: For the NUSMods dataset, it is actually possible that a department belongs to multiple faculties
+        # for the same academic year. But oh well, we shall overwrite the faculty for now - it doesn't
+        # really matter for our use case at the moment
+        departments_to_faculties_in_batch = dict()
+        for available_module in available_modules_in_batch:
+            module_dept, module_faculty = available_module["department"], available_module["faculty"]
+            if departments_to_faculties_this_ay.get(module_dept) != module_faculty:
+                departments_to_faculties_in_batch[module_dept] = module_faculty
+                departments_to_faculties_this_ay[module_dept] = module_faculty
 
         # Update "departments" table in PostgreSQL database
-        self.update_departments_table(conn=conn, departments_to_faculties_this_ay=departments_to_faculties_this_ay)
+        # Departments must exist before the modules that refer to them
+        if departments_to_faculties_in_batch:
+            self.update_departments_table(conn=conn, acad_year=acad_year, departments_to_faculties_this_ay=departments_to_faculties_in_batch)
 
         # Update "modules" table in PostgreSQL database
-        self.update_modules_table(conn=conn, available_modules_this_ay=available_modules_this_ay)
-
-        # Deleted outdated departments from "departments" table
-        self.delete_outdated_departments(conn=conn)
+        self.update_modules_table(conn=conn, acad_year=acad_year, available_modules_this_ay=available_modules_in_batch, existing_module_hashes=existing_module_hashes)
 
-        # Retrieve reviews, by fetching latest information from Disqus API
-        thread_ids_to_names, thread_ids_to_posts = self.use_disqus_api(short_name=DISQUS_SHORT_NAME, retrieval_limit=DISQUS_RETRIEVAL_LIMIT)
+        # Update "offers" table in PostgreSQL database
+        self.update_offers_table(conn=conn, acad_year=acad_year, available_modules_this_ay=available_modules_in_batch, semester_list=SEMESTER_LIST, existing_offers=existing_offers)
 
-        # Update "reviews" table in PostgreSQL database, by fetching latest information from NUSMods API
-        self.update_reviews_table(conn=conn, thread_ids_to_names=thread_ids_to_names, thread_ids_to_posts=thread_ids_to_posts)
 
+    # This updates the departments, modules, acad_years, offers and module_requirements tables, for a single AY
+    # Modules and departments are only overwritten if they do not appear in a later AY
+    def update_tables_for_acad_year(self, conn: st.connections.SQLConnection, acad_year: str) -> None:
         # Update "acad_years" table in PostgreSQL database
+        # This must come first, as the offers written below refer to this academic year
+        report_job_progress(stage=f"Updating academic years for AY{acad_year}")
         self.update_acad_years_table(conn=conn, acad_year=acad_year)
 
-        # Update "offers" table in PostgreSQL database
-        self.update_offers_table(conn=conn, acad_year=acad_year, available_modules_this_ay=available_modules_this_ay, semester_list=SEMESTER_LIST)
+        # Get the current state of the "modules" and "offers" tables, so that only changes are written
+        existing_module_hashes = self.get_existing_module_hashes(conn=conn)
+        existing_offers = self.get_existing_offers(conn=conn, acad_year=acad_year)
+
+        # Fetch latest information from NUSMods API
+        # Modules offered this academic year are streamed in one at a time, and written to the database in batches
+        report_job_progress(stage=f"Updating modules and offers for AY{acad_year}", num_items_processed=0)
+        departments_to_faculties_this_ay = dict()
+        available_modules_in_batch = list()
+        available_module_codes = list()
+        for available_module in self.get_module_info_this_acad_year(acad_year=acad_year):
+            available_modules_in_batch.append(available_module)
+            available_module_codes.append(available_module["code"])
+
+            if len(available_modules_in_batch) == MODULE_WRITE_BATCH_SIZE:
+                self.update_tables_for_module_batch(
+                    conn=conn,
+                    acad_year=acad_year,
+                    available_modules_in_batch=available_modules_in_batch,
+                    departments_to_faculties_this_ay=departments_to_faculties_this_ay,
+                    existing_module_hashes=existing_module_hashes,
+                    existing_offers=existing_offers
+                )
+                available_modules_in_batch = list()
+                report_job_progress(stage=f"Updating modules and offers for AY{acad_year}", num_items_processed=len(available_module_codes))
+
+        # Write the final (partial) batch
+        if available_modules_in_batch:
+            self.update_tables_for_module_batch(
+                conn=conn,
+                acad_year=acad_year,
+                available_modules_in_batch=available_modules_in_batch,
+                departments_to_faculties_this_ay=departments_to_faculties_this_ay,
+                existing_module_hashes=existing_module_hashes,
+                existing_offers=existing_offers
+            )
+
+        # Update "module_requirements" table in PostgreSQL database, with the prerequisite trees of the modules offered
+        self.update_module_requirements_table(conn=conn, acad_year=acad_year, module_codes=available_module_codes)
+
+
+    # This updates the departments, modules, reviews, acad_years and offers tables
+    # Useful when NUSMods data for the new AY has just been released        
+    def update_acad_db(self, conn: st.connections.SQLConnection, acad_year: str) -> None:
+        # Update the tables that depend on this academic year
+        self.update_tables_for_acad_year(conn=conn, acad_year=acad_year)
+
+        # Deleted outdated departments from "departments" table
+        report_job_progress(stage="Deleting outdated departments")
+        self.delete_outdated_departments(conn=conn)
+
+        # Update "reviews" table in PostgreSQL database
+        self.update_reviews_from_disqus(conn=conn)
+
+        # Planner data shared by all users is now outdated
+        reload_shared_planner_data()
 
         print("Update completed!")
 
 
+    def get_acad_years_in_range(self, start_acad_year: str, end_acad_year: str) -> list[str]:
+        # AYs are in YYYY-YYYY format. Get every AY from the start AY to the end AY (inclusive), in chronological order
+        start_year, end_year = int(start_acad_year.split("-")[0]), int(end_acad_year.split("-")[0])
+        if start_year > end_year:
+            raise ValueError(f"AY{start_acad_year} is after AY{end_acad_year}")
+
+        return [f"{year}-{year + 1}" for year in range(start_year, end_year + 1)]
+
+
+    # This updates the departments, modules, reviews, acad_years and offers tables, for every AY in the given range
+    # Useful when standing up a new environment, or when past AYs are missing from the database
+    def backfill_acad_db(self, conn: st.connections.SQLConnection, start_acad_year: str, end_acad_year: str) -> None:
+        acad_years = self.get_acad_years_in_range(start_acad_year=start_acad_year, end_acad_year=end_acad_year)
+
+        # Download the module information for each AY concurrently, from NUSMods API
+        # The files are cached on disk, so that only one AY needs to be held in memory at a time below
+        report_job_progress(stage="Fetching module information", num_items_processed=0)
+        with ThreadPoolExecutor(max_workers=BACKFILL_MAX_WORKERS) as executor:
+            list(executor.map(self.fetch_module_info_file, acad_years))
+
+        # Update the tables one AY at a time, in chronological order. If a module or department appears in multiple AYs,
+        # the information from the latest AY wins - including AYs after the given range that are already in the database
+        for acad_year in acad_years:
+            self.update_tables_for_acad_year(conn=conn, acad_year=acad_year)
+
+        # Deleted outdated departments from "departments" table
+        report_job_progress(stage="Deleting outdated departments")
+        self.delete_outdated_departments(conn=conn)
+
+        # Update "reviews" table in PostgreSQL database
+        self.update_reviews_from_disqus(conn=conn)
+
+        # Planner data shared by all users is now outdated
+        reload_shared_planner_data()
+
+        print("Backfill completed!")
+
+
     ### VECTOR STORE UPDATE ###
     # Admin can update the Pinecone vector store containing the vector embeddings for the chatbot
     def make_module_textual_info(self, conn: st.connections.SQLConnection, acad_year: str) -> list[Document]:
@@ -466,6 +715,7 @@ class Admin(User):
             
             # Increment start_index
             start_index += batch_size
+            report_job_progress(stage="Making embeddings", num_items_processed=min(start_index, num_documents))
 
         return vector_store
     
@@ -474,12 +724,14 @@ class Admin(User):
     # Useful when NUSMods data for the new AY has just been released
     def update_vector_store(self, conn: st.connections.SQLConnection, acad_year: str) -> None:
         # Get textual info of modules, in the form of documents
+        report_job_progress(stage="Making module textual info", num_items_processed=0)
         module_documents = self.make_module_textual_info(
             conn=conn,
             acad_year=acad_year
         )
 
         # Make document chunks
+        report_job_progress(stage="Making document chunks", num_items_processed=len(module_documents))
         document_chunks = self.make_documents(
             module_documents=module_documents,
             chunk_size=CHUNK_SIZE,
@@ -503,7 +755,7 @@ class Admin(User):
         existing_bus_stop_codes = list(conn.query(GET_BUS_STOPS_QUERY, ttl=0)["code_name"])
 
         # Get bus stop data - a list of dictionaries
-        bus_stops = requests.get(url=BUS_STOPS_URL).json()
+        bus_stops = http_client.get_json(url=BUS_STOPS_URL, ttl=BUS_DATA_CACHE_TTL)
 
         with conn.session as s:
             # Loop through each bus stop requested
@@ -556,7 +808,7 @@ class Admin(User):
         # Get bus route data - a dictionary
         # Keys: Bus numbers
         # Values: List of bus stops (dictionaries) in sequential order of route
-        bus_route_data = requests.get(url=BUS_ROUTES_URL).json()
+        bus_route_data = http_client.get_json(url=BUS_ROUTES_URL, ttl=BUS_DATA_CACHE_TTL)
         
         with conn.session as s:
             # Loop through each bus number requested
@@ -627,11 +879,16 @@ class Admin(User):
     # Useful when changes to the NUS bus system have been announced
     def update_bus_db(self, conn: st.connections.SQLConnection) -> None:
         # Update bus stops
+        report_job_progress(stage="Updating bus stops")
         self.update_bus_stops_table(conn=conn)
 
         # Update bus numbers and bus routes
+        report_job_progress(stage="Updating bus numbers and bus routes")
         self.update_bus_nums_and_bus_routes_table(conn=conn)
 
+        # Shared bus route data is now out of date
+        reload_shared_bus_data()
+
 
     ### ADD MAJORS ###
     # Admin can add a new major into the database
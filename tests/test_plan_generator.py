@@ -0,0 +1,48 @@
+from moderator.planner.course_plan_checker import CoursePlanChecker
+from moderator.planner.module_catalog import ModuleCatalog
+from moderator.planner.offers_index import OffersIndex
+from moderator.planner.plan_generator import PlanGenerator
+from moderator.planner.prereq_store import PrereqStore
+import unittest
+
+LIST_OF_AYS = ["2020-2021", "2021-2022", "2022-2023"]
+
+
+def make_checker(module_rows: list[list[str | float | bool]], offer_rows: list[list[str | int]], sem_info_rows: list[list[int | str | float]]) -> CoursePlanChecker:
+    # Offer rows are in the form (module_code, acad_year, sem_num)
+    offer_rows = sorted([[module_code, module_code, acad_year, sem_num] for module_code, acad_year, sem_num in offer_rows], key=lambda offer_row: (offer_row[2], offer_row[3], offer_row[0]))
+
+    return CoursePlanChecker.from_shared_data(
+        module_catalog=ModuleCatalog.from_rows(module_rows=module_rows, credit_internship_codes=set(), sem_info_rows=sem_info_rows),
+        prereq_store=PrereqStore.from_rows(rows=list()),
+        offers_index=OffersIndex.from_rows(offer_rows=offer_rows, ibloc_rows=list()),
+        list_of_ays=LIST_OF_AYS,
+        matriculation_ay="2021-2022",
+        num_years_to_grad=2
+    )
+
+
+class TestPlanGenerator(unittest.TestCase):
+    def test_failed_state_does_not_prune_path_with_pending_year_long_module(self):
+        # Taking YY1000 in the first AY leaves XC1003 alone in the second AY's Semester 2, below its minimum MCs.
+        # Taking it in the second AY reaches the same set of scheduled modules, but with YY1000 still to be continued
+        checker = make_checker(
+            module_rows=[["YY1000", 4, True], ["XA1001", 4, False], ["XB1002", 4, False], ["XC1003", 6, False]],
+            offer_rows=[
+                ["YY1000", "2021-2022", 1], ["YY1000", "2021-2022", 2], ["YY1000", "2022-2023", 1], ["YY1000", "2022-2023", 2],
+                ["XA1001", "2021-2022", 2], ["XB1002", "2021-2022", 2], ["XC1003", "2022-2023", 2]
+            ],
+            sem_info_rows=[[1, "Semester 1", 0.0], [2, "Semester 2", 8.0], [3, "Special Term 1", 0.0]]
+        )
+        plan_generator = PlanGenerator(checker=checker, max_branches=4)
+
+        plan = plan_generator.generate(target_module_codes=["YY1000", "XA1001", "XB1002", "XC1003"], time_budget=10.0, use_filler_modules=False)
+
+        self.assertIsNotNone(plan)
+        self.assertEqual(sorted(plan["2022-2023"][1]), ["YY1000"])
+        self.assertEqual(sorted(plan["2022-2023"][2]), ["XC1003", "YY1000"])
+        self.assertEqual(sorted(plan["2021-2022"][2]), ["XA1001", "XB1002"])
+
+
+if __name__ == "__main__":
+    unittest.main()
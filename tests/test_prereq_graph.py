@@ -0,0 +1,47 @@
+from moderator.planner.prereq_graph import PrereqGraph
+import unittest
+
+MODULE_CODES = ("A1000", "B1000", "C2000", "D2000", "E2000", "F3000")
+
+
+def make_prereq_graph(prereqs: dict[str, list[str]]) -> PrereqGraph:
+    # Maps each module code to the module codes in its prerequisite tree
+    module_code_indices = {module_code: module_index for module_index, module_code in enumerate(MODULE_CODES)}
+    return PrereqGraph(
+        module_codes=MODULE_CODES,
+        prereq_indices={module_code_indices[module_code]: tuple(module_code_indices[prereq_module_code] for prereq_module_code in prereq_module_codes) for module_code, prereq_module_codes in prereqs.items()}
+    )
+
+
+class TestPrereqGraph(unittest.TestCase):
+    def test_closures_of_a_chain(self):
+        prereq_graph = make_prereq_graph(prereqs={"C2000": ["A1000", "B1000"], "F3000": ["C2000"]})
+
+        self.assertEqual(prereq_graph.get_prereq_chain("F3000"), ["A1000", "B1000", "C2000"])
+        self.assertEqual(prereq_graph.get_all_unlocked_module_codes("A1000"), ["C2000", "F3000"])
+        self.assertEqual(prereq_graph.get_num_modules_unlocked("A1000"), 2)
+        self.assertEqual(prereq_graph.get_level("F3000"), 2)
+
+
+    def test_modules_in_a_cycle_do_not_list_themselves(self):
+        # D2000 and E2000 are each other's prerequisites (eg. through an "or" with other modules), and both lead to F3000
+        prereq_graph = make_prereq_graph(prereqs={"D2000": ["A1000", "E2000"], "E2000": ["D2000"], "F3000": ["D2000"]})
+
+        self.assertEqual(prereq_graph.get_prereq_chain("D2000"), ["A1000", "E2000"])
+        self.assertEqual(prereq_graph.get_prereq_chain("E2000"), ["A1000", "D2000"])
+        self.assertEqual(prereq_graph.get_all_unlocked_module_codes("D2000"), ["E2000", "F3000"])
+        self.assertEqual(prereq_graph.get_num_modules_unlocked("D2000"), 2)
+        self.assertEqual(prereq_graph.get_num_modules_unlocked("A1000"), 3)
+        self.assertFalse(prereq_graph.is_in_prereq_chain(prereq_module_code="D2000", module_code="D2000"))
+        self.assertTrue(prereq_graph.is_in_prereq_chain(prereq_module_code="E2000", module_code="F3000"))
+
+
+    def test_module_that_is_its_own_prerequisite(self):
+        prereq_graph = make_prereq_graph(prereqs={"B1000": ["B1000", "A1000"]})
+
+        self.assertEqual(prereq_graph.get_prereq_chain("B1000"), ["A1000"])
+        self.assertEqual(prereq_graph.get_num_modules_unlocked("B1000"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
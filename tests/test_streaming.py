@@ -0,0 +1,42 @@
+import json
+from moderator.utils.streaming import iter_json_array
+import os
+import tempfile
+import unittest
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def parse_with_every_chunk_size(self, text: str) -> None:
+        # Elements must come out the same however the file is split into chunks
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "array.json")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+            for chunk_size in range(1, len(text) + 2):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(list(iter_json_array(file_path=file_path, chunk_size=chunk_size)), json.loads(text))
+
+
+    def test_numbers_across_chunk_boundaries(self):
+        for text in ["[1.5]", "[1e5]", "[12, -3.25E-2, 1e+10]", "[0.125,7]", " [ 42 , 3.0 ] "]:
+            self.parse_with_every_chunk_size(text=text)
+
+
+    def test_literals_strings_and_objects_across_chunk_boundaries(self):
+        for text in ["[true, false, null]", '["a,b", "]", ""]', '[{"code": "CS1010", "mcs": 4.5}, [1, [2]]]']:
+            self.parse_with_every_chunk_size(text=text)
+
+
+    def test_unclosed_array(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "array.json")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write("[1, 2")
+
+            with self.assertRaises(ValueError):
+                list(iter_json_array(file_path=file_path, chunk_size=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
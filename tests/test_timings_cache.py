@@ -0,0 +1,58 @@
+import asyncio
+from moderator.bus_services import timings_cache
+from moderator.bus_services.timings_cache import BusTimingsCache
+import threading
+import unittest
+from unittest import mock
+
+BUS_STOP_TIMINGS = {"A1": {"next_bus": {"waiting_time": "Arr", "plate_num": "P1"}}}
+
+
+class TestBusTimingsCache(unittest.TestCase):
+    def test_cancelled_waiter_does_not_cancel_shared_fetch(self):
+        cache = BusTimingsCache(ttl=15)
+        fetch_started = threading.Event()
+        waiter_done = threading.Event()
+
+        async def fetch_timings_from_api(bus_stop_code: str) -> dict:
+            fetch_started.set()
+
+            # Only finish after the waiting session has been cancelled
+            await asyncio.get_running_loop().run_in_executor(None, waiter_done.wait, 5)
+            return BUS_STOP_TIMINGS
+
+        # Each session runs on its own thread and event loop, like in the app
+        fetcher_results = list()
+        def run_fetcher() -> None:
+            try:
+                fetcher_results.append(asyncio.run(cache.get_timings(bus_stop_code="COM3")))
+
+            except BaseException as e:
+                fetcher_results.append(e)
+
+        async def run_waiter() -> None:
+            waiter_task = asyncio.create_task(cache.get_timings(bus_stop_code="COM3"))
+            await asyncio.sleep(0.05)
+            waiter_task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter_task
+
+        with mock.patch.object(timings_cache, "fetch_timings_from_api", fetch_timings_from_api):
+            fetcher_thread = threading.Thread(target=run_fetcher)
+            fetcher_thread.start()
+            self.assertTrue(fetch_started.wait(5))
+
+            asyncio.run(run_waiter())
+            waiter_done.set()
+            fetcher_thread.join(5)
+
+            # The fetching session still gets its timings, and they are cached for the other sessions
+            self.assertEqual(fetcher_results, [BUS_STOP_TIMINGS])
+            self.assertEqual(asyncio.run(cache.get_timings(bus_stop_code="COM3")), BUS_STOP_TIMINGS)
+
+        self.assertEqual(cache.stats["shared_fetches"], 1)
+        self.assertEqual(cache.stats["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()